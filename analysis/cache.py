@@ -0,0 +1,93 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Columnas de la última vela que identifican la versión del frame
+_STAMP_COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+
+class AnalysisCache:
+    """
+    Cache en memoria de frames ya analizados por SMCAnalyzer, compartida entre
+    pares, timeframes y reruns. La clave es (par, timeframe, última vela,
+    parámetros del análisis): mientras no cierre una vela nueva del timeframe
+    se reutiliza el análisis (p. ej. el H1/D1 al cambiar el timeframe
+    operativo o al re-escanear). La última vela se identifica por su
+    timestamp, el largo del frame y su fila OHLCV completa, así una vela en
+    formación que cambió (aunque el cierre vuelva al mismo valor con otro
+    High / Low) no devuelve un análisis viejo.
+
+    Guarda una sola entrada por (par, timeframe, parámetros): la de una vela
+    anterior se descarta al guardar la nueva. Eviction LRU cuando se supera
+    max_entries.
+
+    Los frames se comparten entre quienes los piden: no deben modificarse
+    in-place.
+    """
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def last_bar(df):
+        """(timestamp, velas, bytes de la fila OHLCV) de la última vela del frame."""
+        ts = df['Date'].iloc[-1] if 'Date' in df.columns else df.index[-1]
+        cols = [col for col in _STAMP_COLUMNS if col in df.columns]
+        # En bytes: un NaN (p. ej. Volume) compara igual a sí mismo
+        row = np.asarray([df[col].iloc[-1] for col in cols], dtype=np.float64)
+        return ts, len(df), row.tobytes()
+
+    def get(self, pair, timeframe, df, params):
+        key = (pair, timeframe, params)
+        stamp = self.last_bar(df)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] != stamp:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, pair, timeframe, df, params, analyzed):
+        if analyzed is None or analyzed.empty:
+            return analyzed
+        key = (pair, timeframe, params)
+        with self._lock:
+            self._data[key] = (self.last_bar(df), analyzed)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        return analyzed
+
+    def get_or_compute(self, pair, timeframe, df, params, compute):
+        """Análisis cacheado o compute() (fuera del lock) si no está."""
+        if df is None or df.empty:
+            return compute()
+        analyzed = self.get(pair, timeframe, df, params)
+        if analyzed is None:
+            analyzed = self.put(pair, timeframe, df, params, compute())
+        return analyzed
+
+    def invalidate(self, pair=None, timeframe=None):
+        with self._lock:
+            for key in list(self._data):
+                if (pair is None or key[0] == pair) and (timeframe is None or key[1] == timeframe):
+                    del self._data[key]
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total * 100.0, 2) if total else 0.0,
+            }
@@ -0,0 +1,181 @@
+"""
+Registro de features del análisis SMC y cálculo del grafo mínimo.
+
+Cada feature declara las columnas que produce y las que necesita (OHLC u
+outputs de otras features registradas antes). analyze_arrays(...,
+features=[...]) resuelve las dependencias y calcula sólo ese subgrafo: el
+sesgo HTF/D1 pide ['trend'] y se ahorra pivots, ATR, RSI, estructura,
+liquidez, FVG y zonas.
+
+Un indicador nuevo se agrega con register_feature sin tocar este módulo ni
+SMCAnalyzer:
+
+    @register_feature('vwap', outputs=['VWAP'], inputs=['High', 'Low', 'Close', 'Volume'])
+    def _vwap(ctx, params):
+        ...
+        return {'VWAP': values}
+
+ctx es el dict de arrays calculados hasta ese momento y params tiene
+swing_length y pivot_mode. El orden de registro es el orden de columnas del
+resultado (y un orden topológico válido, porque los inputs tienen que estar
+registrados antes).
+"""
+import numpy as np
+
+from analysis import kernels
+from analysis.liquidity import LIQUIDITY_COLUMNS
+from analysis.structure import STRUCTURE_COLUMNS, market_structure
+from analysis.zones import ZONE_COLUMNS
+
+# Columnas de entrada (OHLC) disponibles para cualquier feature
+BASE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+
+
+class Feature:
+    def __init__(self, name, outputs, inputs, compute):
+        self.name = name
+        self.outputs = list(outputs)
+        self.inputs = list(inputs)
+        self.compute = compute
+
+
+# nombre -> Feature, en orden de registro
+FEATURES = {}
+# columna -> nombre de la feature que la produce
+_PRODUCERS = {}
+
+
+def register_feature(name, outputs, inputs):
+    """Decorador: registra fn(ctx, params) -> {columna: array} como feature."""
+    def decorator(fn):
+        for col in inputs:
+            if col not in _PRODUCERS and col not in BASE_COLUMNS:
+                raise ValueError(f"Feature '{name}': input desconocido '{col}'")
+        for col in outputs:
+            if _PRODUCERS.get(col, name) != name:
+                raise ValueError(f"Feature '{name}': la columna '{col}' ya la produce '{_PRODUCERS[col]}'")
+        FEATURES[name] = Feature(name, outputs, inputs, fn)
+        for col in outputs:
+            _PRODUCERS[col] = name
+        return fn
+    return decorator
+
+
+def resolve(features=None):
+    """
+    Features a calcular, en orden, para obtener `features` (nombres de
+    feature o de columna). None = todas.
+    """
+    if features is None:
+        return list(FEATURES.values())
+    needed = set()
+    pending = list(features)
+    while pending:
+        item = pending.pop()
+        if item in BASE_COLUMNS:
+            continue
+        name = item if item in FEATURES else _PRODUCERS.get(item)
+        if name is None:
+            raise ValueError(f"Feature desconocida: '{item}'")
+        if name not in needed:
+            needed.add(name)
+            pending.extend(FEATURES[name].inputs)
+    return [f for f in FEATURES.values() if f.name in needed]
+
+
+def columns(features=None):
+    """Columnas que devuelve analyze_arrays para `features`."""
+    return [col for f in resolve(features) for col in f.outputs]
+
+
+def analyze_arrays(high, low, close, swing_length=5, open_=None, pivot_mode="centered", features=None):
+    """
+    Columnas de SMCAnalyzer.analyze como dict de arrays (1-D o 2-D, ver
+    analysis/kernels.py): 'trend' y 'structure_bias' como código int8 (ver
+    kernels.trend_labels), swing_high/swing_low como en
+    analysis/structure.py. features limita el cálculo al subgrafo necesario
+    (el resultado trae también las columnas de las dependencias). Sin open_
+    los Order Blocks toman el cierre anterior como apertura.
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    open_ = kernels.shift(close, 1) if open_ is None else np.asarray(open_, dtype=np.float64)
+
+    ctx = {'Open': open_, 'High': high, 'Low': low, 'Close': close}
+    params = {'swing_length': swing_length, 'pivot_mode': pivot_mode}
+    out = {}
+    for feature in resolve(features):
+        values = feature.compute(ctx, params)
+        for col in feature.outputs:
+            out[col] = ctx[col] = values[col]
+    return out
+
+
+@register_feature('pivots', outputs=['is_pivot_high', 'is_pivot_low'], inputs=['High', 'Low'])
+def _pivots(ctx, params):
+    high, low = kernels.pivots(ctx['High'], ctx['Low'], params['swing_length'], params['pivot_mode'])
+    return {'is_pivot_high': high, 'is_pivot_low': low}
+
+
+@register_feature('EMA_50', outputs=['EMA_50'], inputs=['Close'])
+def _ema_50(ctx, params):
+    return {'EMA_50': kernels.ema(ctx['Close'], 50)}
+
+
+@register_feature('EMA_200', outputs=['EMA_200'], inputs=['Close'])
+def _ema_200(ctx, params):
+    return {'EMA_200': kernels.ema(ctx['Close'], 200)}
+
+
+@register_feature('ATR', outputs=['tr0', 'tr1', 'tr2', 'TR', 'ATR'], inputs=['High', 'Low', 'Close'])
+def _atr(ctx, params):
+    return dict(zip(['tr0', 'tr1', 'tr2', 'TR', 'ATR'], kernels.atr(ctx['High'], ctx['Low'], ctx['Close'])))
+
+
+@register_feature('RSI', outputs=['RSI'], inputs=['Close'])
+def _rsi(ctx, params):
+    return {'RSI': kernels.rsi(ctx['Close'])}
+
+
+@register_feature('last_pivot', outputs=['last_pivot_high', 'last_pivot_low'],
+                  inputs=['High', 'Low', 'is_pivot_high', 'is_pivot_low'])
+def _last_pivot(ctx, params):
+    # Precio del pivot en la fila donde se marca (la vela del pivot o, en modo
+    # confirmed, swing_length velas después)
+    lag = kernels.pivot_lag(params['swing_length'], params['pivot_mode'])
+    return {
+        'last_pivot_high': kernels.ffill(np.where(ctx['is_pivot_high'], kernels.shift(ctx['High'], lag), np.nan)),
+        'last_pivot_low': kernels.ffill(np.where(ctx['is_pivot_low'], kernels.shift(ctx['Low'], lag), np.nan)),
+    }
+
+
+@register_feature('trend', outputs=['trend'], inputs=['Close', 'EMA_50', 'EMA_200'])
+def _trend(ctx, params):
+    return {'trend': kernels.trend_code(ctx['Close'], ctx['EMA_50'], ctx['EMA_200'])}
+
+
+@register_feature('structure', outputs=STRUCTURE_COLUMNS,
+                  inputs=['Close', 'is_pivot_high', 'is_pivot_low', 'last_pivot_high', 'last_pivot_low'])
+def _structure(ctx, params):
+    return market_structure(ctx['Close'], ctx['is_pivot_high'], ctx['is_pivot_low'],
+                            ctx['last_pivot_high'], ctx['last_pivot_low'])
+
+
+@register_feature('liquidity', outputs=LIQUIDITY_COLUMNS,
+                  inputs=['High', 'Low', 'is_pivot_high', 'is_pivot_low', 'ATR', 'last_pivot_high', 'last_pivot_low'])
+def _liquidity(ctx, params):
+    return kernels.liquidity(ctx['High'], ctx['Low'], ctx['is_pivot_high'], ctx['is_pivot_low'], ctx['ATR'],
+                             ctx['last_pivot_high'], ctx['last_pivot_low'])
+
+
+@register_feature('fvg', outputs=['fvg_bullish', 'fvg_bearish', 'fvg_top', 'fvg_bottom'], inputs=['High', 'Low'])
+def _fvg(ctx, params):
+    return dict(zip(['fvg_bullish', 'fvg_bearish', 'fvg_top', 'fvg_bottom'], kernels.fvgs(ctx['High'], ctx['Low'])))
+
+
+@register_feature('zones', outputs=ZONE_COLUMNS,
+                  inputs=['Open', 'High', 'Low', 'Close', 'fvg_bullish', 'fvg_bearish', 'fvg_top', 'fvg_bottom',
+                          'bos_bullish', 'bos_bearish', 'choch_bullish', 'choch_bearish'])
+def _zones(ctx, params):
+    return kernels.zones(ctx['Open'], ctx['High'], ctx['Low'], ctx['Close'], ctx)
@@ -0,0 +1,492 @@
+import copy
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from analysis.kernels import pivot_lag
+from analysis.liquidity import LiquidityBook
+from analysis.zones import ZONE_COLUMNS, ZoneTracker
+
+# Columnas que añade SMCAnalyzer.analyze, en el mismo orden
+ANALYSIS_COLUMNS = [
+    'is_pivot_high', 'is_pivot_low',
+    'EMA_50', 'EMA_200',
+    'tr0', 'tr1', 'tr2', 'TR', 'ATR', 'RSI',
+    'last_pivot_high', 'last_pivot_low',
+    'trend',
+    'swing_high', 'swing_low',
+    'bos_bullish', 'bos_bearish',
+    'choch_bullish', 'choch_bearish',
+    'structure_bias',
+    'has_liquidity_above', 'has_liquidity_below',
+    'liquidity_above', 'liquidity_below',
+    'sweep_above', 'sweep_below',
+    'fvg_bullish', 'fvg_bearish', 'fvg_top', 'fvg_bottom',
+    'demand_top', 'demand_bottom', 'demand_kind', 'demand_touch',
+    'supply_bottom', 'supply_top', 'supply_kind', 'supply_touch',
+]
+
+
+class _EWMState:
+    """
+    Media exponencial con adjust=True, misma recurrencia que pandas
+    (Series.ewm(span=...).mean()) para que el resultado coincida con el batch.
+    """
+    def __init__(self, span):
+        self.alpha = 2.0 / (span + 1.0)
+        self.weighted = math.nan
+        self.old_wt = 1.0
+
+    def update(self, x):
+        if self.weighted != self.weighted:
+            self.weighted = x
+            self.old_wt = 1.0
+        else:
+            self.old_wt *= 1.0 - self.alpha
+            if self.weighted != x:
+                self.weighted = (self.old_wt * self.weighted + x) / (self.old_wt + 1.0)
+            self.old_wt += 1.0
+        return self.weighted
+
+    def copy(self):
+        out = _EWMState.__new__(_EWMState)
+        out.alpha, out.weighted, out.old_wt = self.alpha, self.weighted, self.old_wt
+        return out
+
+
+class _RollingMean:
+    """Media de las últimas `window` observaciones (NaN hasta llenar la ventana)."""
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+
+    def update(self, x):
+        self.values.append(x)
+        if len(self.values) < self.window:
+            return math.nan
+        return math.fsum(self.values) / self.window
+
+    def copy(self):
+        out = _RollingMean.__new__(_RollingMean)
+        out.window, out.values = self.window, self.values.copy()
+        return out
+
+
+class _StreamState:
+    """Todo lo que hace falta para procesar la vela siguiente."""
+    def __init__(self, swing_length):
+        self.ema_50 = _EWMState(50)
+        self.ema_200 = _EWMState(200)
+        self.atr = _RollingMean(14)
+        self.gain = _RollingMean(14)
+        self.loss = _RollingMean(14)
+        self.last_atr = math.nan
+        self.first_atr = math.nan
+        self.prev_close = math.nan
+        self.highs = deque(maxlen=2 * swing_length + 1)
+        self.lows = deque(maxlen=2 * swing_length + 1)
+        self.last_pivot_high = math.nan
+        self.last_pivot_low = math.nan
+        # (High, Low) de las dos velas anteriores para los FVG
+        self.prev_bars = deque(maxlen=2)
+        # Pools EQH/EQL y última vela ya procesada por ellos (índice absoluto)
+        self.eqh = LiquidityBook('high', index_formed=True)
+        self.eql = LiquidityBook('low', index_formed=True)
+        self.liquidity_done = -1
+        # Estructura: (tramo alto ya roto, tramo bajo ya roto, dirección de la última ruptura)
+        self.structure = (False, False, 0)
+        self.structure_done = -1
+        # Zonas FVG/OB activas y última vela ya procesada por ellas
+        self.zones = ZoneTracker()
+        self.zones_done = -1
+        # {vela provisoria: (entradas, tracker después de ella, valores)} del
+        # update anterior: si las entradas no cambiaron no se recalcula
+        self.zone_cache = {}
+
+    def copy(self):
+        """
+        Foto para reemplazar la vela en formación. Los pools no se copian
+        (crecerían con la cantidad de grupos): update() marca los libros y
+        _rollback() deshace sólo sus cambios. Los trackers de zonas no se
+        modifican nunca (_update_zones copia antes de avanzar) y el resto es
+        de tamaño fijo.
+        """
+        out = copy.copy(self)
+        for name in ('ema_50', 'ema_200', 'atr', 'gain', 'loss', 'highs', 'lows', 'prev_bars'):
+            setattr(out, name, getattr(self, name).copy())
+        return out
+
+
+class IncrementalSMCAnalyzer:
+    """
+    Versión en streaming de SMCAnalyzer: mantiene el estado de las EMAs,
+    ATR, RSI, la ventana de confirmación de pivots, los pools de liquidez
+    (EQH/EQL), los FVG y las zonas activas, y procesa cada
+    vela nueva con update(bar) sin recorrer el histórico: el costo depende de
+    swing_length (filas provisorias que se recalculan) y de los pools / zonas
+    vivos que toca la vela, no del largo de la serie (del orden de 100 µs por
+    vela, también al reemplazar la vela en formación).
+
+    frame() devuelve lo mismo que SMCAnalyzer.analyze() sobre las mismas
+    velas. Los pivots se confirman `swing_length` velas después: con
+    pivot_mode="centered" (igual que la ventana centrada del batch) en ese
+    momento se corrigen las filas afectadas; con pivot_mode="confirmed" el
+    pivot se marca en la vela que lo confirma y las filas ya emitidas no
+    cambian nunca. Si llega una vela con el mismo timestamp que la última
+    (vela en formación) se reemplaza en vez de añadirse.
+    """
+    def __init__(self, swing_length=5, max_bars=1000, pivot_mode="centered"):
+        self.swing_length = swing_length
+        self.max_bars = max_bars
+        self.pivot_mode = pivot_mode
+        # Velas que las filas quedan provisorias (pivots aún sin confirmar)
+        self._lag = swing_length - pivot_lag(swing_length, pivot_mode)
+        self._rows = deque(maxlen=max_bars)
+        self._index = deque(maxlen=max_bars)
+        self._columns = None
+        self._index_name = 'Date'
+        self._state = _StreamState(swing_length)
+        self._count = 0
+        # Estado previo a la última vela, para poder reemplazarla
+        self._saved = None
+
+    @classmethod
+    def from_frame(cls, df, swing_length=5, max_bars=1000, pivot_mode="centered"):
+        """Crea el analizador y le pasa todas las velas de df."""
+        analyzer = cls(swing_length=swing_length, max_bars=max_bars, pivot_mode=pivot_mode)
+        analyzer.extend(df)
+        return analyzer
+
+    def extend(self, df):
+        """Procesa todas las velas de df en orden."""
+        if df is None or df.empty:
+            return None
+        self._index_name = df.index.name
+        row = None
+        for idx, bar in zip(df.index, df.to_dict('records')):
+            row = self.update(bar, index=idx)
+        return row
+
+    def update(self, bar, index=None):
+        """
+        Procesa una vela (dict o Series con Open/High/Low/Close y el resto de
+        columnas que se quieran conservar). Devuelve la fila analizada.
+        """
+        if isinstance(bar, pd.Series):
+            if index is None:
+                index = bar.name
+            bar = bar.to_dict()
+        if index is None:
+            index = bar.get('Date', self._count)
+
+        if self._columns is None:
+            self._columns = list(bar.keys())
+
+        if self._index and self._index[-1] == index and self._saved is not None:
+            self._rollback()
+
+        self._saved = (self._state.copy(), self._tail_copy())
+        self._state.eqh.mark()
+        self._state.eql.mark()
+        self._count += 1
+        row = self._process(dict(bar))
+        self._rows.append(row)
+        self._index.append(index)
+        self._confirm_pivots()
+        self._update_liquidity()
+        self._update_structure()
+        self._update_zones()
+        return row
+
+    def _tail_copy(self):
+        n = min(self.swing_length, len(self._rows))
+        return [dict(self._rows[-i]) for i in range(n, 0, -1)]
+
+    def _rollback(self):
+        state, tail = self._saved
+        # La foto comparte los libros de pools con el estado actual
+        state.eqh.rollback()
+        state.eql.rollback()
+        self._rows.pop()
+        self._index.pop()
+        self._count -= 1
+        for offset, row in enumerate(tail):
+            self._rows[len(self._rows) - len(tail) + offset] = row
+        self._state = state
+
+    def _process(self, row):
+        s = self._state
+        high, low, close = float(row['High']), float(row['Low']), float(row['Close'])
+
+        row['is_pivot_high'] = False
+        row['is_pivot_low'] = False
+
+        # EMAs
+        ema_50 = s.ema_50.update(close)
+        ema_200 = s.ema_200.update(close)
+        row['EMA_50'] = ema_50
+        row['EMA_200'] = ema_200
+
+        # ATR (14). Las primeras 13 velas se rellenan (bfill) en frame()
+        tr0 = abs(high - low)
+        tr1 = abs(high - s.prev_close)
+        tr2 = abs(low - s.prev_close)
+        tr = max(v for v in (tr0, tr1, tr2) if v == v)
+        row['tr0'], row['tr1'], row['tr2'], row['TR'] = tr0, tr1, tr2, tr
+        atr = s.atr.update(tr)
+        if atr == atr:
+            s.last_atr = atr
+            if s.first_atr != s.first_atr:
+                s.first_atr = atr
+        row['ATR'] = s.last_atr
+
+        # RSI (14). La primera diferencia es NaN y cuenta como 0 (igual que el batch)
+        delta = close - s.prev_close
+        gain = s.gain.update(delta if delta > 0 else 0.0)
+        loss = s.loss.update(-delta if delta < 0 else 0.0)
+        if loss == 0:
+            rs = math.inf if gain > 0 else math.nan
+        else:
+            rs = gain / loss
+        row['RSI'] = 100 - (100 / (1 + rs))
+        s.prev_close = close
+
+        # Niveles de pivots ya confirmados
+        row['last_pivot_high'] = s.last_pivot_high
+        row['last_pivot_low'] = s.last_pivot_low
+
+        if close > ema_50 and ema_50 > ema_200:
+            row['trend'] = 'BULLISH'
+        elif close < ema_50 and ema_50 < ema_200:
+            row['trend'] = 'BEARISH'
+        else:
+            row['trend'] = 'RANGING'
+
+        # Estructura: se completa en _update_structure
+        row['swing_high'] = ''
+        row['swing_low'] = ''
+        row['bos_bullish'] = False
+        row['bos_bearish'] = False
+        row['choch_bullish'] = False
+        row['choch_bearish'] = False
+        row['structure_bias'] = 'RANGING'
+
+        # Liquidez: se completa en _update_liquidity
+        row['has_liquidity_above'] = False
+        row['has_liquidity_below'] = False
+        row['liquidity_above'] = math.nan
+        row['liquidity_below'] = math.nan
+        row['sweep_above'] = False
+        row['sweep_below'] = False
+
+        # FVG contra la vela de hace 2
+        row['fvg_bullish'] = False
+        row['fvg_bearish'] = False
+        row['fvg_top'] = math.nan
+        row['fvg_bottom'] = math.nan
+        if len(s.prev_bars) == 2:
+            prev_high, prev_low = s.prev_bars[0]
+            if low > prev_high:
+                row['fvg_bullish'] = True
+                row['fvg_bottom'] = prev_high
+                row['fvg_top'] = low
+            if high < prev_low:
+                row['fvg_bearish'] = True
+                row['fvg_top'] = prev_low
+                row['fvg_bottom'] = high
+        s.prev_bars.append((high, low))
+
+        # Zonas activas: se completan en _update_zones
+        row['demand_top'] = math.nan
+        row['demand_bottom'] = math.nan
+        row['demand_kind'] = ''
+        row['demand_touch'] = False
+        row['supply_bottom'] = math.nan
+        row['supply_top'] = math.nan
+        row['supply_kind'] = ''
+        row['supply_touch'] = False
+
+        s.highs.append(high)
+        s.lows.append(low)
+        return row
+
+    def _confirm_pivots(self):
+        """
+        Con la ventana centrada completa decide si la vela central es pivot.
+        El pivot se marca en la vela central (centered, corrigiendo las filas
+        desde ella) o en la última (confirmed).
+        """
+        s = self._state
+        if len(s.highs) < s.highs.maxlen:
+            return
+        k = self.swing_length
+        if len(self._rows) <= k:
+            return
+        patched = self._lag + 1
+        target = self._rows[-patched]
+        if s.highs[k] == max(s.highs):
+            target['is_pivot_high'] = True
+            if s.last_pivot_high == s.last_pivot_high:
+                target['swing_high'] = 'HH' if s.highs[k] > s.last_pivot_high else 'LH'
+            s.last_pivot_high = s.highs[k]
+            for i in range(1, patched + 1):
+                self._rows[-i]['last_pivot_high'] = s.last_pivot_high
+        if s.lows[k] == min(s.lows):
+            target['is_pivot_low'] = True
+            if s.last_pivot_low == s.last_pivot_low:
+                target['swing_low'] = 'HL' if s.lows[k] > s.last_pivot_low else 'LL'
+            s.last_pivot_low = s.lows[k]
+            for i in range(1, patched + 1):
+                self._rows[-i]['last_pivot_low'] = s.last_pivot_low
+
+    def _row_at(self, bar):
+        """Fila por índice absoluto de vela (None si ya salió de max_bars)."""
+        pos = bar - (self._count - len(self._rows))
+        return self._rows[pos] if pos >= 0 else None
+
+    def _update_liquidity(self):
+        """
+        Los pools se alimentan con las velas cuyos pivots ya están confirmados
+        (y con ATR conocido, porque la tolerancia depende de él). Las últimas
+        velas se completan de forma provisional: sólo pueden barrer pools.
+        """
+        s = self._state
+        last = self._count - 1
+        ready = last - self._lag if s.first_atr == s.first_atr else -1
+        while s.liquidity_done < ready:
+            bar = s.liquidity_done + 1
+            s.liquidity_done = bar
+            row = self._row_at(bar)
+            if row is None:
+                continue
+            atr = row['ATR'] if row['ATR'] == row['ATR'] else s.first_atr
+            # En la fila de un pivot last_pivot_* es su precio (en los dos modos)
+            if row['is_pivot_high']:
+                s.eqh.add_pivot(bar, row['last_pivot_high'], atr)
+            if row['is_pivot_low']:
+                s.eql.add_pivot(bar, row['last_pivot_low'], atr)
+            row['sweep_above'] = bool(s.eqh.sweep(bar, row['High']))
+            row['sweep_below'] = bool(s.eql.sweep(bar, row['Low']))
+            row['liquidity_above'] = s.eqh.nearest()
+            row['liquidity_below'] = s.eql.nearest()
+            row['has_liquidity_above'] = row['liquidity_above'] == row['liquidity_above']
+            row['has_liquidity_below'] = row['liquidity_below'] == row['liquidity_below']
+
+        # Velas sin confirmar: un pool sigue vivo si su key >= máximo (con signo) desde entonces
+        run_high = run_low = -math.inf
+        for bar in range(s.liquidity_done + 1, last + 1):
+            row = self._row_at(bar)
+            if row is None:
+                continue
+            for book, probe, side, run in ((s.eqh, row['High'], 'above', run_high), (s.eql, -row['Low'], 'below', run_low)):
+                row['sweep_' + side] = book.nearest_key(run) < probe
+                run = max(run, probe)
+                row['liquidity_' + side] = book.nearest(run)
+                row['has_liquidity_' + side] = row['liquidity_' + side] == row['liquidity_' + side]
+                if side == 'above':
+                    run_high = run
+                else:
+                    run_low = run
+
+    @staticmethod
+    def _structure_step(state, row):
+        """Una vela de la máquina de estados BOS/CHoCH (ver analysis/structure.py)."""
+        high_broken, low_broken, direction = state
+        if row['is_pivot_high']:
+            high_broken = False
+        if row['is_pivot_low']:
+            low_broken = False
+        bull = not high_broken and row['Close'] > row['last_pivot_high']
+        bear = not low_broken and row['Close'] < row['last_pivot_low']
+        high_broken = high_broken or bull
+        low_broken = low_broken or bear
+        event = int(bull) - int(bear)
+        choch = event != 0 and direction != 0 and event != direction
+        bos = event != 0 and not choch
+        row['bos_bullish'] = bos and event > 0
+        row['bos_bearish'] = bos and event < 0
+        row['choch_bullish'] = choch and event > 0
+        row['choch_bearish'] = choch and event < 0
+        if event != 0:
+            direction = event
+        row['structure_bias'] = 'BULLISH' if direction > 0 else 'BEARISH' if direction < 0 else 'RANGING'
+        return high_broken, low_broken, direction
+
+    def _update_structure(self):
+        """
+        Las velas con pivots ya confirmados avanzan el estado definitivo; las
+        últimas (aún provisorias) se recalculan en cada update a partir de él.
+        """
+        s = self._state
+        last = self._count - 1
+        while s.structure_done < last - self._lag:
+            s.structure_done += 1
+            row = self._row_at(s.structure_done)
+            if row is not None:
+                s.structure = self._structure_step(s.structure, row)
+        state = s.structure
+        for bar in range(s.structure_done + 1, last + 1):
+            row = self._row_at(bar)
+            if row is not None:
+                state = self._structure_step(state, row)
+
+    @staticmethod
+    def _zone_inputs(row):
+        return (row['Open'], row['High'], row['Low'], row['Close'],
+                row['fvg_bullish'], row['fvg_bearish'], row['fvg_top'], row['fvg_bottom'],
+                row['bos_bullish'] or row['choch_bullish'], row['bos_bearish'] or row['choch_bearish'])
+
+    def _update_zones(self):
+        """
+        Igual que la estructura: las velas con rupturas ya definitivas avanzan
+        el registro y las últimas son provisorias. Cada paso trabaja sobre una
+        copia (O(1), el registro es persistente) y las velas provisorias del
+        update anterior se reusan mientras sus entradas no cambien: en general
+        sólo se procesa la vela nueva y, al confirmarse un pivot, las filas
+        que corrigió.
+        """
+        s = self._state
+        last = self._count - 1
+        ready = last - self._lag
+        cache, fresh = s.zone_cache, {}
+        tracker = s.zones
+        for bar in range(s.zones_done + 1, last + 1):
+            row = self._row_at(bar)
+            if row is not None:
+                inputs = self._zone_inputs(row)
+                hit = cache.get(bar)
+                if hit is not None and hit[0] == inputs:
+                    _inputs, tracker, values = hit
+                else:
+                    # Cambió esta vela: las siguientes del cache ya no valen
+                    cache = {}
+                    tracker = tracker.copy()
+                    values = tracker.step(bar, *inputs)
+                row.update(zip(ZONE_COLUMNS, values))
+                if bar > ready:
+                    fresh[bar] = (inputs, tracker, values)
+            if bar == ready:
+                s.zones = tracker
+        s.zones_done = max(s.zones_done, ready)
+        s.zone_cache = fresh
+
+    def latest(self):
+        """Última fila analizada (o None)."""
+        return self._rows[-1] if self._rows else None
+
+    def get_market_bias(self):
+        row = self.latest()
+        return row['trend'] if row else "NEUTRAL"
+
+    def frame(self):
+        """Velas retenidas (hasta max_bars) como DataFrame, con el formato de analyze()."""
+        if not self._rows:
+            return pd.DataFrame()
+        columns = self._columns + [c for c in ANALYSIS_COLUMNS if c not in self._columns]
+        df = pd.DataFrame(list(self._rows), index=pd.Index(list(self._index), name=self._index_name), columns=columns)
+        df['ATR'] = df['ATR'].ffill().bfill()
+        df['fvg_top'] = df['fvg_top'].astype(np.float64)
+        df['fvg_bottom'] = df['fvg_bottom'].astype(np.float64)
+        return df
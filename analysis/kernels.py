@@ -0,0 +1,241 @@
+"""
+Kernels NumPy de SMCAnalyzer.
+
+Trabajan directamente sobre los arrays OHLC (1-D, o 2-D con un instrumento
+por fila: todo opera sobre el último eje) y calculan las columnas de
+SMCAnalyzer.analyze (analysis/features.py las combina). Los NaN se propagan
+igual que en pandas, así que una fila rellenada con NaN a la izquierda da lo
+mismo que la serie sin relleno.
+"""
+import numpy as np
+
+from analysis.liquidity import LIQUIDITY_COLUMNS, identify_liquidity
+from analysis.zones import ZONE_COLUMNS, identify_zones
+
+# Tendencia como código int8 (ver trend_labels)
+TREND_BEARISH = -1
+TREND_RANGING = 0
+TREND_BULLISH = 1
+TREND_LABELS = np.array(['BEARISH', 'RANGING', 'BULLISH'])
+
+# Modos de pivot: "centered" marca el pivot en su vela (mira swing_length
+# velas hacia adelante); "confirmed" lo emite recién en la vela que cierra su
+# ventana derecha, así cada fila depende sólo de velas pasadas
+PIVOT_MODES = ('centered', 'confirmed')
+
+# Tope de (1-alpha)^-k dentro de un bloque del EMA: acota el error de redondeo
+_EMA_MAX_SCALE = 1e6
+
+
+def trend_labels(code):
+    """Códigos int8 de tendencia -> 'BULLISH' / 'BEARISH' / 'RANGING'."""
+    return TREND_LABELS[np.asarray(code, dtype=np.int8) + 1]
+
+
+def _decay_filter(x, decay):
+    """
+    y[t] = decay * y[t-1] + x[t] sobre el último eje, por bloques en forma
+    cerrada: dentro de cada bloque y = decay^j * cumsum(x * decay^-j), y el
+    arrastre entre bloques se propaga con un solo recorrido sobre los bloques.
+    El tamaño del bloque se limita para que decay^-j no pierda precisión.
+    """
+    n = x.shape[-1]
+    if n == 0:
+        return np.empty_like(x)
+    block = int(np.log(_EMA_MAX_SCALE) / -np.log(decay)) if decay < 1 else n
+    block = max(1, min(n, block))
+    n_blocks = -(-n // block)
+
+    padded = np.zeros(x.shape[:-1] + (n_blocks * block,))
+    padded[..., :n] = x
+    padded = padded.reshape(x.shape[:-1] + (n_blocks, block))
+
+    powers = decay ** np.arange(1, block + 1)
+    local = np.cumsum(padded / (powers / decay), axis=-1)
+    local *= powers / decay
+
+    # Valor acumulado al final de cada bloque
+    ends = local[..., -1]
+    carry = np.zeros(ends.shape)
+    scale = decay ** block
+    for b in range(1, n_blocks):
+        carry[..., b] = carry[..., b - 1] * scale + ends[..., b - 1]
+    local += carry[..., None] * powers
+    return local.reshape(x.shape[:-1] + (n_blocks * block,))[..., :n]
+
+
+def ema(x, span):
+    """
+    Equivalente a Series.ewm(span=span).mean() (adjust=True, ignore_na=False).
+    Numerador y denominador de la media ponderada salen del mismo filtro,
+    así los NaN no suman peso y la salida repite el último valor.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    decay = 1.0 - 2.0 / (span + 1.0)
+    valid = ~np.isnan(x)
+    num = _decay_filter(np.where(valid, x, 0.0), decay)
+    den = _decay_filter(valid.astype(np.float64), decay)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out = num / den
+    out[den == 0] = np.nan
+    return out
+
+
+def _rolling(x, window, ufunc, center=False):
+    """
+    Ventana deslizante completa (NaN si falta alguna vela, como
+    min_periods=window): `window` pasadas vectorizadas de ufunc sobre el
+    array desplazado, sin temporales por ventana.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full(x.shape, np.nan)
+    n = x.shape[-1]
+    if n < window:
+        return out
+    m = n - window + 1
+    acc = x[..., :m].copy()
+    for j in range(1, window):
+        ufunc(acc, x[..., j:j + m], out=acc)
+    offset = (window - 1) // 2 if center else window - 1
+    out[..., offset:offset + m] = acc
+    return out
+
+
+def rolling_max(x, window, center=False):
+    return _rolling(x, window, np.maximum, center)
+
+
+def rolling_min(x, window, center=False):
+    return _rolling(x, window, np.minimum, center)
+
+
+def rolling_mean(x, window):
+    return _rolling(x, window, np.add) / window
+
+
+def shift(x, periods=1):
+    """Series.shift sobre el último eje (rellena con NaN)."""
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full(x.shape, np.nan)
+    if periods < x.shape[-1]:
+        out[..., periods:] = x[..., :x.shape[-1] - periods]
+    return out
+
+
+def ffill(x):
+    """Series.ffill sobre el último eje."""
+    n = x.shape[-1]
+    idx = np.where(np.isnan(x), 0, np.arange(n))
+    np.maximum.accumulate(idx, axis=-1, out=idx)
+    return np.take_along_axis(x, idx, axis=-1)
+
+
+def bfill(x):
+    """Series.bfill sobre el último eje."""
+    return ffill(x[..., ::-1])[..., ::-1]
+
+
+def pivot_lag(swing_length, pivot_mode="centered"):
+    """Velas entre un pivot y la fila donde se marca (0 en modo centered)."""
+    if pivot_mode not in PIVOT_MODES:
+        raise ValueError(f"pivot_mode desconocido: {pivot_mode}")
+    return swing_length if pivot_mode == "confirmed" else 0
+
+
+def lag_flags(flags, periods):
+    """Desplaza booleanos `periods` velas hacia adelante (rellena con False)."""
+    out = np.zeros(flags.shape, dtype=bool)
+    n = flags.shape[-1]
+    if periods < n:
+        out[..., periods:] = flags[..., :n - periods]
+    return out
+
+
+def pivots(high, low, swing_length, pivot_mode="centered"):
+    """
+    Máximo/mínimo local en una ventana centrada de 2*swing_length+1 velas.
+    En modo confirmed el flag se emite swing_length velas después.
+    """
+    window = 2 * swing_length + 1
+    is_high = high == rolling_max(high, window, center=True)
+    is_low = low == rolling_min(low, window, center=True)
+    lag = pivot_lag(swing_length, pivot_mode)
+    if lag:
+        is_high, is_low = lag_flags(is_high, lag), lag_flags(is_low, lag)
+    return is_high, is_low
+
+
+def atr(high, low, close, window=14):
+    """True range y su media (ATR) con ffill/bfill dentro de la serie."""
+    prev_close = shift(close)
+    tr0 = np.abs(high - low)
+    tr1 = np.abs(high - prev_close)
+    tr2 = np.abs(low - prev_close)
+    tr = np.fmax(np.fmax(tr0, tr1), tr2)
+    atr_ = bfill(ffill(rolling_mean(tr, window)))
+    # El bfill no debe rellenar el padding de la izquierda (paneles)
+    atr_[np.isnan(close)] = np.nan
+    return tr0, tr1, tr2, tr, atr_
+
+
+def rsi(close, window=14):
+    """RSI con medias simples, igual que SMCAnalyzer (la primera diferencia cuenta como 0)."""
+    delta = close - shift(close)
+    padding = np.isnan(close)
+    gain = np.where(padding, np.nan, np.where(delta > 0, delta, 0.0))
+    loss = np.where(padding, np.nan, np.where(delta < 0, -delta, 0.0))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rs = rolling_mean(gain, window) / rolling_mean(loss, window)
+        return 100 - (100 / (1 + rs))
+
+
+def trend_code(close, ema_fast, ema_slow):
+    code = np.full(close.shape, TREND_RANGING, dtype=np.int8)
+    code[(close > ema_fast) & (ema_fast > ema_slow)] = TREND_BULLISH
+    code[(close < ema_fast) & (ema_fast < ema_slow)] = TREND_BEARISH
+    return code
+
+
+def fvgs(high, low):
+    """FVG alcista: Low[i] > High[i-2]. Bajista: High[i] < Low[i-2]."""
+    prev_high = shift(high, 2)
+    prev_low = shift(low, 2)
+    bullish = low > prev_high
+    bearish = high < prev_low
+    top = np.where(bullish, low, np.where(bearish, prev_low, np.nan))
+    bottom = np.where(bullish, prev_high, np.where(bearish, high, np.nan))
+    return bullish, bearish, top, bottom
+
+
+def liquidity(high, low, is_pivot_high, is_pivot_low, atr, last_pivot_high, last_pivot_low):
+    """Pools EQH/EQL (ver analysis/liquidity.py). En 2-D se resuelve fila por fila."""
+    if high.ndim == 1:
+        return identify_liquidity(high, low, is_pivot_high, is_pivot_low, atr,
+                                  last_pivot_high=last_pivot_high, last_pivot_low=last_pivot_low)[0]
+    out = {}
+    for row in range(high.shape[0]):
+        cols = identify_liquidity(high[row], low[row], is_pivot_high[row], is_pivot_low[row], atr[row],
+                                  last_pivot_high=last_pivot_high[row], last_pivot_low=last_pivot_low[row])[0]
+        for name in LIQUIDITY_COLUMNS:
+            if name not in out:
+                out[name] = np.empty(high.shape, dtype=cols[name].dtype)
+            out[name][row] = cols[name]
+    return out
+
+
+def zones(open_, high, low, close, features):
+    """Zonas activas FVG/OB (ver analysis/zones.py). En 2-D se resuelve fila por fila."""
+    args = (open_, high, low, close, features['fvg_bullish'], features['fvg_bearish'],
+            features['fvg_top'], features['fvg_bottom'],
+            features['bos_bullish'] | features['choch_bullish'],
+            features['bos_bearish'] | features['choch_bearish'])
+    if high.ndim == 1:
+        return identify_zones(*args)[0]
+    out = {}
+    for row in range(high.shape[0]):
+        cols = identify_zones(*(a[row] for a in args))[0]
+        for name in ZONE_COLUMNS:
+            if name not in out:
+                out[name] = np.empty(high.shape, dtype=cols[name].dtype)
+            out[name][row] = cols[name]
+    return out
@@ -0,0 +1,339 @@
+"""
+Pools de liquidez: Equal Highs (EQH) y Equal Lows (EQL).
+
+Los pivots se procesan en orden temporal. Cada pivot se une al grupo vivo de
+precio más cercano si está dentro de la tolerancia (una fracción del ATR de
+esa vela); si no, abre un grupo nuevo. Un grupo con dos o más pivots es un
+pool desde la vela de su segundo pivot. Un grupo se considera barrido cuando
+una vela posterior a su último pivot opera más allá de su nivel (High >
+nivel para EQH, Low < nivel para EQL).
+
+Los grupos vivos se guardan ordenados por precio (LiquidityBook), así que
+buscar el grupo más cercano es una búsqueda binaria y los barridos son
+siempre un prefijo de esa lista: todo el proceso es O(n log n).
+"""
+import bisect
+import math
+
+import numpy as np
+
+# Tolerancia para considerar dos pivots "iguales", en ATRs
+LIQUIDITY_TOLERANCE_ATR = 0.1
+
+# Columnas por vela que añade el análisis de liquidez
+LIQUIDITY_COLUMNS = [
+    'has_liquidity_above', 'has_liquidity_below',
+    'liquidity_above', 'liquidity_below',
+    'sweep_above', 'sweep_below',
+]
+
+
+class LiquidityBook:
+    """
+    Grupos de pivots a igual precio aún no barridos, ordenados por precio.
+    side='high' para EQH, side='low' para EQL. Internamente los niveles se
+    guardan como key = signo * nivel, así en los dos lados "barrido" es
+    key < signo * precio de la vela. Con index_formed=True (streaming) se
+    mantiene además `formed`, las keys de los grupos ya formados (pools)
+    ordenadas, y el pool más cercano es un bisect en vez de recorrer grupos.
+    """
+    def __init__(self, side, tolerance_atr=LIQUIDITY_TOLERANCE_ATR, index_formed=False):
+        self.side = side
+        self.sign = 1.0 if side == 'high' else -1.0
+        self.tolerance_atr = tolerance_atr
+        self.keys = []
+        self.groups = []
+        self.formed = [] if index_formed else None
+        # Registro de deshacer desde mark() (None = no se registra)
+        self._undo = None
+
+    def copy(self):
+        out = LiquidityBook(self.side, self.tolerance_atr, self.formed is not None)
+        out.groups = [dict(g) for g in self.groups]
+        out.keys = list(self.keys)
+        if self.formed is not None:
+            out.formed = list(self.formed)
+        return out
+
+    def mark(self):
+        """
+        Empieza a registrar los cambios para poder volver a este punto con
+        rollback() (streaming: reemplazo de la vela en formación). El costo
+        es proporcional a los cambios, no a la cantidad de grupos.
+        """
+        self._undo = []
+
+    def rollback(self):
+        """Deshace los cambios desde el último mark()."""
+        for op, *args in reversed(self._undo or []):
+            if op == 'insert':
+                i, j = args
+                del self.keys[i]
+                del self.groups[i]
+                if j is not None:
+                    del self.formed[j]
+            elif op == 'remove':
+                i, j, group = args
+                self.keys.insert(i, group['key'])
+                self.groups.insert(i, group)
+                if j is not None:
+                    self.formed.insert(j, group['key'])
+            elif op == 'sweep':
+                swept, before, formed = args
+                for group, old in zip(swept, before):
+                    group['swept'] = old
+                self.keys[:0] = [group['key'] for group in swept]
+                self.groups[:0] = swept
+                if formed:
+                    self.formed[:0] = formed
+            else:
+                group, old = args
+                group.clear()
+                group.update(old)
+        self._undo = None
+
+    def _insert(self, group):
+        key = group['key']
+        i = bisect.bisect_right(self.keys, key)
+        self.keys.insert(i, key)
+        self.groups.insert(i, group)
+        j = None
+        if self.formed is not None and group['formed'] is not None:
+            j = bisect.bisect_right(self.formed, key)
+            self.formed.insert(j, key)
+        if self._undo is not None:
+            self._undo.append(('insert', i, j))
+
+    def _remove(self, i):
+        del self.keys[i]
+        group = self.groups.pop(i)
+        j = None
+        if self.formed is not None and group['formed'] is not None:
+            j = bisect.bisect_left(self.formed, group['key'])
+            del self.formed[j]
+        if self._undo is not None:
+            self._undo.append(('remove', i, j, group))
+        return group
+
+    def add_pivot(self, bar, price, atr, alive=None):
+        """
+        Une el pivot al grupo más cercano dentro de la tolerancia o abre uno
+        nuevo. `alive(grupo, bar)` permite descartar grupos barridos que
+        todavía estén en la lista (cálculo batch). Devuelve el grupo.
+        """
+        probe = self.sign * price
+        tol = self.tolerance_atr * atr if atr == atr else 0.0
+        while True:
+            i = bisect.bisect_left(self.keys, probe)
+            best = None
+            for j in (i - 1, i):
+                if 0 <= j < len(self.keys):
+                    dist = abs(self.keys[j] - probe)
+                    if dist <= tol and (best is None or dist < best[0]):
+                        best = (dist, j)
+            if best is None:
+                break
+            if alive is not None and not alive(self.groups[best[1]], bar):
+                self._remove(best[1])
+                continue
+            group = self._remove(best[1])
+            if self._undo is not None:
+                self._undo.append(('update', group, dict(group)))
+            previous = group['key']
+            group['key'] = max(previous, probe)
+            group['count'] += 1
+            group['last'] = bar
+            if group['count'] == 2:
+                group['formed'] = bar
+                group['levels'] = [(bar, group['key'])]
+            elif group['key'] != previous:
+                group['levels'] = group['levels'] + [(bar, group['key'])]
+            self._insert(group)
+            return group
+
+        group = {'key': probe, 'count': 1, 'first': bar, 'last': bar, 'formed': None, 'swept': None}
+        self._insert(group)
+        return group
+
+    def sweep(self, bar, price):
+        """Quita los grupos barridos por la vela. Devuelve los pools (>= 2 pivots) barridos."""
+        probe = self.sign * price
+        i = bisect.bisect_left(self.keys, probe)
+        swept = self.groups[:i]
+        if not swept:
+            return []
+        del self.keys[:i]
+        del self.groups[:i]
+        formed = []
+        if self.formed is not None:
+            j = bisect.bisect_left(self.formed, probe)
+            formed = self.formed[:j]
+            del self.formed[:j]
+        if self._undo is not None:
+            self._undo.append(('sweep', swept, [group['swept'] for group in swept], formed))
+        for group in swept:
+            group['swept'] = bar
+        return [g for g in swept if g['formed'] is not None]
+
+    def nearest_key(self, min_key=-math.inf):
+        """key del pool formado más cercano con key >= min_key (inf si no hay)."""
+        if self.formed is not None:
+            j = bisect.bisect_left(self.formed, min_key)
+            return self.formed[j] if j < len(self.formed) else math.inf
+        for i in range(bisect.bisect_left(self.keys, min_key), len(self.keys)):
+            if self.groups[i]['formed'] is not None:
+                return self.keys[i]
+        return math.inf
+
+    def nearest(self, min_key=-math.inf):
+        """Nivel del pool formado más cercano al precio (con key >= min_key), o NaN."""
+        key = self.nearest_key(min_key)
+        return self.sign * key if key != math.inf else math.nan
+
+
+class _RangeMax:
+    """
+    Máximo de values[a:b] en O(1): bloques de 64 velas y una sparse table
+    sobre los máximos de bloque (n/64 * log(n/64) floats, no n * log n).
+    """
+    BLOCK = 64
+
+    def __init__(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        n = len(values)
+        n_blocks = max(1, -(-n // self.BLOCK))
+        padded = np.full(n_blocks * self.BLOCK, -np.inf)
+        padded[:n] = values
+        level = padded.reshape(n_blocks, self.BLOCK).max(axis=1)
+        self.values = values.tolist()
+        self.n = n
+        self.n_blocks = n_blocks
+        self.table = [level.tolist()]
+        width = 1
+        while 2 * width <= n_blocks:
+            level = np.maximum(level[:-width], level[width:])
+            self.table.append(level.tolist())
+            width *= 2
+
+    def _blocks(self, first, last):
+        # Máximo de los bloques first..last (inclusive)
+        k = (last - first + 1).bit_length() - 1
+        row = self.table[k]
+        return max(row[first], row[last - (1 << k) + 1])
+
+    def query(self, a, b):
+        if b <= a:
+            return -math.inf
+        B = self.BLOCK
+        first, last = a // B, (b - 1) // B
+        if first == last:
+            return max(self.values[a:b])
+        out = max(max(self.values[a:(first + 1) * B]), max(self.values[last * B:b]))
+        if last - first > 1:
+            out = max(out, self._blocks(first + 1, last - 1))
+        return out
+
+    def first_above(self, start, key):
+        """Primer índice >= start con values > key (o None)."""
+        if start >= self.n:
+            return None
+        B = self.BLOCK
+        block = start // B
+        for i in range(start, min(self.n, (block + 1) * B)):
+            if self.values[i] > key:
+                return i
+        # Saltos de 2^k bloques mientras el tramo entero quede <= key
+        pos = block + 1
+        for k in range(len(self.table) - 1, -1, -1):
+            if pos + (1 << k) <= self.n_blocks and self.table[k][pos] <= key:
+                pos += 1 << k
+        if pos >= self.n_blocks:
+            return None
+        for i in range(pos * B, min(self.n, (pos + 1) * B)):
+            if self.values[i] > key:
+                return i
+        return None
+
+
+def find_pools(values, is_pivot, atr, side, tolerance_atr=LIQUIDITY_TOLERANCE_ATR, pivot_values=None):
+    """
+    Pools de un lado ('high' con los Highs y pivots altos, 'low' con los Lows
+    y pivots bajos). Devuelve una lista de dicts con level, count, formed,
+    last y swept (índices de vela; swept None si sigue vivo). pivot_values
+    es el precio de cada pivot en la fila donde se marca (por defecto values;
+    con pivots confirmados, el last_pivot de esa fila).
+    """
+    book = LiquidityBook(side, tolerance_atr)
+    signed = book.sign * np.asarray(values, dtype=np.float64)
+    ranges = _RangeMax(signed)
+    # Acceso escalar con listas de Python: mucho más rápido que indexar arrays
+    signed_list = ranges.values
+    atr_list = np.asarray(atr, dtype=np.float64).tolist()
+    pivot_list = signed_list if pivot_values is None else (book.sign * np.asarray(pivot_values, dtype=np.float64)).tolist()
+
+    def alive(group, bar):
+        # Sin velas más allá del nivel desde su último pivot
+        return not ranges.query(group['last'] + 1, bar) > group['key']
+
+    groups = []
+    for bar in np.flatnonzero(is_pivot).tolist():
+        group = book.add_pivot(bar, book.sign * pivot_list[bar], atr_list[bar], alive=alive)
+        if group['count'] == 1:
+            groups.append(group)
+
+    pools = []
+    for group in groups:
+        if group['formed'] is None:
+            continue
+        pools.append({
+            'side': 'EQH' if side == 'high' else 'EQL',
+            'level': float(book.sign * group['key']),
+            # (vela, nivel) desde que se formó: un pivot más extremo mueve el nivel
+            'levels': [(bar, float(book.sign * key)) for bar, key in group['levels']],
+            'count': group['count'],
+            'formed': group['formed'],
+            'last': group['last'],
+            'swept': ranges.first_above(group['last'] + 1, group['key']),
+        })
+    return pools
+
+
+def pool_columns(pools, n, side):
+    """
+    Columnas por vela de un lado: hay pool activo, nivel del más cercano y
+    si la vela barre alguno. Un pool está activo en [formed, swept).
+    """
+    sign = 1.0 if side == 'high' else -1.0
+    active = np.zeros(n + 1, dtype=np.int64)
+    nearest = np.full(n, np.nan)
+    swept = np.zeros(n, dtype=bool)
+    segments = []
+    for pool in pools:
+        end = pool['swept'] if pool['swept'] is not None else n
+        active[pool['formed']] += 1
+        active[end] -= 1
+        if pool['swept'] is not None:
+            swept[pool['swept']] = True
+        bounds = [bar for bar, _ in pool['levels'][1:]] + [end]
+        for (start, level), stop in zip(pool['levels'], bounds):
+            segments.append((start, stop, level))
+    # Del más lejano al más cercano: el último que se escribe es el más cercano
+    for start, stop, level in sorted(segments, key=lambda seg: -sign * seg[2]):
+        nearest[start:stop] = level
+    return np.cumsum(active[:n]) > 0, nearest, swept
+
+
+def identify_liquidity(high, low, is_pivot_high, is_pivot_low, atr, tolerance_atr=LIQUIDITY_TOLERANCE_ATR,
+                       last_pivot_high=None, last_pivot_low=None):
+    """
+    Columnas de LIQUIDITY_COLUMNS (arrays 1-D) y la lista de pools EQH + EQL.
+    Con pivots confirmados hay que pasar last_pivot_high/last_pivot_low (el
+    precio del pivot no es el High/Low de la fila donde se marca).
+    """
+    n = len(high)
+    eqh = find_pools(high, is_pivot_high, atr, 'high', tolerance_atr, pivot_values=last_pivot_high)
+    eql = find_pools(low, is_pivot_low, atr, 'low', tolerance_atr, pivot_values=last_pivot_low)
+    cols = {}
+    cols['has_liquidity_above'], cols['liquidity_above'], cols['sweep_above'] = pool_columns(eqh, n, 'high')
+    cols['has_liquidity_below'], cols['liquidity_below'], cols['sweep_below'] = pool_columns(eql, n, 'low')
+    return {name: cols[name] for name in LIQUIDITY_COLUMNS}, eqh + eql
@@ -0,0 +1,63 @@
+"""
+Análisis SMC de un universo completo en un solo paso vectorizado.
+
+Cada instrumento es una fila de una matriz (instrumento x vela) alineada a
+la derecha: la última columna es la última vela de cada uno y las series más
+cortas se rellenan con NaN a la izquierda. Los kernels de analysis/kernels.py
+operan sobre el último eje, así que pivots, EMAs, ATR, RSI, FVG, zonas y tendencia
+salen para todos los instrumentos a la vez.
+"""
+import numpy as np
+
+from analysis import kernels
+from analysis.features import analyze_arrays
+
+
+def stack_frames(frames, max_bars=None):
+    """
+    {ticker: df} -> (tickers, open, high, low, close) como matrices 2-D.
+    Los tickers sin datos quedan fuera. max_bars recorta a las últimas N velas.
+    """
+    tickers = [t for t, df in frames.items() if df is not None and not df.empty]
+    if not tickers:
+        empty = np.empty((0, 0))
+        return [], empty, empty, empty, empty
+
+    width = max(len(frames[t]) for t in tickers)
+    if max_bars:
+        width = min(width, max_bars)
+
+    panel = np.full((4, len(tickers), width), np.nan)
+    for row, ticker in enumerate(tickers):
+        df = frames[ticker]
+        for k, col in enumerate(('Open', 'High', 'Low', 'Close')):
+            values = df[col].to_numpy(dtype=np.float64)[-width:]
+            panel[k, row, width - len(values):] = values
+    return tickers, panel[0], panel[1], panel[2], panel[3]
+
+
+def analyze_panel(frames, swing_length=5, max_bars=None, pivot_mode="centered", features=None):
+    """
+    Columnas de SMCAnalyzer.analyze para todo el universo (sólo las de
+    `features` y sus dependencias si se indica).
+    Devuelve (tickers, {columna: matriz instrumento x vela}).
+    """
+    tickers, open_, high, low, close = stack_frames(frames, max_bars=max_bars)
+    if not tickers:
+        return [], {}
+    return tickers, analyze_arrays(high, low, close, swing_length=swing_length, open_=open_,
+                                   pivot_mode=pivot_mode, features=features)
+
+
+def panel_bias(frames, swing_length=5, max_bars=None, pivot_mode="centered"):
+    """
+    Sesgo de la última vela por instrumento ({ticker: 'BULLISH'/'BEARISH'/'RANGING'}).
+    Los tickers sin datos devuelven "NEUTRAL", igual que get_market_bias.
+    """
+    tickers, features = analyze_panel(frames, swing_length=swing_length, max_bars=max_bars,
+                                      pivot_mode=pivot_mode, features=['trend'])
+    bias = {ticker: "NEUTRAL" for ticker in frames}
+    if tickers:
+        labels = kernels.trend_labels(features['trend'][:, -1])
+        bias.update(zip(tickers, labels.tolist()))
+    return bias
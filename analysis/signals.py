@@ -0,0 +1,269 @@
+"""
+Señales históricas: las reglas de InstitutionalBot._find_setup aplicadas a
+todas las velas de un frame analizado a la vez (máscaras numpy en vez de la
+cadena de ifs sobre df.iloc[-1]).
+
+El resultado coincide vela a vela con llamar a _find_setup sobre cada
+prefijo del mismo frame analizado, incluidas sus particularidades:
+- El retesteo de pivots gana a todo y sale sin filtro RSI ni duración
+  (duration 0) y con la penalización HTF de 0.8.
+- El rebote en EMA 50 pisa al setup de FVG / zona de la misma vela.
+- prob se trunca con int() al penalizar por desalineación HTF.
+- El rango (scalping) no pasa por los filtros RSI/HTF/sesión.
+Donde el escalar falla (ATR NaN con un setup que no es de pivots, sólo en
+frames de menos de 14 velas) sl/tp quedan NaN y duration 0.
+
+Uso:
+    out = find_setups(df, pip_f=10000.0, htf_bias="BULLISH")
+    out['signal']  # 1 BUY, -1 SELL, 0 sin señal
+"""
+import numpy as np
+
+# Parámetros de las reglas (los usan _find_setup y find_setups). Las
+# probabilidades son (killzone, sesión Londres/NY, fuera de sesión).
+# zone_entries habilita la entrada por reacción en zona activa (apagada por
+# defecto: cambia las señales del escáner).
+SETUP_PARAMS = {
+    'proximity_pips': 30,
+    'ema_distance_pips': 15,
+    'pivot_sl_atr': 1.2,
+    'pivot_tp_atr': 3.0,
+    'pivot_prob': (88, 82, 72),
+    'fvg_sl_atr': 1.0,
+    'fvg_tp_atr': 2.5,
+    'fvg_prob': (84, 78, 68),
+    'zone_entries': False,
+    'zone_sl_atr': 1.0,
+    'zone_tp_atr': 2.5,
+    'zone_prob': (86, 80, 70),
+    'ema_sl_atr': 1.2,
+    'ema_tp_atr': 2.4,
+    'ema_prob': (80, 74, 64),
+    'range_sl_atr': 1.0,
+    'range_tp_atr': 2.2,
+    'range_prob': 72,
+    'rsi_overbought': 70,
+    'rsi_oversold': 30,
+    'prob_floor': 60,
+    'pivot_htf_penalty': 0.8,
+    'htf_penalty': 0.85,
+}
+
+# Códigos de 'rule' y 'filter' en el resultado
+RULES = ('', 'pivot', 'fvg', 'zone', 'ema', 'range')
+FILTERS = ('', 'atr_low', 'htf_mismatch', 'session_off', 'rsi_extreme', 'no_setup')
+
+REASONS = {
+    ('pivot', 1): "SMC: Retesteo de Zona de Demanda (Order Block)",
+    ('pivot', -1): "SMC: Retesteo de Zona de Oferta (Order Block)",
+    ('fvg', 1): "FVG: Rebalanceo de Imbalance Alcista",
+    ('fvg', -1): "FVG: Rebalanceo de Imbalance Bajista",
+    ('zone', 1): "Zona: Reacción en Demanda activa ({kind})",
+    ('zone', -1): "Zona: Reacción en Oferta activa ({kind})",
+    ('ema', 1): "Trend: Rebote Dinámico en EMA 50",
+    ('ema', -1): "Trend: Rechazo Dinámico en EMA 50",
+    ('range', 1): "Rango: Rebote en Soporte (Scalping)",
+    ('range', -1): "Rango: Rechazo en Resistencia (Scalping)",
+}
+
+_BIAS_CODES = {'BEARISH': -1, 'RANGING': 0, 'BULLISH': 1}
+# Código de sesgos que no coinciden con ninguno (None / 'NEUTRAL')
+_NO_BIAS = 9
+
+
+def bias_codes(bias, n=None):
+    """Etiquetas de sesgo (escalar o por vela) -> códigos int8 (BEARISH -1, RANGING 0, BULLISH 1)."""
+    if bias is None or isinstance(bias, str):
+        code = _BIAS_CODES.get(bias, _NO_BIAS)
+        return np.full(n, code, dtype=np.int8) if n is not None else np.int8(code)
+    labels = np.asarray(bias, dtype=object)
+    codes = np.full(labels.shape, _NO_BIAS, dtype=np.int8)
+    for label, code in _BIAS_CODES.items():
+        codes[labels == label] = code
+    return codes
+
+
+def _column(df, name, default, dtype=np.float64):
+    if name not in df.columns:
+        return np.full(len(df), default, dtype=dtype)
+    return df[name].to_numpy(dtype=dtype, na_value=default if dtype is bool else np.nan)
+
+
+def find_setups(df, pip_f, htf_bias=None, min_atr=0.0, strict=False, params=None):
+    """
+    Setups de cada vela de un frame analizado por SMCAnalyzer. htf_bias es
+    una etiqueta o un array por vela; el sesgo de cada vela es df['trend'].
+    min_atr (pips) y strict son los de _find_setup para el timeframe (strict
+    sólo aplica en 5m/15m). Devuelve el dict de setup_arrays.
+    """
+    n = len(df)
+    return setup_arrays(
+        close=_column(df, 'Close', np.nan),
+        atr=_column(df, 'ATR', 0.0),
+        rsi=_column(df, 'RSI', 50.0),
+        ema_50=_column(df, 'EMA_50', 0.0),
+        last_pivot_high=_column(df, 'last_pivot_high', np.nan),
+        last_pivot_low=_column(df, 'last_pivot_low', np.nan),
+        fvg_bullish=_column(df, 'fvg_bullish', False, bool),
+        fvg_bearish=_column(df, 'fvg_bearish', False, bool),
+        fvg_top=_column(df, 'fvg_top', np.nan),
+        fvg_bottom=_column(df, 'fvg_bottom', np.nan),
+        demand_touch=_column(df, 'demand_touch', False, bool),
+        demand_bottom=_column(df, 'demand_bottom', np.nan),
+        supply_touch=_column(df, 'supply_touch', False, bool),
+        supply_top=_column(df, 'supply_top', np.nan),
+        in_session=_column(df, 'is_london', False, bool) | _column(df, 'is_ny', False, bool),
+        in_kz=_column(df, 'is_killzone', False, bool),
+        bias=bias_codes(df['trend'].to_numpy(), n) if 'trend' in df.columns else np.full(n, _NO_BIAS, dtype=np.int8),
+        htf_bias=bias_codes(htf_bias, n),
+        pip_f=pip_f, min_atr=min_atr, strict=strict, params=params,
+    )
+
+
+def setup_arrays(close, atr, rsi, ema_50, last_pivot_high, last_pivot_low,
+                 fvg_bullish, fvg_bearish, fvg_top, fvg_bottom,
+                 demand_touch, demand_bottom, supply_touch, supply_top,
+                 in_session, in_kz, bias, htf_bias, pip_f, min_atr=0.0, strict=False, params=None):
+    """
+    Núcleo de find_setups sobre arrays 1-D (bias/htf_bias en códigos de
+    bias_codes). Devuelve {'signal' (int8: 1 BUY, -1 SELL, 0), 'entry', 'sl',
+    'tp' (NaN sin señal), 'prob' (int16), 'duration' (int8, 0 sin duración),
+    'rule' (int8, índice de RULES), 'filter' (int8, índice de FILTERS; 0 si
+    hay señal)}.
+    """
+    p = SETUP_PARAMS if params is None else params
+    n = len(close)
+    bull = bias == 1
+    bear = bias == -1
+    mismatch = htf_bias != bias
+    any_session = in_session | in_kz
+
+    def tier(probs):
+        kz, session, other = probs
+        return np.where(in_kz, kz, np.where(in_session, session, other))
+
+    def penalize(prob, factor):
+        return np.where(mismatch, np.maximum(p['prob_floor'], np.trunc(prob * factor)), prob)
+
+    def strict_filter():
+        out = np.zeros(n, dtype=np.int8)
+        if strict:
+            out[~any_session] = FILTERS.index('session_off')
+            out[mismatch] = FILTERS.index('htf_mismatch')
+        return out
+
+    prox = p['proximity_pips']
+    with np.errstate(invalid='ignore'):
+        atr_low = (min_atr > 0) & (atr * pip_f < min_atr)
+        dist_low = (close - last_pivot_low) * pip_f
+        dist_high = (last_pivot_high - close) * pip_f
+        near_low = (dist_low > 0) & (dist_low < prox)
+        near_high = (dist_high > 0) & (dist_high < prox)
+        dist_ema = np.abs(close - ema_50) * pip_f
+        ema_near = (ema_50 != 0) & (dist_ema < p['ema_distance_pips'])
+
+    # 1. Retesteo del último pivot a favor de la tendencia (sale directo)
+    pivot_buy = bull & near_low
+    pivot_sell = bear & near_high
+    pivot = pivot_buy | pivot_sell
+    pivot_sl = np.where(pivot_buy, last_pivot_low - atr * p['pivot_sl_atr'], last_pivot_high + atr * p['pivot_sl_atr'])
+    pivot_tp = np.where(pivot_buy, close + atr * p['pivot_tp_atr'], close - atr * p['pivot_tp_atr'])
+    pivot_prob = penalize(tier(p['pivot_prob']), p['pivot_htf_penalty'])
+
+    # 2. FVG, zona activa tocada y rebote en EMA 50 (el EMA pisa a los otros)
+    fvg_buy = bull & fvg_bullish
+    fvg_sell = bear & fvg_bearish
+    fvg = fvg_buy | fvg_sell
+    zone_on = bool(p['zone_entries'])
+    zone_buy = zone_on & ~fvg & bull & demand_touch & ~np.isnan(demand_bottom)
+    zone_sell = zone_on & ~fvg & bear & supply_touch & ~np.isnan(supply_top)
+    ema_buy = ema_near & bull & (close > ema_50)
+    ema_sell = ema_near & bear & (close < ema_50)
+    ema = ema_buy | ema_sell
+    zone = (zone_buy | zone_sell) & ~ema
+    fvg = fvg & ~ema
+    trend_buy = np.where(ema, ema_buy, fvg_buy | zone_buy)
+    trend = fvg | zone | ema
+
+    trend_sl = np.select(
+        [ema_buy, ema_sell, zone & zone_buy, zone & zone_sell, fvg_buy],
+        [ema_50 - atr * p['ema_sl_atr'], ema_50 + atr * p['ema_sl_atr'],
+         demand_bottom - atr * p['zone_sl_atr'], supply_top + atr * p['zone_sl_atr'],
+         fvg_bottom - atr * p['fvg_sl_atr']],
+        fvg_top + atr * p['fvg_sl_atr'])
+    tp_atr = np.select([ema, zone], [p['ema_tp_atr'], p['zone_tp_atr']], p['fvg_tp_atr'])
+    trend_tp = np.where(trend_buy, close + atr * tp_atr, close - atr * tp_atr)
+    trend_prob = penalize(np.select([ema, zone], [tier(p['ema_prob']), tier(p['zone_prob'])], tier(p['fvg_prob'])),
+                          p['htf_penalty'])
+    trend_filter = strict_filter()
+    with np.errstate(invalid='ignore'):
+        rsi_extreme = np.where(trend_buy, rsi > p['rsi_overbought'], rsi < p['rsi_oversold'])
+    trend_filter[rsi_extreme] = FILTERS.index('rsi_extreme')
+
+    # 3. Rango: rechazo en el último high / rebote en el último low
+    ranging = bias == 0
+    with np.errstate(invalid='ignore'):
+        range_sell = ranging & (rsi > 50) & near_high
+        range_buy = ranging & ~range_sell & (rsi < 50) & near_low
+    rng = range_sell | range_buy
+    range_sl = np.where(range_buy, last_pivot_low - atr * p['range_sl_atr'], last_pivot_high + atr * p['range_sl_atr'])
+    range_tp = np.where(range_buy, close + atr * p['range_tp_atr'], close - atr * p['range_tp_atr'])
+
+    # Cascada: filtro ATR > pivots > tendencia > rango
+    trend = trend & ~pivot
+    rng = rng & ~pivot & ~trend
+    rule = np.select([pivot, trend & ema, trend & zone, trend, rng],
+                     [RULES.index('pivot'), RULES.index('ema'), RULES.index('zone'),
+                      RULES.index('fvg'), RULES.index('range')], 0).astype(np.int8)
+    rule[atr_low] = 0
+    filt = np.select([atr_low, pivot, trend, rng], [FILTERS.index('atr_low'), strict_filter(), trend_filter, 0],
+                     FILTERS.index('no_setup')).astype(np.int8)
+    active = (rule > 0) & (filt == 0)
+
+    buy = np.select([pivot, trend], [pivot_buy, trend_buy], range_buy)
+    sl = np.select([pivot, trend], [pivot_sl, trend_sl], range_sl)
+    tp = np.select([pivot, trend], [pivot_tp, trend_tp], range_tp)
+    prob = np.select([pivot, trend], [pivot_prob, trend_prob], p['range_prob'])
+
+    # Duración estimada (velas hasta el TP a 0.7 ATR por vela), salvo pivots
+    with np.errstate(invalid='ignore', divide='ignore'):
+        bars = np.abs(tp - close) / np.maximum(1e-9, 0.7 * atr)
+        duration = np.clip(np.rint(np.nan_to_num(bars, nan=0.0)), 1, 5)
+    duration[pivot | np.isnan(bars)] = 0
+
+    signal = np.where(active, np.where(buy, 1, -1), 0).astype(np.int8)
+    return {
+        'signal': signal,
+        'entry': np.where(active, close, np.nan),
+        'sl': np.where(active, sl, np.nan),
+        'tp': np.where(active, tp, np.nan),
+        'prob': np.where(active, prob, 0).astype(np.int16),
+        'duration': np.where(active, duration, 0).astype(np.int8),
+        'rule': rule,
+        'filter': np.where(active, 0, filt).astype(np.int8),
+    }
+
+
+def setup_at(out, i, df=None):
+    """
+    (setup, filter_reason) de la vela i con el formato de _find_setup. df
+    (el frame analizado) sólo hace falta para el tipo de zona del motivo.
+    """
+    signal = int(out['signal'][i])
+    if not signal:
+        return None, FILTERS[out['filter'][i]]
+    rule = RULES[out['rule'][i]]
+    kind = ''
+    if rule == 'zone' and df is not None:
+        kind = df['demand_kind' if signal == 1 else 'supply_kind'].iloc[i]
+    setup = {
+        'type': 'BUY' if signal == 1 else 'SELL',
+        'entry': float(out['entry'][i]),
+        'sl': float(out['sl'][i]),
+        'tp': float(out['tp'][i]),
+        'prob': int(out['prob'][i]),
+        'reason': REASONS[(rule, signal)].format(kind=kind),
+    }
+    if out['duration'][i]:
+        setup['duration'] = int(out['duration'][i])
+    return setup, None
@@ -1,17 +1,92 @@
 import pandas as pd
 import numpy as np
+from analysis import kernels
+from analysis.features import analyze_arrays, columns
+from analysis.panel import panel_bias
+from analysis.liquidity import identify_liquidity
+from analysis.structure import (market_structure, swing_labels,
+                                SWING_HIGH_LABELS, SWING_LOW_LABELS)
+from analysis.zones import identify_zones
+
+# Columnas auxiliares del cálculo de ATR (no se usan fuera de _identify_structure)
+SCRATCH_COLUMNS = ['tr0', 'tr1', 'tr2', 'TR']
+
+# Booleanos que el modo compacto empaqueta en una sola columna de bits ('flags')
+COMPACT_FLAGS = [
+    'is_pivot_high', 'is_pivot_low',
+    'has_liquidity_above', 'has_liquidity_below',
+    'fvg_bullish', 'fvg_bearish',
+    'is_london', 'is_ny', 'is_killzone',
+    'sweep_above', 'sweep_below',
+    'bos_bullish', 'bos_bearish', 'choch_bullish', 'choch_bearish',
+    'demand_touch', 'supply_touch',
+]
 
 class SMCAnalyzer:
     """
     Analizador de Smart Money Concepts (SMC).
     Detecta estructura de mercado, BOS, CHoCH y liquidez.
+
+    engine="numpy" calcula todo con los kernels de analysis/kernels.py y sólo
+    arma el DataFrame al final; engine="pandas" es la implementación original.
+
+    pivot_mode="centered" marca cada pivot en su propia vela (depende de las
+    swing_length velas siguientes); pivot_mode="confirmed" lo marca recién
+    cuando se cerró su ventana derecha. Con pivots confirmados cada fila
+    depende sólo de velas pasadas: analizar un prefijo da exactamente las
+    mismas filas que el análisis completo (salvo el bfill del ATR en las
+    primeras 13 velas), así que el resultado se puede cachear o extender.
     """
-    def __init__(self, swing_length=5):
+    def __init__(self, swing_length=5, engine="numpy", pivot_mode="centered"):
         self.swing_length = swing_length
+        self.engine = engine
+        self.pivot_mode = pivot_mode
+        self.pivot_lag = kernels.pivot_lag(swing_length, pivot_mode)
+
+    def params(self):
+        """Parámetros que cambian el resultado de analyze (clave de cache)."""
+        return (self.swing_length, self.engine, self.pivot_mode)
 
-    def analyze(self, df):
+    def analyze_arrays(self, df, features=None):
+        """Columnas del análisis como dict de arrays NumPy (sin construir DataFrame)."""
+        return analyze_arrays(
+            df['High'].to_numpy(dtype=np.float64),
+            df['Low'].to_numpy(dtype=np.float64),
+            df['Close'].to_numpy(dtype=np.float64),
+            swing_length=self.swing_length,
+            open_=df['Open'].to_numpy(dtype=np.float64),
+            pivot_mode=self.pivot_mode,
+            features=features,
+        )
+
+    def _label_codes(self, features):
+        """Códigos int8 de los kernels -> etiquetas de texto del DataFrame."""
+        for col in ('trend', 'structure_bias'):
+            if col in features:
+                features[col] = kernels.trend_labels(features[col])
+        if 'swing_high' in features:
+            features['swing_high'] = swing_labels(features['swing_high'], SWING_HIGH_LABELS)
+        if 'swing_low' in features:
+            features['swing_low'] = swing_labels(features['swing_low'], SWING_LOW_LABELS)
+        return features
+
+    def analyze(self, df, features=None):
+        """
+        features: lista de features o columnas (ver analysis/features.py); se
+        calcula sólo lo necesario para ellas. None = análisis completo.
+        El resultado lleva el modo de pivots en attrs['pivot_mode'] (los
+        backtests rechazan análisis "centered").
+        """
         if df.empty:
             return df
+
+        if self.engine == "numpy":
+            features = self.analyze_arrays(df, features)
+            self._label_codes(features)
+            base = df.drop(columns=[c for c in features if c in df.columns])
+            out = pd.concat([base, pd.DataFrame(features, index=df.index)], axis=1)
+            out.attrs['pivot_mode'] = self.pivot_mode
+            return out
         
         df = df.copy()
         
@@ -26,7 +101,16 @@ class SMCAnalyzer:
         
         # 4. Detectar FVGs
         df = self.detect_fvgs(df)
-        
+
+        # 5. Zonas activas (FVG + Order Blocks sin mitigar)
+        df = self._identify_zones(df)
+
+        # La implementación original calcula todo: sólo se recorta el resultado
+        if features is not None:
+            keep = set(columns(features))
+            df = df.drop(columns=[c for c in columns() if c not in keep])
+
+        df.attrs['pivot_mode'] = self.pivot_mode
         return df
 
     def _identify_pivots(self, df):
@@ -49,12 +133,18 @@ class SMCAnalyzer:
         
         df.loc[df['High'] == rolling_max, 'is_pivot_high'] = True
         df.loc[df['Low'] == rolling_min, 'is_pivot_low'] = True
+
+        # Pivots confirmados: se marcan cuando se cierra la ventana derecha
+        if self.pivot_lag:
+            df['is_pivot_high'] = df['is_pivot_high'].shift(self.pivot_lag, fill_value=False)
+            df['is_pivot_low'] = df['is_pivot_low'].shift(self.pivot_lag, fill_value=False)
         
         return df
 
     def _identify_structure(self, df):
         """
-        Determina BOS y CHoCH.
+        Determina BOS y CHoCH (ver analysis/structure.py) además de EMAs,
+        ATR, RSI y la tendencia por EMAs.
         """
         # Calcular EMAs primero para uso general
         df['EMA_50'] = df['Close'].ewm(span=50).mean()
@@ -76,8 +166,8 @@ class SMCAnalyzer:
         df['RSI'] = 100 - (100 / (1 + rs))
 
         # Marcamos niveles clave en cada fila (forward fill de pivots)
-        df['last_pivot_high'] = df['High'].where(df['is_pivot_high']).ffill()
-        df['last_pivot_low'] = df['Low'].where(df['is_pivot_low']).ffill()
+        df['last_pivot_high'] = df['High'].shift(self.pivot_lag).where(df['is_pivot_high']).ffill()
+        df['last_pivot_low'] = df['Low'].shift(self.pivot_lag).where(df['is_pivot_low']).ffill()
         
         # Tendencia basada en EMA rápida para contexto general
         conditions = [
@@ -86,20 +176,81 @@ class SMCAnalyzer:
         ]
         choices = ['BULLISH', 'BEARISH']
         df['trend'] = np.select(conditions, choices, default='RANGING')
+
+        # Secuencia de swings y rupturas de estructura sobre los pivots
+        structure = market_structure(
+            df['Close'].to_numpy(dtype=np.float64),
+            df['is_pivot_high'].to_numpy(dtype=bool),
+            df['is_pivot_low'].to_numpy(dtype=bool),
+            df['last_pivot_high'].to_numpy(dtype=np.float64),
+            df['last_pivot_low'].to_numpy(dtype=np.float64),
+        )
+        for col, values in self._label_codes(structure).items():
+            df[col] = values
         
         return df
 
     def _identify_liquidity(self, df):
         """
         Detecta Equal Highs (EQH) y Equal Lows (EQL).
-        Rango de tolerancia pequeño.
+        Pivots a igual precio (tolerancia en ATRs) aún no barridos forman un
+        pool de liquidez; ver analysis/liquidity.py.
         """
-        # Simplificado: Marcar zonas de liquidez como máximos/mínimos de N periodos
-        # que no han sido tomados aún (aproximación)
-        df['has_liquidity_above'] = False # Placeholder para lógica futura
-        df['has_liquidity_below'] = False
+        columns, _ = identify_liquidity(
+            df['High'].to_numpy(dtype=np.float64),
+            df['Low'].to_numpy(dtype=np.float64),
+            df['is_pivot_high'].to_numpy(dtype=bool),
+            df['is_pivot_low'].to_numpy(dtype=bool),
+            df['ATR'].to_numpy(dtype=np.float64),
+            last_pivot_high=df['last_pivot_high'].to_numpy(dtype=np.float64),
+            last_pivot_low=df['last_pivot_low'].to_numpy(dtype=np.float64),
+        )
+        for col, values in columns.items():
+            df[col] = values
         return df
 
+    def _zone_inputs(self, df):
+        return (
+            df['Open'].to_numpy(dtype=np.float64),
+            df['High'].to_numpy(dtype=np.float64),
+            df['Low'].to_numpy(dtype=np.float64),
+            df['Close'].to_numpy(dtype=np.float64),
+            df['fvg_bullish'].to_numpy(dtype=bool),
+            df['fvg_bearish'].to_numpy(dtype=bool),
+            df['fvg_top'].to_numpy(dtype=np.float64),
+            df['fvg_bottom'].to_numpy(dtype=np.float64),
+            (df['bos_bullish'] | df['choch_bullish']).to_numpy(dtype=bool),
+            (df['bos_bearish'] | df['choch_bearish']).to_numpy(dtype=bool),
+        )
+
+    def _identify_zones(self, df):
+        """
+        Zona de demanda / oferta activa más cercana al precio en cada vela
+        (FVG y Order Blocks sin mitigar); ver analysis/zones.py.
+        """
+        columns, _ = identify_zones(*self._zone_inputs(df))
+        for col, values in columns.items():
+            df[col] = values
+        return df
+
+    def zone_registry(self, df):
+        """ZoneRegistry con las zonas activas tras la última vela de un frame ya analizado."""
+        _, registry = identify_zones(*self._zone_inputs(df))
+        return registry
+
+    def liquidity_pools(self, df):
+        """Pools EQH/EQL de un frame ya analizado (level, count, formed, last, swept)."""
+        _, pools = identify_liquidity(
+            df['High'].to_numpy(dtype=np.float64),
+            df['Low'].to_numpy(dtype=np.float64),
+            df['is_pivot_high'].to_numpy(dtype=bool),
+            df['is_pivot_low'].to_numpy(dtype=bool),
+            df['ATR'].to_numpy(dtype=np.float64),
+            last_pivot_high=df['last_pivot_high'].to_numpy(dtype=np.float64),
+            last_pivot_low=df['last_pivot_low'].to_numpy(dtype=np.float64),
+        )
+        return pools
+
     def detect_fvgs(self, df):
         """
         Detecta Fair Value Gaps (Imbalances).
@@ -144,8 +295,58 @@ class SMCAnalyzer:
         
         return df
 
+    def to_compact(self, df):
+        """
+        Versión compacta de un frame analizado para guardar en sesión:
+        precios/indicadores en float32, etiquetas categóricas, booleanos
+        empaquetados en bits ('flags') y sin columnas auxiliares.
+        """
+        if df is None or df.empty:
+            return df
+        out = df.drop(columns=[c for c in SCRATCH_COLUMNS + ['Date'] if c in df.columns])
+
+        flags = [c for c in COMPACT_FLAGS if c in out.columns]
+        packed = np.zeros(len(out), dtype=np.uint32)
+        for bit, col in enumerate(COMPACT_FLAGS):
+            if col in out.columns:
+                packed |= out[col].fillna(False).to_numpy(dtype=bool).astype(np.uint32) << bit
+        out = out.drop(columns=flags)
+        out['flags'] = packed
+
+        for col in out.columns:
+            if out[col].dtype == np.float64:
+                out[col] = out[col].astype(np.float32)
+        for col in ('trend', 'structure_bias', 'swing_high', 'swing_low', 'demand_kind', 'supply_kind'):
+            if col in out.columns:
+                out[col] = out[col].astype('category')
+        return out
+
+    def from_compact(self, df):
+        """Desempaqueta 'flags' en las columnas booleanas originales."""
+        if df is None or df.empty or 'flags' not in df.columns:
+            return df
+        out = df.drop(columns=['flags'])
+        packed = df['flags'].to_numpy()
+        for bit, col in enumerate(COMPACT_FLAGS):
+            out[col] = ((packed >> bit) & 1).astype(bool)
+        return out
+
+    @staticmethod
+    def memory_bytes(df):
+        """Memoria real del frame (incluye índice y objetos)."""
+        if df is None:
+            return 0
+        return int(df.memory_usage(deep=True).sum())
+
     def get_market_bias(self, df):
         """Retorna el sesgo direccional general basado en la última vela analizada"""
         if df.empty:
             return "NEUTRAL"
         return df['trend'].iloc[-1]
+
+    def get_market_bias_panel(self, frames):
+        """
+        get_market_bias para muchos instrumentos a la vez ({ticker: df} sin
+        analizar): un solo análisis vectorizado sobre la matriz del universo.
+        """
+        return panel_bias(frames, swing_length=self.swing_length, pivot_mode=self.pivot_mode)
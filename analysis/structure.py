@@ -0,0 +1,97 @@
+"""
+Estructura de mercado sobre los pivots: secuencia de swings (HH/HL/LH/LL),
+rupturas de estructura (BOS) y cambios de carácter (CHoCH).
+
+- Cada pivot alto se compara con el anterior: HH si es más alto, LH si no.
+  Lo mismo con los bajos: HL / LL.
+- Ruptura alcista: primer cierre por encima del último pivot alto (cada
+  nivel se rompe una sola vez; un pivot alto nuevo abre un tramo nuevo).
+  Ruptura bajista: primer cierre por debajo del último pivot bajo.
+- Una ruptura en la misma dirección que la anterior es BOS; en dirección
+  contraria es CHoCH. structure_bias es la dirección de la última ruptura.
+
+Todo es vectorizado sobre el último eje (sirve para paneles 2-D).
+"""
+import numpy as np
+
+# Columnas que añade el análisis de estructura
+STRUCTURE_COLUMNS = [
+    'swing_high', 'swing_low',
+    'bos_bullish', 'bos_bearish',
+    'choch_bullish', 'choch_bearish',
+    'structure_bias',
+]
+
+# Códigos int8 -> etiqueta (índice = código + 1)
+SWING_HIGH_LABELS = np.array(['LH', '', 'HH'])
+SWING_LOW_LABELS = np.array(['LL', '', 'HL'])
+
+
+def swing_labels(code, labels):
+    return labels[np.asarray(code, dtype=np.int8) + 1]
+
+
+def _ffill_codes(code):
+    """Propaga hacia adelante el último código distinto de 0 (último eje)."""
+    n = code.shape[-1]
+    idx = np.where(code != 0, np.arange(n), 0)
+    np.maximum.accumulate(idx, axis=-1, out=idx)
+    return np.take_along_axis(code, idx, axis=-1)
+
+
+def _shift_fill(x, fill):
+    out = np.full(x.shape, fill, dtype=x.dtype)
+    out[..., 1:] = x[..., :-1]
+    return out
+
+
+def _first_per_segment(flag, segment_start):
+    """
+    True sólo en el primer flag de cada tramo (un tramo empieza donde
+    segment_start es True y dura hasta el siguiente).
+    """
+    count = np.cumsum(flag, axis=-1)
+    n = flag.shape[-1]
+    # Conteo acumulado justo antes del inicio del tramo vigente
+    before = _shift_fill(count, 0)
+    idx = np.where(segment_start, np.arange(n), 0)
+    np.maximum.accumulate(idx, axis=-1, out=idx)
+    base = np.take_along_axis(before, idx, axis=-1)
+    return flag & (count - base == 1)
+
+
+def swing_sequence(is_pivot, last_pivot):
+    """
+    +1 si el pivot supera al anterior, -1 si no, 0 fuera de pivots o sin
+    anterior. En la fila de un pivot last_pivot es su precio.
+    """
+    previous = np.full(last_pivot.shape, np.nan)
+    previous[..., 1:] = last_pivot[..., :-1]
+    code = np.where(last_pivot > previous, 1, -1).astype(np.int8)
+    code[~is_pivot | np.isnan(previous)] = 0
+    return code
+
+
+def market_structure(close, is_pivot_high, is_pivot_low, last_pivot_high, last_pivot_low):
+    """
+    Columnas de STRUCTURE_COLUMNS como arrays: swing_high/swing_low y
+    structure_bias como códigos int8 (ver swing_labels / trend_labels),
+    BOS/CHoCH como booleanos.
+    """
+    out = {}
+    out['swing_high'] = swing_sequence(is_pivot_high, last_pivot_high)
+    out['swing_low'] = swing_sequence(is_pivot_low, last_pivot_low)
+
+    bull = _first_per_segment(close > last_pivot_high, is_pivot_high)
+    bear = _first_per_segment(close < last_pivot_low, is_pivot_low)
+    event = bull.astype(np.int8) - bear.astype(np.int8)
+
+    previous = _shift_fill(_ffill_codes(event), 0)
+    choch = (event != 0) & (previous != 0) & (event != previous)
+    bos = (event != 0) & ~choch
+    out['bos_bullish'] = bos & (event > 0)
+    out['bos_bearish'] = bos & (event < 0)
+    out['choch_bullish'] = choch & (event > 0)
+    out['choch_bearish'] = choch & (event < 0)
+    out['structure_bias'] = _ffill_codes(event)
+    return out
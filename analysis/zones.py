@@ -0,0 +1,303 @@
+"""
+Registro de zonas activas: FVG y Order Blocks sin mitigar.
+
+Cada lado (demanda / oferta) es un árbol de intervalos: un treap ordenado por
+el borde inferior de la zona y aumentado con el máximo borde superior del
+subárbol. El treap es persistente (las operaciones devuelven una raíz nueva
+sin modificar la anterior), así que guardar una foto del registro es O(1).
+
+Mitigación de una zona de demanda con el Low de cada vela:
+- Low <= borde inferior: la zona queda rellenada y sale del registro. Son
+  todas las zonas con borde inferior >= Low, un split del treap.
+- Low dentro de la zona: queda activa sólo la parte sin tocar (el borde
+  superior baja al Low). Se visitan sólo los subárboles con max_top > Low.
+Las zonas de oferta se guardan espejadas (-top, -bottom) y usan la misma
+lógica con -High.
+
+Order Block alcista: la última vela bajista (Close < Open) antes de una
+ruptura alcista (BOS o CHoCH), con su rango High-Low recortado por lo que el
+precio ya recorrió desde entonces. Bajista al revés. Las zonas nacen en la
+vela del FVG o de la ruptura y se mitigan desde la vela siguiente.
+"""
+import copy
+import math
+
+import numpy as np
+
+# Columnas por vela que añade el registro de zonas
+ZONE_COLUMNS = [
+    'demand_top', 'demand_bottom', 'demand_kind', 'demand_touch',
+    'supply_bottom', 'supply_top', 'supply_kind', 'supply_touch',
+]
+
+
+class _Node:
+    __slots__ = ('key', 'prio', 'top', 'info', 'left', 'right', 'max_top')
+
+    def __init__(self, key, prio, top, info, left, right):
+        self.key = key
+        self.prio = prio
+        self.top = top
+        self.info = info
+        self.left = left
+        self.right = right
+        max_top = top
+        if left is not None and left.max_top > max_top:
+            max_top = left.max_top
+        if right is not None and right.max_top > max_top:
+            max_top = right.max_top
+        self.max_top = max_top
+
+
+def _merge(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    if a.prio > b.prio:
+        return _Node(a.key, a.prio, a.top, a.info, a.left, _merge(a.right, b))
+    return _Node(b.key, b.prio, b.top, b.info, _merge(a, b.left), b.right)
+
+
+def _split(node, key):
+    """(claves < key, claves >= key)"""
+    if node is None:
+        return None, None
+    if node.key < key:
+        left, right = _split(node.right, key)
+        return _Node(node.key, node.prio, node.top, node.info, node.left, left), right
+    left, right = _split(node.left, key)
+    return left, _Node(node.key, node.prio, node.top, node.info, right, node.right)
+
+
+def _trim(node, level):
+    """Baja a `level` el borde superior de las zonas que lo superan."""
+    if node is None or node.max_top <= level:
+        return node
+    return _Node(node.key, node.prio, min(node.top, level), node.info,
+                 _trim(node.left, level), _trim(node.right, level))
+
+
+def _size(node):
+    return 0 if node is None else 1 + _size(node.left) + _size(node.right)
+
+
+def _walk(node):
+    if node is not None:
+        yield from _walk(node.left)
+        yield node
+        yield from _walk(node.right)
+
+
+def _stab(node, price, out):
+    """Zonas con bottom <= price <= top."""
+    if node is None or node.max_top < price:
+        return
+    _stab(node.left, price, out)
+    if node.key[0] <= price:
+        if node.top >= price:
+            out.append(node)
+        _stab(node.right, price, out)
+
+
+def _highest(node):
+    """
+    Nodo con el mayor borde superior (la zona de demanda más cercana al
+    precio). Entre zonas con el mismo borde superior, la de mayor borde
+    inferior (y después la más nueva): no depende de la forma del árbol.
+    """
+    if node is None:
+        return None
+    target = node.max_top
+    best = None
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node is None or node.max_top < target:
+            continue
+        if node.top == target and (best is None or node.key > best.key):
+            best = node
+        stack.append(node.left)
+        stack.append(node.right)
+    return best
+
+
+def _priority(seq):
+    # Prioridad determinista (hash multiplicativo): el mismo conjunto de zonas
+    # da siempre el mismo árbol, calculado en batch o vela a vela
+    return (seq * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+
+
+class ZoneTree:
+    """Árbol de intervalos persistente de zonas de demanda [bottom, top]."""
+    def __init__(self, root=None):
+        self.root = root
+
+    def copy(self):
+        return ZoneTree(self.root)
+
+    def __len__(self):
+        return _size(self.root)
+
+    def insert(self, bottom, top, info, seq):
+        """seq identifica la zona (único y >= 0): desempata bordes iguales."""
+        node = _Node((bottom, seq), _priority(seq), top, info, None, None)
+        left, right = _split(self.root, node.key)
+        self.root = _merge(_merge(left, node), right)
+
+    def mitigate(self, low):
+        """Aplica el Low de una vela. Devuelve True si tocó alguna zona."""
+        root = self.root
+        if root is None or root.max_top <= low:
+            return False
+        # Sólo hace falta el split si alguna zona quedó rellenada (la de mayor
+        # borde inferior es el nodo de más a la derecha)
+        node = root
+        while node.right is not None:
+            node = node.right
+        if node.key[0] >= low:
+            root, _filled = _split(root, (low, -1))
+        self.root = _trim(root, low)
+        return True
+
+    def highest(self):
+        node = _highest(self.root)
+        return None if node is None else (node.key[0], node.top, node.info)
+
+    def containing(self, price):
+        out = []
+        _stab(self.root, price, out)
+        return [(n.key[0], n.top, n.info) for n in out]
+
+    def zones(self):
+        return [(n.key[0], n.top, n.info) for n in _walk(self.root)]
+
+
+class ZoneRegistry:
+    """
+    Zonas activas de demanda y oferta. update(high, low) aplica la
+    mitigación de una vela; nearest_* devuelve la zona más cercana al precio
+    en O(log n). copy() es O(1).
+    """
+    def __init__(self):
+        self.demand = ZoneTree()
+        # Oferta espejada: [bottom, top] se guarda como [-top, -bottom]
+        self.supply = ZoneTree()
+
+    def copy(self):
+        out = ZoneRegistry.__new__(ZoneRegistry)
+        out.demand = self.demand.copy()
+        out.supply = self.supply.copy()
+        return out
+
+    def add(self, bar, side, kind, bottom, top):
+        """Registra una zona nacida en `bar` (side 'demand'/'supply', kind 'FVG'/'OB')."""
+        seq = 2 * bar + (kind == 'OB')
+        if side == 'demand':
+            self.demand.insert(bottom, top, kind, seq)
+        else:
+            self.supply.insert(-top, -bottom, kind, seq)
+
+    def update(self, high, low):
+        """Mitiga con la vela. Devuelve (tocó demanda, tocó oferta)."""
+        return self.demand.mitigate(low), self.supply.mitigate(-high)
+
+    def nearest_demand(self):
+        """(bottom, top, info) de la zona de demanda más alta, o None."""
+        return self.demand.highest()
+
+    def nearest_supply(self):
+        """(bottom, top, info) de la zona de oferta más baja, o None."""
+        zone = self.supply.highest()
+        return None if zone is None else (-zone[1], -zone[0], zone[2])
+
+    def containing(self, price):
+        """Zonas que contienen el precio: [('demand'|'supply', bottom, top, info)]."""
+        out = [('demand', b, t, info) for b, t, info in self.demand.containing(price)]
+        out += [('supply', -t, -b, info) for b, t, info in self.supply.containing(-price)]
+        return out
+
+
+class ZoneTracker:
+    """
+    Procesa las velas en orden y mantiene el registro. step() hace, para la
+    vela `bar`: mitigación, alta de los FVG y OB que nacen en ella, y
+    devuelve los valores de ZONE_COLUMNS. Es el mismo código en batch y en
+    streaming (copy() es barato: el registro es persistente).
+    """
+    def __init__(self):
+        self.registry = ZoneRegistry()
+        # Última vela bajista / alcista como (Low, High) y el Low mínimo /
+        # High máximo de las velas posteriores a ella
+        self.last_bear = None
+        self.last_bull = None
+        self.low_since_bear = math.inf
+        self.high_since_bull = -math.inf
+        # Zonas más cercanas de la vela anterior (se reusan si nada cambió)
+        self.nearest = (math.nan, math.nan, '', math.nan, math.nan, '')
+
+    def copy(self):
+        out = copy.copy(self)
+        out.registry = self.registry.copy()
+        return out
+
+    def step(self, bar, open_, high, low, close, fvg_bullish, fvg_bearish, fvg_top, fvg_bottom,
+             break_bullish, break_bearish):
+        registry = self.registry
+        demand_touch, supply_touch = registry.update(high, low)
+        changed = demand_touch or supply_touch
+        if fvg_bullish:
+            registry.add(bar, 'demand', 'FVG', fvg_bottom, fvg_top)
+            changed = True
+        if fvg_bearish:
+            registry.add(bar, 'supply', 'FVG', fvg_bottom, fvg_top)
+            changed = True
+
+        if low < self.low_since_bear:
+            self.low_since_bear = low
+        if high > self.high_since_bull:
+            self.high_since_bull = high
+        # OB: rango de la última vela opuesta, menos lo que ya recorrió el precio
+        if break_bullish and self.last_bear is not None:
+            ob_low, ob_high = self.last_bear
+            if self.low_since_bear > ob_low:
+                registry.add(bar, 'demand', 'OB', ob_low, min(ob_high, self.low_since_bear))
+                changed = True
+        if break_bearish and self.last_bull is not None:
+            ob_low, ob_high = self.last_bull
+            if self.high_since_bull < ob_high:
+                registry.add(bar, 'supply', 'OB', max(ob_low, self.high_since_bull), ob_high)
+                changed = True
+        if close < open_:
+            self.last_bear = (low, high)
+            self.low_since_bear = math.inf
+        elif close > open_:
+            self.last_bull = (low, high)
+            self.high_since_bull = -math.inf
+
+        if changed:
+            demand = registry.nearest_demand() or (math.nan, math.nan, '')
+            supply = registry.nearest_supply() or (math.nan, math.nan, '')
+            self.nearest = demand + supply
+        d_bottom, d_top, d_kind, s_bottom, s_top, s_kind = self.nearest
+        return d_top, d_bottom, d_kind, demand_touch, s_bottom, s_top, s_kind, supply_touch
+
+
+def identify_zones(open_, high, low, close, fvg_bullish, fvg_bearish, fvg_top, fvg_bottom, break_bullish, break_bearish):
+    """
+    Columnas de ZONE_COLUMNS (arrays 1-D) y el ZoneRegistry tras la última
+    vela, recorriendo las velas con un ZoneTracker. Las velas con High NaN
+    (relleno de paneles) se saltan.
+    """
+    n = len(close)
+    tracker = ZoneTracker()
+    # Acceso escalar con listas de Python: mucho más rápido que indexar arrays
+    inputs = [np.asarray(a).tolist() for a in (open_, high, low, close, fvg_bullish, fvg_bearish,
+                                               fvg_top, fvg_bottom, break_bullish, break_bearish)]
+    empty = (math.nan, math.nan, '', False, math.nan, math.nan, '', False)
+    rows = [tracker.step(t, *args) if args[1] == args[1] else empty
+            for t, args in enumerate(zip(*inputs))]
+    values = list(zip(*rows)) if rows else [()] * len(ZONE_COLUMNS)
+    dtypes = (np.float64, np.float64, object, bool, np.float64, np.float64, object, bool)
+    cols = {name: np.array(col, dtype=dtype) for name, col, dtype in zip(ZONE_COLUMNS, values, dtypes)}
+    return cols, tracker.registry
@@ -0,0 +1,283 @@
+"""
+Backtest vectorizado de las señales de analysis/signals.py sobre OHLC
+histórico, sin descargas (a diferencia de TradeJournal._evaluate_trade).
+
+Cada trade entra al cierre de la vela de la señal y se resuelve desde la
+vela siguiente con el primer toque del SL o del TP: para todos los trades
+pendientes a la vez se arma la ventana (trades x velas) de High/Low, se
+marca dónde se cruza cada nivel y argmax da la primera vela. Las ventanas
+crecen al doble para los trades que siguen abiertos. Si SL y TP se tocan en
+la misma vela gana el SL (conservador, igual que _evaluate_trade).
+
+Salidas:
+- 'win' / 'loss' al precio del TP / SL.
+- 'timeout' al cierre de la vela `horizon` (si se pasa horizon).
+- 'open' al cierre de la última vela si los datos se terminan antes.
+
+Por defecto hay una sola posición por instrumento: las señales mientras
+hay un trade abierto se ignoran (la siguiente entrada se busca con
+searchsorted sobre las velas de salida). El equity es de riesgo fijo por
+trade (RiskManager.risk_per_trade_percent del balance vigente) y compone
+en el orden de salida.
+
+Las señales tienen que salir de un análisis con pivot_mode="confirmed": con
+"centered" los pivots, BOS/CHoCH y zonas de cada vela usan las swing_length
+velas siguientes y el backtest ve el futuro. trade_ledger / run_backtest /
+run_universe rechazan (ValueError) frames que SMCAnalyzer.analyze marcó como
+"centered" en attrs['pivot_mode'], salvo allow_lookahead=True.
+"""
+import numpy as np
+import pandas as pd
+
+from analysis.smc import SMCAnalyzer
+from core.risk import RiskManager
+from market_data.resample import resample_ohlcv
+from market_data.store import OHLCV_COLUMNS, to_utc_ns
+from market_data.timeframes import TIMEFRAME_SECONDS
+
+OUTCOMES = ('open', 'win', 'loss', 'timeout')
+LEDGER_COLUMNS = ['pair', 'side', 'entry_bar', 'exit_bar', 'entry_time', 'exit_time', 'entry', 'sl', 'tp',
+                  'exit', 'outcome', 'bars', 'prob', 'r', 'pnl', 'equity']
+
+# Ventana inicial (velas) del primer toque; se duplica para los pendientes
+_BLOCK = 32
+# Tope de celdas (trades x velas) por ventana
+_MAX_CELLS = 1 << 22
+
+
+def horizon_bars(timeframe):
+    """Velas que mira TradeJournal._evaluate_trade antes de dar un trade por abierto."""
+    return 20 if timeframe in ('5m', '15m') else 10
+
+
+def resolve_trades(high, low, close, start, side, sl, tp, horizon=None):
+    """
+    Primer toque de SL/TP para trades que entran al cierre de las velas
+    `start` (side 1 BUY, -1 SELL). Devuelve (vela de salida, código de
+    OUTCOMES, precio de salida).
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    start = np.asarray(start, dtype=np.int64)
+    n, m = len(close), len(start)
+    limit = n if horizon is None else int(horizon)
+
+    exit_bar = np.empty(m, dtype=np.int64)
+    outcome = np.zeros(m, dtype=np.int8)
+    exit_price = np.empty(m, dtype=np.float64)
+    buy = np.asarray(side) == 1
+    # Normalizado a BUY: el SL se toca con el Low y el TP con el High (SELL: -High / -Low)
+    adverse = np.where(buy, sl, -np.asarray(sl, dtype=np.float64))
+    favorable = np.where(buy, tp, -np.asarray(tp, dtype=np.float64))
+
+    pending = np.arange(m)
+    offset = 1
+    block = _BLOCK
+    while pending.size:
+        width = min(block, limit - offset + 1)
+        if width > 0:
+            for chunk in np.array_split(pending, max(1, pending.size * width // _MAX_CELLS)):
+                _resolve_window(high, low, start, buy, adverse, favorable, chunk, offset, width,
+                                exit_bar, outcome, exit_price, sl, tp)
+            pending = pending[outcome[pending] == 0]
+            offset += width
+            block *= 2
+        # Sin toque dentro del horizonte o del histórico
+        ended = pending[(offset > limit) | (start[pending] + offset >= n)]
+        if ended.size:
+            last = np.minimum(start[ended] + limit, n - 1)
+            timed_out = start[ended] + limit <= n - 1
+            exit_bar[ended] = last
+            outcome[ended] = np.where(timed_out, OUTCOMES.index('timeout'), OUTCOMES.index('open'))
+            exit_price[ended] = close[last]
+            pending = np.setdiff1d(pending, ended, assume_unique=True)
+    return exit_bar, outcome, exit_price
+
+
+def _resolve_window(high, low, start, buy, adverse, favorable, rows, offset, width,
+                    exit_bar, outcome, exit_price, sl, tp):
+    n = len(high)
+    bars = start[rows, None] + offset + np.arange(width)
+    inside = bars < n
+    bars = np.minimum(bars, n - 1)
+    is_buy = buy[rows, None]
+    worst = np.where(is_buy, low[bars], -high[bars])
+    best = np.where(is_buy, high[bars], -low[bars])
+    hit_sl = inside & (worst <= adverse[rows, None])
+    hit_tp = inside & (best >= favorable[rows, None])
+    any_sl = hit_sl.any(axis=1)
+    any_tp = hit_tp.any(axis=1)
+    first_sl = np.where(any_sl, hit_sl.argmax(axis=1), width)
+    first_tp = np.where(any_tp, hit_tp.argmax(axis=1), width)
+    loss = any_sl & (first_sl <= first_tp)
+    win = any_tp & ~loss
+    done = loss | win
+    rows = rows[done]
+    exit_bar[rows] = start[rows] + offset + np.where(loss[done], first_sl[done], first_tp[done])
+    outcome[rows] = np.where(loss[done], OUTCOMES.index('loss'), OUTCOMES.index('win'))
+    exit_price[rows] = np.where(loss[done], np.asarray(sl)[rows], np.asarray(tp)[rows])
+
+
+def htf_bias(df, timeframe, htf_timeframe="1h", smc=None):
+    """
+    Sesgo HTF vela a vela para backtests (array de etiquetas, None sin
+    historia): df re-muestreado a htf_timeframe, analizado sólo hasta
+    'trend', y en cada vela el de la última vela HTF ya cerrada al cierre de
+    esa vela (sin mirar la vela HTF en formación).
+    """
+    smc = smc or SMCAnalyzer()
+    ohlcv = pd.DataFrame({'Date': _dates(df)})
+    for col in OHLCV_COLUMNS:
+        ohlcv[col] = df[col].to_numpy(dtype=np.float64) if col in df.columns else 0.0
+    htf = smc.analyze(resample_ohlcv(ohlcv, htf_timeframe), features=['trend'])
+    step = TIMEFRAME_SECONDS[htf_timeframe] * 10**9
+    bar_close = to_utc_ns(ohlcv['Date']) + TIMEFRAME_SECONDS[timeframe] * 10**9
+    last_closed = (bar_close // step - 1) * step
+    k = np.searchsorted(to_utc_ns(htf['Date']), last_closed, side='right') - 1
+    labels = np.append(htf['trend'].to_numpy(dtype=object), None)
+    return labels[np.where(k >= 0, k, -1)]
+
+
+def _dates(df):
+    if 'Date' in df.columns:
+        return pd.DatetimeIndex(df['Date'])
+    return pd.DatetimeIndex(df.index)
+
+
+def _select(start, exit_bar, overlap):
+    """Índices de los trades que se toman (sin superponer si overlap=False)."""
+    if overlap or len(start) == 0:
+        return np.arange(len(start))
+    taken = []
+    k = 0
+    while k < len(start):
+        taken.append(k)
+        # Próxima señal desde la vela de salida (se puede reentrar a su cierre);
+        # una señal en la última vela sale en su misma vela
+        k = int(np.searchsorted(start, max(exit_bar[k], start[k] + 1), side='left'))
+    return np.asarray(taken, dtype=np.int64)
+
+
+def check_lookahead(df, allow_lookahead=False, pair=None):
+    """ValueError si df viene de un análisis con pivots "centered" (ver docstring del módulo)."""
+    if not allow_lookahead and df.attrs.get('pivot_mode') == "centered":
+        raise ValueError(f"{pair or 'frame'}: análisis con pivot_mode='centered' (mira velas futuras); "
+                         "usar SMCAnalyzer(pivot_mode='confirmed') o allow_lookahead=True")
+
+
+def trade_ledger(df, setups, risk=None, horizon=None, overlap=False, pair=None, allow_lookahead=False):
+    """
+    Trades de las señales `setups` (dict de analysis.signals.find_setups)
+    sobre el frame OHLC df, filtrados por RiskManager.validate_trades como
+    en _execute_signal. Ledger sin las columnas de equity.
+    """
+    check_lookahead(df, allow_lookahead, pair)
+    risk = risk or RiskManager()
+    signal = np.asarray(setups['signal'])
+    entry, sl, tp = (np.asarray(setups[k], dtype=np.float64) for k in ('entry', 'sl', 'tp'))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        risk_dist = np.abs(entry - sl)
+        rr = np.where(risk_dist > 0, np.abs(tp - entry) / risk_dist, 0.0)
+    start = np.flatnonzero((signal != 0) & risk.validate_trades(setups['prob'], rr))
+
+    high = df['High'].to_numpy(dtype=np.float64)
+    low = df['Low'].to_numpy(dtype=np.float64)
+    close = df['Close'].to_numpy(dtype=np.float64)
+    side = signal[start]
+    exit_bar, outcome, exit_price = resolve_trades(high, low, close, start, side, sl[start], tp[start], horizon)
+    keep = _select(start, exit_bar, overlap)
+
+    start, side, exit_bar, outcome, exit_price = start[keep], side[keep], exit_bar[keep], outcome[keep], exit_price[keep]
+    dates = _dates(df)
+    ledger = pd.DataFrame({
+        'pair': pair,
+        'side': np.where(side == 1, 'BUY', 'SELL'),
+        'entry_bar': start,
+        'exit_bar': exit_bar,
+        'entry_time': dates[start],
+        'exit_time': dates[exit_bar],
+        'entry': entry[start],
+        'sl': sl[start],
+        'tp': tp[start],
+        'exit': exit_price,
+        'outcome': np.asarray(OUTCOMES)[outcome],
+        'bars': exit_bar - start,
+        'prob': np.asarray(setups['prob'])[start],
+        'r': (exit_price - entry[start]) * side / risk_dist[start],
+    })
+    return ledger
+
+
+def equity_curve(ledger, risk=None):
+    """
+    Añade pnl y equity al ledger (orden de salida, riesgo fijo compuesto) y
+    devuelve (ledger, equity por salida como Series indexada por exit_time).
+    """
+    risk = risk or RiskManager()
+    ledger = ledger.sort_values(['exit_time', 'entry_time'], kind='stable').reset_index(drop=True)
+    growth = 1.0 + ledger['r'].to_numpy() * risk.risk_per_trade_percent / 100.0
+    equity = risk.account_balance * np.cumprod(growth)
+    before = np.r_[risk.account_balance, equity[:-1]]
+    ledger['pnl'] = equity - before
+    ledger['equity'] = equity
+    curve = pd.Series(np.r_[risk.account_balance, equity],
+                      index=pd.DatetimeIndex([ledger['entry_time'].min() if len(ledger) else pd.NaT]).append(
+                          pd.DatetimeIndex(ledger['exit_time'])),
+                      name='equity')
+    return ledger[[col for col in LEDGER_COLUMNS if col in ledger.columns]], curve
+
+
+def summarize(ledger, risk=None):
+    """Win rate (TP sobre TP+SL), expectativa en R, profit factor, drawdown máximo y retorno."""
+    risk = risk or RiskManager()
+    r = ledger['r'].to_numpy(dtype=np.float64)
+    outcome = ledger['outcome'].to_numpy()
+    wins = int(np.count_nonzero(outcome == 'win'))
+    losses = int(np.count_nonzero(outcome == 'loss'))
+    gains, pains = r[r > 0].sum(), -r[r < 0].sum()
+    equity = np.r_[risk.account_balance, ledger['equity'].to_numpy(dtype=np.float64)] if 'equity' in ledger else None
+    if equity is not None and len(equity) > 1:
+        peak = np.maximum.accumulate(equity)
+        max_dd = float(((peak - equity) / peak).max() * 100.0)
+        total_return = float((equity[-1] / equity[0] - 1.0) * 100.0)
+    else:
+        max_dd = total_return = 0.0
+    return {
+        "trades": int(len(r)),
+        "wins": wins,
+        "losses": losses,
+        "timeouts": int(np.count_nonzero(outcome == 'timeout')),
+        "open": int(np.count_nonzero(outcome == 'open')),
+        "win_rate": round(wins / (wins + losses) * 100.0, 2) if wins + losses else 0.0,
+        "expectancy_r": round(float(r.mean()), 4) if len(r) else 0.0,
+        "profit_factor": round(float(gains / pains), 3) if pains > 0 else (float('inf') if gains > 0 else 0.0),
+        "max_drawdown_pct": round(max_dd, 2),
+        "total_return_pct": round(total_return, 2),
+    }
+
+
+def run_backtest(df, setups, risk=None, horizon=None, overlap=False, pair=None, allow_lookahead=False):
+    """
+    Backtest de un instrumento: {"ledger", "equity", "stats"}. df es el
+    frame analizado (con 'Date' o índice de fechas, pivots "confirmed") y
+    setups el resultado de find_setups sobre ese mismo frame.
+    """
+    return run_universe({pair: (df, setups)}, risk=risk, horizon=horizon, overlap=overlap,
+                        allow_lookahead=allow_lookahead)
+
+
+def run_universe(items, risk=None, horizon=None, overlap=False, allow_lookahead=False):
+    """
+    Backtest de varios instrumentos ({par: (df, setups)}) con un solo
+    equity: los trades de todos los pares componen en orden de salida.
+    """
+    risk = risk or RiskManager()
+    ledgers = [trade_ledger(df, setups, risk=risk, horizon=horizon, overlap=overlap, pair=pair,
+                            allow_lookahead=allow_lookahead)
+               for pair, (df, setups) in items.items()]
+    ledgers = [ledger for ledger in ledgers if len(ledger)]
+    ledger = pd.concat(ledgers, ignore_index=True) if ledgers else pd.DataFrame(
+        {col: pd.Series(dtype=object) for col in LEDGER_COLUMNS if col not in ('pnl', 'equity')})
+    ledger, curve = equity_curve(ledger, risk)
+    return {"ledger": ledger, "equity": curve, "stats": summarize(ledger, risk)}
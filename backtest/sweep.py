@@ -0,0 +1,232 @@
+"""
+Barrido de parámetros (grid o búsqueda aleatoria) del análisis y de las
+reglas clásicas sobre historia en cache, en un pool de procesos.
+
+Parámetros que se pueden barrer:
+- swing_length: SMCAnalyzer (el único que obliga a re-analizar).
+- min_atr: ATR mínimo en pips (min_atr_m5 / min_atr_m15 del bot; como en
+  _find_setup sólo aplica en 5m y 15m).
+- cualquier clave de SETUP_PARAMS (multiplicadores de ATR, proximidad...).
+
+Los frames se copian una vez a memoria compartida (core/parallel.py) y cada
+tarea es un (par, swing_length): analiza una vez y evalúa con find_setups y
+el motor de backtest todas las combinaciones de ese swing_length. Los
+trades vuelven como arrays compactos y el proceso principal arma, por
+combinación, el equity conjunto de todos los pares (backtest/engine.py).
+
+El análisis usa pivots "confirmed" (sin mirar velas futuras): con
+"centered" cada vela ve las swing_length siguientes y todas las
+estadísticas salen infladas. Sólo se acepta con allow_lookahead=True
+(--allow-lookahead), para comparar.
+
+    space = {'swing_length': [3, 5, 8], 'pivot_tp_atr': [2.0, 3.0], 'proximity_pips': [20, 30, 40]}
+    report = run_sweep(frames, "15m", grid(space), workers=16)
+
+Desde la terminal (DEFAULT_SPACE, historia del almacén local):
+    python -m backtest.sweep EURUSD=X GBPUSD=X --timeframe 15m --samples 200 --workers 16
+"""
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from analysis.signals import SETUP_PARAMS
+from analysis.smc import SMCAnalyzer
+from backtest.engine import OUTCOMES, equity_curve, htf_bias, summarize, trade_ledger
+from core import parallel
+from core.bot import InstitutionalBot
+from market_data.store import to_utc_ns
+
+# Espacio por defecto: swing_length, multiplicadores de ATR, proximidad y ATR mínimo
+DEFAULT_SPACE = {
+    'swing_length': [3, 5, 8],
+    'pivot_sl_atr': [1.0, 1.2, 1.5],
+    'pivot_tp_atr': [2.0, 3.0, 4.0],
+    'fvg_tp_atr': [2.0, 2.5, 3.0],
+    'zone_entries': [False, True],
+    'zone_tp_atr': [2.0, 2.5, 3.0],
+    'ema_tp_atr': [2.0, 2.4, 3.0],
+    'range_tp_atr': [1.8, 2.2, 2.6],
+    'proximity_pips': [20, 30, 40],
+    'min_atr': [0.0, 5.0, 8.0],
+}
+
+# Columnas de resultado por combinación (además de los parámetros)
+REPORT_COLUMNS = ['trades', 'wins', 'losses', 'timeouts', 'win_rate', 'expectancy_r', 'profit_factor',
+                  'max_drawdown_pct', 'total_return_pct']
+
+
+def grid(space):
+    """Producto cartesiano de {parámetro: [valores]} como lista de dicts."""
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def random_search(space, samples, seed=0):
+    """
+    `samples` combinaciones al azar (sin repetir): cada parámetro sale de su
+    lista de valores o, si es una tupla (min, max), uniforme en ese rango.
+    """
+    rng = np.random.default_rng(seed)
+    combos, seen = [], set()
+    for _ in range(samples * 20):
+        if len(combos) == samples:
+            break
+        combo = {}
+        for name, values in space.items():
+            if isinstance(values, tuple):
+                combo[name] = round(float(rng.uniform(*values)), 4)
+            else:
+                value = values[rng.integers(len(values))]
+                combo[name] = value.item() if isinstance(value, np.generic) else value
+        key = tuple(sorted(combo.items()))
+        if key not in seen:
+            seen.add(key)
+            combos.append(combo)
+    return combos
+
+
+def _check(combos):
+    for combo in combos:
+        for name in combo:
+            if name not in SETUP_PARAMS and name not in ('swing_length', 'min_atr'):
+                raise ValueError(f"Parámetro de barrido desconocido: '{name}'")
+
+
+def _evaluate(pair, timeframe, swing_length, pivot_mode, base_params, min_atr, combos, horizon, overlap,
+              allow_lookahead=False):
+    """Tarea del worker: un par y un swing_length, todas sus combinaciones."""
+    bot = parallel.worker_bot()
+    df = parallel.worker_frame(pair)
+    bot.smc = SMCAnalyzer(swing_length=swing_length, pivot_mode=pivot_mode)
+    analyzed = bot.smc.analyze(df)
+    htf = htf_bias(df, timeframe, bot.htf_timeframe, bot.smc)
+
+    out = []
+    for index, combo in combos:
+        bot.setup_params = {**base_params, **{k: v for k, v in combo.items() if k in SETUP_PARAMS}}
+        bot.min_atr_m5, bot.min_atr_m15 = (combo['min_atr'],) * 2 if 'min_atr' in combo else min_atr
+        setups = bot.find_setups(analyzed, pair, timeframe, htf_bias=htf)
+        ledger = trade_ledger(analyzed, setups, risk=bot.risk, horizon=horizon, overlap=overlap, pair=pair,
+                              allow_lookahead=allow_lookahead)
+        out.append((index, {
+            'entry_time': to_utc_ns(ledger['entry_time']) if len(ledger) else np.empty(0, dtype=np.int64),
+            'exit_time': to_utc_ns(ledger['exit_time']) if len(ledger) else np.empty(0, dtype=np.int64),
+            'outcome': pd.Categorical(ledger['outcome'], categories=OUTCOMES).codes.astype(np.int8),
+            'r': ledger['r'].to_numpy(dtype=np.float64),
+        }))
+    return out
+
+
+def _merge(parts):
+    """Trades de una combinación en todos los pares ([(par, arrays)]) -> arrays ordenados por entrada."""
+    parts = sorted(parts, key=lambda part: part[0])
+    empty = {'entry_time': np.empty(0, dtype=np.int64), 'exit_time': np.empty(0, dtype=np.int64),
+             'outcome': np.empty(0, dtype=np.int8), 'r': np.empty(0)}
+    arrays = {k: np.concatenate([trades[k] for _pair, trades in parts] + [empty[k]]) for k in empty}
+    arrays['pair'] = np.concatenate([np.full(len(trades['r']), pair, dtype=object) for pair, trades in parts]
+                                    + [np.empty(0, dtype=object)])
+    order = np.argsort(arrays['entry_time'], kind='stable')
+    return {k: v[order] for k, v in arrays.items()}
+
+
+def trades_frame(arrays):
+    """Arrays de trades (ver sweep_trades) -> ledger mínimo para equity_curve / summarize."""
+    return pd.DataFrame({
+        'pair': arrays['pair'],
+        'entry_time': pd.to_datetime(arrays['entry_time'], unit='ns', utc=True),
+        'exit_time': pd.to_datetime(arrays['exit_time'], unit='ns', utc=True),
+        'outcome': np.asarray(OUTCOMES)[arrays['outcome']],
+        'r': arrays['r'],
+    })
+
+
+def sweep_trades(frames, timeframe, combos, bot=None, workers=None, horizon=None, overlap=False,
+                 pivot_mode="confirmed", allow_lookahead=False):
+    """
+    Trades de cada combinación sobre {par: df} en `workers` procesos: lista
+    (en el orden de combos) de dicts de arrays pair / entry_time / exit_time
+    (ns UTC) / outcome (códigos de OUTCOMES) / r, ordenados por entrada.
+    pivot_mode reemplaza al del bot; "centered" exige allow_lookahead=True.
+    """
+    _check(combos)
+    if pivot_mode == "centered" and not allow_lookahead:
+        raise ValueError("pivot_mode='centered' mira velas futuras: usar 'confirmed' o allow_lookahead=True")
+    bot = bot or InstitutionalBot()
+    workers = workers or parallel.default_workers()
+
+    groups = {}
+    for index, combo in enumerate(combos):
+        groups.setdefault(combo.get('swing_length', bot.smc.swing_length), []).append((index, combo))
+
+    shm, layout = parallel.pack_frames(frames)
+    parts = {index: [] for index in range(len(combos))}
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=parallel.init_worker,
+                                 initargs=(type(bot), parallel.bot_kwargs(bot), layout)) as pool:
+            futures = {pool.submit(_evaluate, pair, timeframe, swing_length, pivot_mode, bot.setup_params,
+                                   (bot.min_atr_m5, bot.min_atr_m15), group, horizon, overlap, allow_lookahead): pair
+                       for swing_length, group in groups.items() for pair in layout["spans"]}
+            for future in as_completed(futures):
+                for index, trades in future.result():
+                    parts[index].append((futures[future], trades))
+    finally:
+        shm.close()
+        shm.unlink()
+    return [_merge(parts[index]) for index in range(len(combos))]
+
+
+def run_sweep(frames, timeframe, combos, bot=None, workers=None, horizon=None, overlap=False,
+              pivot_mode="confirmed", allow_lookahead=False):
+    """
+    Evalúa `combos` (ver grid / random_search) sobre {par: df} en `workers`
+    procesos. bot (InstitutionalBot o ArgentinaBot) aporta pip factor, modo
+    estricto, RiskManager, timeframe HTF y los parámetros base; los pivots
+    son pivot_mode (ver sweep_trades). Devuelve un DataFrame con una fila
+    por combinación (parámetros + REPORT_COLUMNS), ordenado por expectativa.
+    """
+    bot = bot or InstitutionalBot()
+    trades = sweep_trades(frames, timeframe, combos, bot=bot, workers=workers, horizon=horizon, overlap=overlap,
+                          pivot_mode=pivot_mode, allow_lookahead=allow_lookahead)
+
+    rows = []
+    for combo, arrays in zip(combos, trades):
+        ledger, _curve = equity_curve(trades_frame(arrays), bot.risk)
+        stats = summarize(ledger, bot.risk)
+        rows.append({**combo, **{k: stats[k] for k in REPORT_COLUMNS}})
+    report = pd.DataFrame(rows)
+    return report.sort_values(['expectancy_r', 'win_rate'], ascending=False, kind='stable').reset_index(drop=True)
+
+
+def main():
+    import argparse
+
+    from core.bot import ArgentinaBot
+    from data_loader import load_universe
+
+    parser = argparse.ArgumentParser(description="Barrido de parámetros SMC sobre historia en cache")
+    parser.add_argument("pairs", nargs="+", help="Tickers de Yahoo Finance")
+    parser.add_argument("--timeframe", default="15m", choices=["1m", "5m", "15m", "1h", "4h"])
+    parser.add_argument("--samples", type=int, default=200, help="Combinaciones al azar (0 = grid completo)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--horizon", type=int, default=None, help="Velas máximas por trade")
+    parser.add_argument("--argentina", action="store_true", help="Usar ArgentinaBot (CEDEARs / Merval)")
+    parser.add_argument("--allow-lookahead", action="store_true",
+                        help="Pivots centrados (miran velas futuras: resultados inflados, sólo para comparar)")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    bot_class = ArgentinaBot if args.argentina else InstitutionalBot
+    pivot_mode = "centered" if args.allow_lookahead else "confirmed"
+    bot = bot_class(pivot_mode=pivot_mode)
+    frames = {pair: data.get(args.timeframe) for pair, data in load_universe(args.pairs, [args.timeframe]).items()}
+    combos = random_search(DEFAULT_SPACE, args.samples, args.seed) if args.samples else grid(DEFAULT_SPACE)
+    report = run_sweep(frames, args.timeframe, combos, bot=bot, workers=args.workers, horizon=args.horizon,
+                       pivot_mode=pivot_mode, allow_lookahead=args.allow_lookahead)
+    print(report.head(args.top).to_string())
+
+
+if __name__ == "__main__":
+    main()
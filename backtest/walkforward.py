@@ -0,0 +1,227 @@
+"""
+Walk-forward sobre el barrido de parámetros (backtest/sweep.py): ventanas
+móviles de entrenamiento / prueba, elección de la mejor combinación en cada
+entrenamiento y equity fuera de muestra (OOS) cosido con los trades de la
+combinación elegida en cada prueba.
+
+Los indicadores y las señales no se recalculan por ventana: sweep_trades
+analiza una vez cada (par, swing_length) sobre toda la historia, con pivots
+"confirmed" (sin mirar velas futuras, así nada del período de prueba entra
+en el entrenamiento), y corre find_setups y el backtest una vez por
+combinación. Cada ventana sólo corta esos trades por fecha de entrada con
+searchsorted y sumas acumuladas, así que agregar ventanas casi no cuesta.
+
+Un trade pertenece a la ventana en la que entra y se toma con la
+única-posición-por-par de su combinación sobre toda la historia. En el
+entrenamiento se purgan los trades que salen en o después del inicio de la
+prueba (se resolverían con precios fuera de muestra y contaminarían la
+elección); en la prueba cuentan aunque salgan después.
+
+    combos = random_search(DEFAULT_SPACE, 200)
+    wf = walk_forward(frames, "15m", combos, train="30D", test="7D", workers=16)
+    wf["windows"], wf["stats"], wf["equity"]
+
+Desde la terminal (corrida nocturna de todo el universo):
+    python -m backtest.walkforward EURUSD=X GBPUSD=X --timeframe 15m --train 30D --test 7D --samples 200
+"""
+import numpy as np
+import pandas as pd
+
+from backtest.engine import OUTCOMES, equity_curve, summarize
+from backtest.sweep import DEFAULT_SPACE, grid, random_search, sweep_trades, trades_frame
+from core.bot import InstitutionalBot
+from market_data.store import to_utc_ns
+from market_data.timeframes import TIMEFRAME_SECONDS
+
+# Criterios para elegir la combinación de cada entrenamiento
+OBJECTIVES = ('expectancy_r', 'total_r', 'profit_factor')
+
+_WIN = OUTCOMES.index('win')
+_LOSS = OUTCOMES.index('loss')
+
+
+def windows(start, end, train, test, step=None, anchored=False):
+    """
+    Ventanas [train_start, train_end) + [test_start, test_end) entre start y
+    end (fechas o ns UTC). train / test / step son duraciones de pandas
+    ("30D", "12h"...); step (por defecto test) avanza cada ventana. Con
+    anchored=True el entrenamiento empieza siempre en start. La última
+    prueba se corta en end.
+    """
+    start, end = (int(t) if isinstance(t, (int, np.integer)) else int(to_utc_ns([t])[0]) for t in (start, end))
+    train, test = pd.Timedelta(train).value, pd.Timedelta(test).value
+    step = pd.Timedelta(step).value if step is not None else test
+    if train <= 0 or test <= 0 or step <= 0:
+        raise ValueError("train, test y step deben ser duraciones positivas")
+
+    out = []
+    train_start = start
+    while train_start + train < end:
+        test_start = train_start + train
+        out.append({
+            'train_start': start if anchored else train_start,
+            'train_end': test_start,
+            'test_start': test_start,
+            'test_end': min(test_start + test, end),
+        })
+        train_start += step
+    return out
+
+
+def _span(frames, timeframe):
+    """Apertura de la primera vela y cierre de la última (ns UTC) de todos los frames."""
+    firsts, lasts = [], []
+    for df in frames.values():
+        if df is None or df.empty:
+            continue
+        dates = to_utc_ns(df['Date'] if 'Date' in df.columns else df.index)
+        firsts.append(dates[0])
+        lasts.append(dates[-1])
+    if not firsts:
+        raise ValueError("No hay datos para el walk-forward")
+    return int(min(firsts)), int(max(lasts)) + TIMEFRAME_SECONDS[timeframe] * 10**9
+
+
+def _window_stats(arrays, lo, hi, purge=False):
+    """
+    Trades, suma de R, win rate y profit factor de una combinación en cada
+    ventana [lo, hi) de fechas de entrada (arrays de ns), con sumas acumuladas.
+    purge=True descuenta los trades que salen en o después de hi.
+    """
+    entry = arrays['entry_time']
+    exit_time = arrays['exit_time']
+    r = arrays['r']
+    outcome = arrays['outcome']
+    a = np.searchsorted(entry, lo, side='left')
+    b = np.searchsorted(entry, hi, side='left')
+    columns = (r, np.maximum(r, 0.0), np.maximum(-r, 0.0), outcome == _WIN, outcome == _LOSS)
+    sums = [np.r_[0.0, np.cumsum(values)] for values in columns]
+    sums = [c[b] - c[a] for c in sums]
+    trades = b - a
+    if purge and len(entry):
+        # Sólo los que entran a menos de la duración del trade más largo antes de hi pueden salir después
+        tail = np.maximum(a, np.searchsorted(entry, hi - int((exit_time - entry).max()), side='left'))
+        for k in range(len(hi)):
+            late = tail[k] + np.flatnonzero(exit_time[tail[k]:b[k]] >= hi[k])
+            trades[k] -= late.size
+            for total, values in zip(sums, columns):
+                total[k] -= values[late].sum()
+    sum_r, gains, pains, wins, losses = sums
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return {
+            'trades': trades,
+            'total_r': sum_r,
+            'expectancy_r': np.where(trades > 0, sum_r / np.maximum(trades, 1), 0.0),
+            'win_rate': np.where(wins + losses > 0, wins / (wins + losses) * 100.0, 0.0),
+            'profit_factor': np.where(pains > 0, gains / pains, np.where(gains > 0, np.inf, 0.0)),
+        }
+
+
+def walk_forward(frames, timeframe, combos, train, test, step=None, anchored=False, bot=None, workers=None,
+                 horizon=None, objective='expectancy_r', min_trades=20):
+    """
+    Walk-forward de `combos` (ver sweep.grid / random_search) sobre {par: df}.
+
+    En cada ventana se elige la combinación con mejor `objective` (ver
+    OBJECTIVES; desempata win rate) entre las que tienen al menos min_trades
+    trades en el entrenamiento; si ninguna llega, la ventana no opera.
+
+    Devuelve {"windows", "ledger", "equity", "stats", "efficiency"}:
+    - windows: una fila por ventana con fechas, combinación elegida y
+      estadísticas in-sample (is_*) y fuera de muestra (oos_*).
+    - ledger / equity / stats: trades OOS cosidos, equity (riesgo fijo del
+      RiskManager del bot) y summarize.
+    - efficiency: expectativa OOS / expectativa in-sample de las elegidas
+      (cerca de 1 = robusto, cerca de 0 o negativo = sobreajuste).
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"objective debe ser uno de {OBJECTIVES}")
+    bot = bot or InstitutionalBot()
+    frames = {pair: df for pair, df in frames.items() if df is not None and not df.empty}
+    spans = windows(*_span(frames, timeframe), train, test, step=step, anchored=anchored)
+    if not spans:
+        raise ValueError("La historia es más corta que la ventana de entrenamiento")
+
+    trades = sweep_trades(frames, timeframe, combos, bot=bot, workers=workers, horizon=horizon)
+
+    bounds = {k: np.array([w[k] for w in spans], dtype=np.int64) for k in spans[0]}
+    ins = [_window_stats(arrays, bounds['train_start'], bounds['train_end'], purge=True) for arrays in trades]
+    oos = [_window_stats(arrays, bounds['test_start'], bounds['test_end']) for arrays in trades]
+    stack = lambda stats, key: np.vstack([s[key] for s in stats])  # combinaciones x ventanas
+
+    eligible = stack(ins, 'trades') >= min_trades
+    score = np.where(eligible, stack(ins, objective), -np.inf)
+    # Mejor objective y, a igualdad, mejor win rate (lexsort ordena por la última clave)
+    best = np.lexsort((-stack(ins, 'win_rate'), -score), axis=0)[0]
+    has_pick = eligible[best, np.arange(len(spans))]
+
+    rows, pieces = [], []
+    for k, window in enumerate(spans):
+        row = {key: pd.Timestamp(value, tz='UTC') for key, value in window.items()}
+        c = int(best[k]) if has_pick[k] else None
+        row['combo'] = c
+        row.update(combos[c] if c is not None else {})
+        for prefix, stats in (('is', ins), ('oos', oos)):
+            for key in ('trades', 'expectancy_r', 'win_rate', 'total_r'):
+                value = stats[c][key][k] if c is not None else 0
+                row[f'{prefix}_{key}'] = int(value) if key == 'trades' else round(float(value), 4)
+        rows.append(row)
+        if c is not None:
+            entry = trades[c]['entry_time']
+            a, b = np.searchsorted(entry, [window['test_start'], window['test_end']], side='left')
+            pieces.append({key: values[a:b] for key, values in trades[c].items()})
+
+    arrays = {key: np.concatenate([p[key] for p in pieces]) for key in trades[0]} if pieces else {
+        key: values[:0] for key, values in trades[0].items()}
+    ledger, curve = equity_curve(trades_frame(arrays), bot.risk)
+    report = pd.DataFrame(rows)
+
+    expectancy = lambda prefix: report[f'{prefix}_total_r'].sum() / max(int(report[f'{prefix}_trades'].sum()), 1)
+    is_r, oos_r = expectancy('is'), expectancy('oos')
+    return {
+        "windows": report,
+        "ledger": ledger,
+        "equity": curve,
+        "stats": summarize(ledger, bot.risk),
+        "efficiency": round(float(oos_r / is_r), 3) if is_r > 0 else 0.0,
+    }
+
+
+def main():
+    import argparse
+
+    from core.bot import ArgentinaBot
+    from data_loader import load_universe
+
+    parser = argparse.ArgumentParser(description="Walk-forward de parámetros SMC sobre historia en cache")
+    parser.add_argument("pairs", nargs="+", help="Tickers de Yahoo Finance")
+    parser.add_argument("--timeframe", default="15m", choices=["1m", "5m", "15m", "1h", "4h"])
+    parser.add_argument("--train", default="30D", help="Duración del entrenamiento (pandas, ej. 30D)")
+    parser.add_argument("--test", default="7D", help="Duración de la prueba fuera de muestra")
+    parser.add_argument("--step", default=None, help="Avance entre ventanas (por defecto --test)")
+    parser.add_argument("--anchored", action="store_true", help="Entrenamiento siempre desde el inicio")
+    parser.add_argument("--samples", type=int, default=200, help="Combinaciones al azar (0 = grid completo)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--objective", default="expectancy_r", choices=OBJECTIVES)
+    parser.add_argument("--min-trades", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--horizon", type=int, default=None, help="Velas máximas por trade")
+    parser.add_argument("--argentina", action="store_true", help="Usar ArgentinaBot (CEDEARs / Merval)")
+    args = parser.parse_args()
+
+    bot = (ArgentinaBot if args.argentina else InstitutionalBot)(pivot_mode="confirmed")
+    frames = {pair: data.get(args.timeframe) for pair, data in load_universe(args.pairs, [args.timeframe]).items()}
+    combos = random_search(DEFAULT_SPACE, args.samples, args.seed) if args.samples else grid(DEFAULT_SPACE)
+    wf = walk_forward(frames, args.timeframe, combos, args.train, args.test, step=args.step, anchored=args.anchored,
+                      bot=bot, workers=args.workers, horizon=args.horizon, objective=args.objective,
+                      min_trades=args.min_trades)
+
+    columns = ['test_start', 'test_end', 'combo', 'is_trades', 'is_expectancy_r', 'oos_trades', 'oos_expectancy_r',
+               'oos_win_rate']
+    print(wf["windows"][columns].to_string())
+    print("\nOOS: " + " • ".join(f"{k} {v}" for k, v in wf["stats"].items()))
+    print(f"Eficiencia walk-forward (OOS / IS): {wf['efficiency']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Tiempo de señales (find_setups) y backtest (run_universe) para un universo de
+pares con un año de velas de 5m. El análisis SMC se calcula una vez y se
+reutiliza para todos los pares (sólo se mide el motor de backtest). Pivots
+"confirmed", como exige el motor.
+
+Uso: python benchmarks/bench_backtest.py [n_pares] [n_velas]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtest.engine import run_universe
+from benchmarks.bench_memory import synthetic_ohlcv
+from core.bot import InstitutionalBot
+
+
+def main():
+    n_pairs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    n_bars = int(sys.argv[2]) if len(sys.argv) > 2 else 105_000
+    bot = InstitutionalBot(pivot_mode="confirmed")
+    analyzed = bot.smc.analyze(synthetic_ohlcv(n_bars, seed=1))
+
+    start = time.perf_counter()
+    setups = bot.find_setups(analyzed, "EURUSD=X", "5m", htf_bias="BULLISH")
+    t_signals = time.perf_counter() - start
+
+    items = {f"PAR{i}": (analyzed, setups) for i in range(n_pairs)}
+    start = time.perf_counter()
+    result = run_universe(items, horizon=20)
+    t_backtest = time.perf_counter() - start
+
+    total = n_pairs * n_bars
+    print(f"Pares: {n_pairs}  Velas por par: {n_bars}")
+    print(f"Señales:  {t_signals * 1000:.0f} ms por par ({n_bars / t_signals / 1e6:.1f} M velas/s)")
+    print(f"Backtest: {t_backtest:.2f} s ({total / t_backtest / 1e6:.1f} M velas/s, {result['stats']['trades']} trades)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Memoria de los frames analizados que se guardan por par en la sesión
+(result_data["df"]), en formato normal vs compacto.
+
+Uso: python benchmarks/bench_memory.py [n_pares] [n_velas]
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analysis.smc import SMCAnalyzer
+from data_loader import add_session_info
+
+
+def synthetic_ohlcv(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 1.10 + np.cumsum(rng.normal(0, 0.0005, n))
+    spread = np.abs(rng.normal(0, 0.0004, n))
+    df = pd.DataFrame({
+        'Date': pd.date_range('2024-01-01', periods=n, freq='15min', tz='UTC'),
+        'Open': np.r_[close[0], close[:-1]],
+        'High': close + spread,
+        'Low': close - spread,
+        'Close': close,
+        'Volume': rng.integers(100, 1000, n).astype(float),
+    })
+    return add_session_info(df)
+
+
+def main():
+    n_pairs = int(sys.argv[1]) if len(sys.argv) > 1 else 28
+    n_bars = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    smc = SMCAnalyzer()
+
+    full = stored = 0
+    for i in range(n_pairs):
+        df = smc.analyze(synthetic_ohlcv(max(n_bars, 300), seed=i)).tail(n_bars)
+        full += smc.memory_bytes(df)
+        stored += smc.memory_bytes(smc.to_compact(df))
+
+    print(f"Pares: {n_pairs}  Velas por par: {n_bars}")
+    print(f"Normal:   {full / 1024:.1f} KB")
+    print(f"Compacto: {stored / 1024:.1f} KB")
+    print(f"Ahorro:   {(1 - stored / full) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Tiempo del Monte Carlo de core/montecarlo.py: 100k caminos de una historia
+sintética de R-multiples (win rate 42%, TP a 2R), bootstrap simple y por
+bloques, más la tabla de riesgos de suggest_risk.
+
+Uso: python benchmarks/bench_montecarlo.py [caminos] [trades]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.montecarlo import simulate, suggest_risk
+
+
+def main():
+    paths = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    n_trades = int(sys.argv[2]) if len(sys.argv) > 2 else 250
+    rng = np.random.default_rng(1)
+    r = np.where(rng.random(n_trades) < 0.42, 2.0, -1.0)
+
+    for block in (None, 5):
+        start = time.perf_counter()
+        sim = simulate(r, risk_percent=1.0, paths=paths, block=block, trades_per_day=4, seed=1)
+        elapsed = time.perf_counter() - start
+        stats = sim["stats"]
+        print(f"Bloque {block or 1}: {elapsed:.2f} s ({paths * n_trades / elapsed / 1e6:.0f} M trades/s)  "
+              f"DD p95 {stats['max_drawdown_pct_p95']}%  ruina {stats['ruin_probability']}%  "
+              f"racha perdedora p95 {stats['loss_streak_p95']}")
+
+    start = time.perf_counter()
+    risk, _table = suggest_risk(r, max_drawdown_percent=20.0, paths=paths, seed=1)
+    print(f"suggest_risk (20 riesgos): {time.perf_counter() - start:.2f} s -> {risk}% por trade")
+
+
+if __name__ == "__main__":
+    main()
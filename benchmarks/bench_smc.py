@@ -0,0 +1,47 @@
+"""
+µs por vela de SMCAnalyzer.analyze: implementación pandas original vs kernels
+NumPy (con y sin construir el DataFrame final) y el análisis mínimo que usa
+el sesgo HTF/D1 (features=['trend']).
+
+Uso: python benchmarks/bench_smc.py [n_velas ...]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analysis.smc import SMCAnalyzer
+from benchmarks.bench_memory import synthetic_ohlcv
+
+
+def timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    sizes = [int(n) for n in sys.argv[1:]] or [1_000, 100_000, 1_000_000]
+    legacy = SMCAnalyzer(engine="pandas")
+    fast = SMCAnalyzer(engine="numpy")
+
+    print(f"{'velas':>10} {'pandas':>12} {'numpy (df)':>12} {'numpy (arrays)':>15} {'sólo trend':>12}   µs/vela")
+    for n in sizes:
+        df = synthetic_ohlcv(n)
+        repeat = 5 if n <= 100_000 else 1
+        results = [
+            timed(lambda: legacy.analyze(df), repeat),
+            timed(lambda: fast.analyze(df), repeat),
+            timed(lambda: fast.analyze_arrays(df), repeat),
+            timed(lambda: fast.analyze(df, features=['trend']), repeat),
+        ]
+        print(f"{n:>10} " + " ".join(f"{t / n * 1e6:>12.3f}" for t in results[:2])
+              + f" {results[2] / n * 1e6:>15.3f} {results[3] / n * 1e6:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,19 @@
 try:
-    from data_loader import load_data
+    from data_loader import load_data, load_timeframes, load_universe
 except ModuleNotFoundError:
     import sys, os
     sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-    from data_loader import load_data
+    from data_loader import load_data, load_timeframes, load_universe
 from analysis.smc import SMCAnalyzer
+from analysis.cache import AnalysisCache
+from analysis.signals import SETUP_PARAMS, find_setups
 from core.risk import RiskManager
 from core.journal import TradeJournal
+from core.parallel import analyze_in_processes
+from market_data.async_fetch import fetch_engine
+from market_data.ratelimit import yahoo_governor
+import asyncio
+import time
 import pandas as pd
 import numpy as np
 import json
@@ -14,9 +21,19 @@ from urllib.request import Request, urlopen
 from datetime import datetime
 import yfinance as yf
 
+# Análisis ya calculados, compartidos por todos los bots/reruns del proceso (ver analysis/cache.py)
+_analysis_cache = AnalysisCache()
+
+
+def analysis_cache_stats():
+    """Contadores de la cache de análisis (hits/misses/evictions)."""
+    return _analysis_cache.stats()
+
+
 class InstitutionalBot:
-    def __init__(self, strict_mode=False, min_atr_m5=5.0, min_atr_m15=8.0, use_ai=False, ai_model="deepseek-reasoner", ai_api_key=None, ai_provider="deepseek"):
-        self.smc = SMCAnalyzer()
+    def __init__(self, strict_mode=False, min_atr_m5=5.0, min_atr_m15=8.0, use_ai=False, ai_model="deepseek-reasoner", ai_api_key=None, ai_provider="deepseek", compact_results=False, pivot_mode="centered"):
+        # pivot_mode="confirmed": pivots sin lookahead (ver SMCAnalyzer)
+        self.smc = SMCAnalyzer(pivot_mode=pivot_mode)
         self.risk = RiskManager()
         self.journal = TradeJournal()
         self.htf_timeframe = "1h"
@@ -27,12 +44,131 @@ class InstitutionalBot:
         self.ai_model = ai_model
         self.ai_api_key = ai_api_key
         self.ai_provider = ai_provider
+        # Guardar result_data["df"] en formato compacto (float32/categorías/bits)
+        self.compact_results = compact_results
+        # Parámetros de las reglas clásicas (ATR de SL/TP, proximidad, probabilidades)
+        self.setup_params = dict(SETUP_PARAMS)
+        # Noticias por activo del scan() en curso (None fuera de un scan)
+        self._news_memo = None
+
+    def preload(self, pairs, timeframe):
+        """
+        Descarga masiva para escanear un universo completo: una petición agrupada
+        por serie base (operativo/HTF re-muestreados + D1) en vez de tres por par.
+        Devuelve {par: {timeframe: df}} para pasar a run_analysis(preloaded=...).
+        El sesgo HTF y D1 de todo el universo se calcula de una vez (análisis
+        en panel) y queda en {par: {"bias": {timeframe: sesgo}}}.
+        """
+        preloaded = load_universe(pairs, self._analysis_timeframes(timeframe))
+        self._preload_bias(preloaded)
+        return preloaded
+
+    def _preload_bias(self, preloaded):
+        for tf in dict.fromkeys([self.htf_timeframe, "1d"]):
+            biases = self.smc.get_market_bias_panel({pair: frames.get(tf) for pair, frames in preloaded.items()})
+            for pair, bias in biases.items():
+                preloaded[pair].setdefault("bias", {})[tf] = bias
 
-    def run_analysis(self, pair="EURUSD=X", timeframe="1h", output_file=None):
+    def scan(self, pairs, timeframe="1h", workers=0, concurrency=None, on_result=None):
+        """
+        Escanea un universo de pares. El trabajo compartido se planifica una
+        sola vez: preload (descarga masiva y sesgo HTF/D1 de todo el universo
+        en panel) y, en modo IA, una consulta de noticias por activo (más el
+        proxy USD=X si hace falta). Después corre run_analysis por par: en
+        `workers` procesos (modo clásico, ver core/parallel.py) o en el pool
+        de hilos de fetch_engine con `concurrency` pares a la vez.
+
+        on_result(par, resultado, error) se llama a medida que termina cada
+        par, en el hilo que llamó a scan (render incremental).
+
+        Devuelve {"timeframe", "results": {par: result_data}, "errors":
+        {par: mensaje}, "signals": [pares con señal], "memory": {"full",
+        "stored"} (bytes de los df guardados) y "timings": segundos por etapa
+        (fetch (preload: descarga + sesgo), news, analysis, total)}.
+        """
+        batch = {"timeframe": timeframe, "results": {}, "errors": {}, "signals": [],
+                 "memory": {"full": 0, "stored": 0}, "timings": {}}
+        timings = batch["timings"]
+        start = time.perf_counter()
+
+        def stage(name, since):
+            now = time.perf_counter()
+            timings[name] = round(now - since, 4)
+            return now
+
+        t = start
+        try:
+            preloaded = self.preload(pairs, timeframe)
+        except Exception as e:
+            print(f"Fallo precarga masiva, se usa descarga individual: {e}")
+            preloaded = {}
+        t = stage("fetch", t)
+        self._news_memo = {}
+        if self.use_ai:
+            self._prefetch_news(pairs, concurrency)
+        t = stage("news", t)
+
+        def collect(pair, result, error):
+            if error is not None or not result or result.get("error"):
+                batch["errors"][pair] = str(error) if error is not None else (result or {}).get("error", "Resultado Nulo")
+            if result:
+                batch["results"][pair] = result
+                for k in batch["memory"]:
+                    batch["memory"][k] += result.get("df_memory", {}).get(k, 0)
+                if result.get("signal"):
+                    batch["signals"].append(pair)
+            if on_result is not None:
+                on_result(pair, result, error)
+
+        try:
+            if workers and not self.use_ai and preloaded:
+                for pair, result, error in analyze_in_processes(self, pairs, timeframe, preloaded, workers=workers):
+                    collect(pair, result, error)
+            else:
+                def analyze(pair):
+                    try:
+                        return self.run_analysis(pair=pair, timeframe=timeframe, preloaded=preloaded.get(pair))
+                    except Exception as e:
+                        return {"pair": pair, "error": str(e)}
+
+                async def run_all():
+                    async for pair, result, error in fetch_engine.map_as_completed(analyze, pairs, limit=concurrency):
+                        collect(pair, result, error)
+
+                asyncio.run(run_all())
+        finally:
+            self._news_memo = None
+        stage("analysis", t)
+        timings["total"] = round(time.perf_counter() - start, 4)
+        return batch
+
+    def _analyze(self, pair, timeframe, df, features=None):
+        """SMCAnalyzer.analyze pasando por la cache de análisis compartida."""
+        params = self.smc.params() + (tuple(features) if features else None,)
+        return _analysis_cache.get_or_compute(pair, timeframe, df, params,
+                                              lambda: self.smc.analyze(df, features=features))
+
+    def _analysis_timeframes(self, timeframe):
+        return list(dict.fromkeys([timeframe, self.htf_timeframe, "1d"]))
+
+    def _load(self, pair, timeframe, preloaded=None):
+        """Usa el frame precargado si existe; si no, descarga individual."""
+        if preloaded and preloaded.get(timeframe) is not None:
+            return preloaded[timeframe]
+        return load_data(pair, timeframe)
+
+    def _bias(self, pair, timeframe, preloaded=None):
+        """Sesgo precalculado por preload, si existe."""
+        if preloaded:
+            return preloaded.get("bias", {}).get(timeframe)
+        return None
+
+    def run_analysis(self, pair="EURUSD=X", timeframe="1h", output_file=None, preloaded=None):
         """
         Ejecuta el análisis. Si output_file se proporciona, escribe el resultado en ese archivo.
         Devuelve un diccionario con los datos estructurados para su uso en interfaces (Streamlit).
-        Timeframe puede ser: "1m", "5m", "15m", "1h".
+        Timeframe puede ser: "1m", "5m", "15m", "1h", "4h".
+        preloaded: dict opcional {timeframe: df} (ver preload) para evitar descargas por par.
         """
         result_data = {
             "pair": pair,
@@ -55,8 +191,10 @@ class InstitutionalBot:
         log(f"   FECHA: {result_data['timestamp']}")
         log(f"============================================================")
         
-        # 1. Cargar Datos
-        df = load_data(pair, timeframe)
+        # 1. Cargar Datos (operativo + HTF + D1 comparten la descarga base)
+        if preloaded is None:
+            preloaded = load_timeframes(pair, self._analysis_timeframes(timeframe))
+        df = self._load(pair, timeframe, preloaded)
         if df is None or df.empty:
             msg = f"[ERROR] No se pudieron cargar datos para {pair} ({timeframe})"
             log(msg)
@@ -65,28 +203,36 @@ class InstitutionalBot:
             return result_data
 
         # 2. Análisis Técnico SMC
-        df = self.smc.analyze(df)
+        df = self._analyze(pair, timeframe, df)
         
         # Guardar DF para gráficos (últimas 200 velas para rendimiento)
-        result_data["df"] = df.tail(200)
-
+        chart_df = df.tail(200)
+        full_bytes = self.smc.memory_bytes(chart_df)
+        if self.compact_results:
+            chart_df = self.smc.to_compact(chart_df)
+        result_data["df"] = chart_df
+        result_data["df_memory"] = {"full": full_bytes, "stored": self.smc.memory_bytes(chart_df)}
         
         # 3. Contexto de Mercado Detallado
         last_row = df.iloc[-1]
         current_price = last_row['Close']
         bias = self.smc.get_market_bias(df)
-        htf_bias = self._get_htf_bias(pair)
+        htf_bias = self._bias(pair, self.htf_timeframe, preloaded)
+        if htf_bias is None:
+            htf_bias = self._get_htf_bias(pair, self._load(pair, self.htf_timeframe, preloaded))
         
         # --- MATRIZ DE TENDENCIAS (NUEVO) ---
         # Analizar H1 y D1 para confluencia
-        trend_matrix = {"M15": bias, "H1": htf_bias, "D1": "NEUTRAL"}
-        try:
-            df_d1 = load_data(pair, timeframe="1d")
-            if not df_d1.empty:
-                df_d1 = self.smc.analyze(df_d1)
-                trend_matrix["D1"] = self.smc.get_market_bias(df_d1)
-        except:
-            pass # Fallback silencioso si falla D1
+        d1_bias = self._bias(pair, "1d", preloaded)
+        trend_matrix = {"M15": bias, "H1": htf_bias, "D1": d1_bias or "NEUTRAL"}
+        if d1_bias is None:
+            try:
+                df_d1 = self._load(pair, "1d", preloaded)
+                if not df_d1.empty:
+                    df_d1 = self._analyze(pair, "1d", df_d1, features=['trend'])
+                    trend_matrix["D1"] = self.smc.get_market_bias(df_d1)
+            except:
+                pass # Fallback silencioso si falla D1
         
         result_data["trend_matrix"] = trend_matrix
 
@@ -100,10 +246,27 @@ class InstitutionalBot:
         if last_row.get('is_ny'): session_status.append("NUEVA YORK")
         if not session_status: session_status.append("ASIA / CIERRE (Baja Liquidez)")
         
+        # Estructura (BOS/CHoCH): sesgo estructural y última ruptura
+        structure_bias = last_row.get('structure_bias', "RANGING")
+        structure_event = None
+        event_cols = ['bos_bullish', 'bos_bearish', 'choch_bullish', 'choch_bearish']
+        if all(col in df.columns for col in event_cols):
+            events = df[event_cols].to_numpy(dtype=bool)
+            hits = np.flatnonzero(events.any(axis=1))
+            if len(hits):
+                col = event_cols[int(np.argmax(events[hits[-1]]))]
+                structure_event = {
+                    "type": col.split('_')[0].upper(),
+                    "direction": "BULLISH" if col.endswith("bullish") else "BEARISH",
+                    "bars_ago": int(len(df) - 1 - hits[-1]),
+                }
+
         result_data["market_context"] = {
             "current_price": current_price,
             "bias": bias,
             "htf_bias": htf_bias,
+            "structure_bias": structure_bias,
+            "structure_event": structure_event,
             "session": ' + '.join(session_status)
         }
 
@@ -111,6 +274,9 @@ class InstitutionalBot:
         log(f"    Precio Actual:       {current_price:.5f}")
         log(f"    Tendencia Dominante: {bias}")
         log(f"    Tendencia HTF(1h):   {htf_bias}")
+        log(f"    Estructura (SMC):    {structure_bias}")
+        if structure_event:
+            log(f"    Última Ruptura:      {structure_event['type']} {structure_event['direction']} (hace {structure_event['bars_ago']} velas)")
         log(f"    Sesión Activa:       {' + '.join(session_status)}")
         
         log(f"\n[2] NIVELES ESTRUCTURALES (SMC)")
@@ -121,15 +287,42 @@ class InstitutionalBot:
         dist_high = abs(current_price - last_pivot_high) * 10000
         dist_low = abs(current_price - last_pivot_low) * 10000
         
+        # Pools de liquidez (EQH/EQL sin barrer más cercanos al precio)
+        liquidity_above = last_row.get('liquidity_above')
+        liquidity_below = last_row.get('liquidity_below')
+        liquidity_above = None if liquidity_above is None or pd.isna(liquidity_above) else float(liquidity_above)
+        liquidity_below = None if liquidity_below is None or pd.isna(liquidity_below) else float(liquidity_below)
+
+        # Zonas activas (FVG / Order Blocks sin mitigar) más cercanas al precio
+        active_zones = {}
+        for side in ("demand", "supply"):
+            top, bottom = last_row.get(side + '_top'), last_row.get(side + '_bottom')
+            if top is None or pd.isna(top):
+                active_zones[side] = None
+            else:
+                active_zones[side] = {"top": float(top), "bottom": float(bottom), "kind": str(last_row.get(side + '_kind', ''))}
+
         result_data["smc_levels"] = {
             "supply_zone": last_pivot_high,
             "demand_zone": last_pivot_low,
             "dist_supply_pips": dist_high,
-            "dist_demand_pips": dist_low
+            "dist_demand_pips": dist_low,
+            "liquidity_above": liquidity_above,
+            "liquidity_below": liquidity_below,
+            "active_demand": active_zones["demand"],
+            "active_supply": active_zones["supply"]
         }
 
         log(f"    Distancia a Oferta:  {dist_high:.1f} pips")
         log(f"    Distancia a Demanda: {dist_low:.1f} pips")
+        if liquidity_above is not None:
+            log(f"    Liquidez EQH (arriba): {liquidity_above:.5f}")
+        if liquidity_below is not None:
+            log(f"    Liquidez EQL (abajo):  {liquidity_below:.5f}")
+        for side, label in (("supply", "Oferta"), ("demand", "Demanda")):
+            zone = active_zones[side]
+            if zone is not None:
+                log(f"    Zona {label} activa ({zone['kind']}): {zone['bottom']:.5f} - {zone['top']:.5f}")
 
         # 4. Búsqueda de Setup
         if self.use_ai:
@@ -191,11 +384,12 @@ class InstitutionalBot:
             return 100.0
         return 10000.0
 
-    def _get_htf_bias(self, pair):
-        htf_df = load_data(pair, timeframe=self.htf_timeframe)
+    def _get_htf_bias(self, pair, htf_df=None):
+        if htf_df is None:
+            htf_df = load_data(pair, timeframe=self.htf_timeframe)
         if htf_df is None or htf_df.empty:
             return "NEUTRAL"
-        htf_df = self.smc.analyze(htf_df)
+        htf_df = self._analyze(pair, self.htf_timeframe, htf_df, features=['trend'])
         return self.smc.get_market_bias(htf_df)
 
     def _call_ai_api(self, system_prompt, user_prompt, response_format_json=True):
@@ -261,8 +455,9 @@ class InstitutionalBot:
         pip_f = self._pip_factor(pair)
         atr_pips = atr * pip_f
         min_atr = self.min_atr_m5 if timeframe == "5m" else self.min_atr_m15 if timeframe == "15m" else 0.0
+        p = self.setup_params
 
-        # Lógica algorítmica clásica
+        # Lógica algorítmica clásica (versión vectorizada: analysis/signals.py)
         if min_atr > 0 and atr_pips < min_atr:
             return None, "atr_low"
         setup = None
@@ -271,15 +466,15 @@ class InstitutionalBot:
             last_pivot_low = df['last_pivot_low'].iloc[-1]
             if not pd.isna(last_pivot_low):
                 dist_pips = (last_row['Close'] - last_pivot_low) * pip_f
-                if 0 < dist_pips < 30: 
-                    sl = last_pivot_low - (atr * 1.2)
-                    tp = last_row['Close'] + (atr * 3.0)
+                if 0 < dist_pips < p['proximity_pips']: 
+                    sl = last_pivot_low - (atr * p['pivot_sl_atr'])
+                    tp = last_row['Close'] + (atr * p['pivot_tp_atr'])
                     setup = {
                         'type': 'BUY',
                         'entry': last_row['Close'],
                         'sl': sl,
                         'tp': tp,
-                        'prob': 88 if in_kz else 82 if is_in_session else 72,
+                        'prob': self._tier(p['pivot_prob'], in_kz, is_in_session),
                         'reason': "SMC: Retesteo de Zona de Demanda (Order Block)"
                     }
 
@@ -287,21 +482,21 @@ class InstitutionalBot:
             last_pivot_high = df['last_pivot_high'].iloc[-1]
             if not pd.isna(last_pivot_high):
                 dist_pips = (last_pivot_high - last_row['Close']) * pip_f
-                if 0 < dist_pips < 30:
-                    sl = last_pivot_high + (atr * 1.2)
-                    tp = last_row['Close'] - (atr * 3.0)
+                if 0 < dist_pips < p['proximity_pips']:
+                    sl = last_pivot_high + (atr * p['pivot_sl_atr'])
+                    tp = last_row['Close'] - (atr * p['pivot_tp_atr'])
                     setup = {
                         'type': 'SELL',
                         'entry': last_row['Close'],
                         'sl': sl,
                         'tp': tp,
-                        'prob': 88 if in_kz else 82 if is_in_session else 72,
+                        'prob': self._tier(p['pivot_prob'], in_kz, is_in_session),
                         'reason': "SMC: Retesteo de Zona de Oferta (Order Block)"
                     }
 
         if setup: 
             if htf_bias != bias:
-                setup['prob'] = max(60, int(setup['prob'] * 0.8))
+                setup['prob'] = max(p['prob_floor'], int(setup['prob'] * p['pivot_htf_penalty']))
             if self.strict_mode and timeframe in ["5m", "15m"]:
                 if htf_bias != bias:
                     return None, "htf_mismatch"
@@ -311,64 +506,90 @@ class InstitutionalBot:
 
         if bias == "BULLISH" and last_row.get('fvg_bullish'):
             fvg_bottom = last_row['fvg_bottom']
-            sl = fvg_bottom - (atr * 1.0)
-            tp = last_row['Close'] + (atr * 2.5)
+            sl = fvg_bottom - (atr * p['fvg_sl_atr'])
+            tp = last_row['Close'] + (atr * p['fvg_tp_atr'])
             setup = {
                 'type': 'BUY',
                 'entry': last_row['Close'],
                 'sl': sl,
                 'tp': tp,
-                'prob': 84 if in_kz else 78 if is_in_session else 68,
+                'prob': self._tier(p['fvg_prob'], in_kz, is_in_session),
                 'reason': "FVG: Rebalanceo de Imbalance Alcista"
             }
         
         elif bias == "BEARISH" and last_row.get('fvg_bearish'):
             fvg_top = last_row['fvg_top']
-            sl = fvg_top + (atr * 1.0)
-            tp = last_row['Close'] - (atr * 2.5)
+            sl = fvg_top + (atr * p['fvg_sl_atr'])
+            tp = last_row['Close'] - (atr * p['fvg_tp_atr'])
             setup = {
                 'type': 'SELL',
                 'entry': last_row['Close'],
                 'sl': sl,
                 'tp': tp,
-                'prob': 84 if in_kz else 78 if is_in_session else 68,
+                'prob': self._tier(p['fvg_prob'], in_kz, is_in_session),
                 'reason': "FVG: Rebalanceo de Imbalance Bajista"
             }
 
+        # Reacción en una zona activa (FVG / Order Block sin mitigar) que la vela tocó
+        # (opcional: setup_params['zone_entries'])
+        if p['zone_entries'] and not setup and bias == "BULLISH" and last_row.get('demand_touch') and not pd.isna(last_row.get('demand_bottom')):
+            sl = last_row['demand_bottom'] - (atr * p['zone_sl_atr'])
+            tp = last_row['Close'] + (atr * p['zone_tp_atr'])
+            setup = {
+                'type': 'BUY',
+                'entry': last_row['Close'],
+                'sl': sl,
+                'tp': tp,
+                'prob': self._tier(p['zone_prob'], in_kz, is_in_session),
+                'reason': f"Zona: Reacción en Demanda activa ({last_row.get('demand_kind')})"
+            }
+
+        elif p['zone_entries'] and not setup and bias == "BEARISH" and last_row.get('supply_touch') and not pd.isna(last_row.get('supply_top')):
+            sl = last_row['supply_top'] + (atr * p['zone_sl_atr'])
+            tp = last_row['Close'] - (atr * p['zone_tp_atr'])
+            setup = {
+                'type': 'SELL',
+                'entry': last_row['Close'],
+                'sl': sl,
+                'tp': tp,
+                'prob': self._tier(p['zone_prob'], in_kz, is_in_session),
+                'reason': f"Zona: Reacción en Oferta activa ({last_row.get('supply_kind')})"
+            }
+
         ema_50 = last_row.get('EMA_50')
         if ema_50:
             dist_ema = abs(last_row['Close'] - ema_50) * pip_f
             
-            if dist_ema < 15:
+            if dist_ema < p['ema_distance_pips']:
                 if bias == "BULLISH" and last_row['Close'] > ema_50:
-                    sl = ema_50 - (atr * 1.2)
-                    tp = last_row['Close'] + (atr * 2.4)
+                    sl = ema_50 - (atr * p['ema_sl_atr'])
+                    tp = last_row['Close'] + (atr * p['ema_tp_atr'])
                     setup = {
                         'type': 'BUY',
                         'entry': last_row['Close'],
                         'sl': sl,
                         'tp': tp,
-                        'prob': 80 if in_kz else 74 if is_in_session else 64,
+                        'prob': self._tier(p['ema_prob'], in_kz, is_in_session),
                         'reason': "Trend: Rebote Dinámico en EMA 50"
                     }
                 elif bias == "BEARISH" and last_row['Close'] < ema_50:
-                    sl = ema_50 + (atr * 1.2)
-                    tp = last_row['Close'] - (atr * 2.4)
+                    sl = ema_50 + (atr * p['ema_sl_atr'])
+                    tp = last_row['Close'] - (atr * p['ema_tp_atr'])
                     setup = {
                         'type': 'SELL',
                         'entry': last_row['Close'],
                         'sl': sl,
                         'tp': tp,
-                        'prob': 80 if in_kz else 74 if is_in_session else 64,
+                        'prob': self._tier(p['ema_prob'], in_kz, is_in_session),
                         'reason': "Trend: Rechazo Dinámico en EMA 50"
                     }
 
         if setup:
             rsi = last_row.get('RSI', 50)
-            if setup['type'] == 'BUY' and rsi > 70: return None, "rsi_extreme"
-            if setup['type'] == 'SELL' and rsi < 30: return None, "rsi_extreme"
+            if setup['type'] == 'BUY' and rsi > p['rsi_overbought']: return None, "rsi_extreme"
+            if setup['type'] == 'SELL' and rsi < p['rsi_oversold']: return None, "rsi_extreme"
             if htf_bias != bias:
-                setup['prob'] = max(60, int(setup['prob'] * 0.85))
+                setup['prob'] = max(p['prob_floor'], int(setup['prob'] * p['htf_penalty']))
             if self.strict_mode and timeframe in ["5m", "15m"]:
                 if htf_bias != bias:
                     return None, "htf_mismatch"
@@ -382,29 +603,29 @@ class InstitutionalBot:
             
             if not pd.isna(last_pivot_high) and rsi > 50: 
                 dist_pips = (last_pivot_high - last_row['Close']) * pip_f
-                if 0 < dist_pips < 30:
-                    sl = last_pivot_high + (atr * 1.0)
-                    tp = last_row['Close'] - (atr * 2.2)
+                if 0 < dist_pips < p['proximity_pips']:
+                    sl = last_pivot_high + (atr * p['range_sl_atr'])
+                    tp = last_row['Close'] - (atr * p['range_tp_atr'])
                     setup = {
                         'type': 'SELL',
                         'entry': last_row['Close'],
                         'sl': sl,
                         'tp': tp,
-                        'prob': 72, 
+                        'prob': p['range_prob'],
                         'reason': "Rango: Rechazo en Resistencia (Scalping)"
                     }
             
             if not setup and not pd.isna(last_pivot_low) and rsi < 50:
                 dist_pips = (last_row['Close'] - last_pivot_low) * pip_f
-                if 0 < dist_pips < 30:
-                    sl = last_pivot_low - (atr * 1.0)
-                    tp = last_row['Close'] + (atr * 2.2)
+                if 0 < dist_pips < p['proximity_pips']:
+                    sl = last_pivot_low - (atr * p['range_sl_atr'])
+                    tp = last_row['Close'] + (atr * p['range_tp_atr'])
                     setup = {
                         'type': 'BUY',
                         'entry': last_row['Close'],
                         'sl': sl,
                         'tp': tp,
-                        'prob': 72,
+                        'prob': p['range_prob'],
                         'reason': "Rango: Rebote en Soporte (Scalping)"
                     }
 
@@ -427,6 +648,21 @@ class InstitutionalBot:
             return setup, None
         return None, "no_setup"
 
+    @staticmethod
+    def _tier(probs, in_kz, is_in_session):
+        kz, session, other = probs
+        return kz if in_kz else session if is_in_session else other
+
+    def find_setups(self, df, pair, timeframe, htf_bias=None):
+        """
+        _find_setup para todas las velas de un frame analizado a la vez
+        (analysis/signals.py). htf_bias: etiqueta o array por vela.
+        """
+        min_atr = self.min_atr_m5 if timeframe == "5m" else self.min_atr_m15 if timeframe == "15m" else 0.0
+        strict = self.strict_mode and timeframe in ["5m", "15m"]
+        return find_setups(df, self._pip_factor(pair), htf_bias=htf_bias, min_atr=min_atr, strict=strict,
+                           params=self.setup_params)
+
     def _find_setup_deepseek(self, df, pair, timeframe, bias, htf_bias, atr, pip_f):
         import json
         import re
@@ -707,17 +943,44 @@ Nada de teoría, nada de advertencias, máxima precisión. Si es NO TRADE, actio
             print(f"Error fetching general news: {e}")
             return []
 
+    def _ticker_news(self, symbol):
+        """
+        Noticias de yfinance (por el gobernador de Yahoo); durante un scan()
+        se consultan una vez por activo.
+        """
+        memo = self._news_memo
+        if memo is not None and symbol in memo:
+            return memo[symbol]
+        news = yahoo_governor.call(lambda: yf.Ticker(symbol).news, retry_empty=False)
+        if memo is not None:
+            memo[symbol] = news
+        return news
+
+    def _prefetch_news(self, pairs, concurrency=None):
+        async def fetch_all():
+            return await fetch_engine.gather(self._ticker_news, list(dict.fromkeys(pairs)), limit=concurrency)
+
+        news = asyncio.run(fetch_all())
+        # Los que fallaron quedan en None: run_analysis no los vuelve a pedir
+        for symbol, items in news.items():
+            self._news_memo.setdefault(symbol, items)
+        if not all(news.values()):
+            try:
+                self._ticker_news("USD=X")
+            except Exception as e:
+                print(f"Error fetching news for USD=X: {e}")
+                self._news_memo["USD=X"] = None
+
     def _get_fundamental_news(self, pair):
         try:
             # Intentar obtener noticias específicas del par
-            ticker = yf.Ticker(pair)
-            news = ticker.news
+            news = self._ticker_news(pair)
             headlines = []
             
             # Si no hay noticias del par, intentar con el Dólar Index o SP500 como proxy
             if not news:
                 try:
-                    news = yf.Ticker("USD=X").news
+                    news = self._ticker_news("USD=X")
                 except: pass
 
             if news:
@@ -732,8 +995,8 @@ Nada de teoría, nada de advertencias, máxima precisión. Si es NO TRADE, actio
 
 
 class ArgentinaBot(InstitutionalBot):
-    def __init__(self, strict_mode=False, min_atr_m5=5.0, min_atr_m15=8.0, use_ai=False, ai_model="deepseek-reasoner", ai_api_key=None, ai_provider="deepseek"):
-        super().__init__(strict_mode, min_atr_m5, min_atr_m15, use_ai, ai_model, ai_api_key, ai_provider)
+    def __init__(self, strict_mode=False, min_atr_m5=5.0, min_atr_m15=8.0, use_ai=False, ai_model="deepseek-reasoner", ai_api_key=None, ai_provider="deepseek", compact_results=False, pivot_mode="centered"):
+        super().__init__(strict_mode, min_atr_m5, min_atr_m15, use_ai, ai_model, ai_api_key, ai_provider, compact_results, pivot_mode)
         self.ai_provider = ai_provider
         self.ai_api_key = ai_api_key # Ensure API key is set correctly
         
@@ -896,9 +1159,9 @@ REGLAS CRÍTICAS:
             # print(f"ERROR PARSING AI: {e}")
             return None, f"ai_error: {str(e)}"
 
-    def run_analysis(self, pair="EURUSD=X", timeframe="1h", output_file=None):
+    def run_analysis(self, pair="EURUSD=X", timeframe="1h", output_file=None, preloaded=None):
         # Override parcial para capturar logs
-        res = super().run_analysis(pair, timeframe, output_file)
+        res = super().run_analysis(pair, timeframe, output_file, preloaded)
         # Asegurar que los logs de la IA lleguen al resultado final si existen en el error string
         if res.get("filter_reason") and "||" in res["filter_reason"]:
             parts = res["filter_reason"].split("||")
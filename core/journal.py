@@ -1,11 +1,14 @@
 import json
 import os
+import threading
 from datetime import datetime, timedelta
 import yfinance as yf
+from market_data.ratelimit import yahoo_governor
 
 class TradeJournal:
     def __init__(self, filepath="trade_journal.json"):
         self.filepath = filepath
+        self.lock = threading.Lock()
         self.trades = self._load_journal()
 
     def _load_journal(self):
@@ -40,7 +43,7 @@ class TradeJournal:
         horizon_bars = 20 if tf in ['5m','15m'] else 10
         delta = 5 if tf=='5m' else 15 if tf=='15m' else 60
         end_dt = start_dt + timedelta(minutes=delta*horizon_bars)
-        data = yf.download(pair, start=start_dt, end=end_dt, interval=tf, progress=False, auto_adjust=True)
+        data = yahoo_governor.call(yf.download, pair, start=start_dt, end=end_dt, interval=tf, progress=False, auto_adjust=True, retry_empty=False)
         if data.empty:
             return 'no_data'
         entry = t['entry']; sl = t['sl']; tp = t['tp']; side = t['type']
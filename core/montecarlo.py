@@ -0,0 +1,195 @@
+"""
+Monte Carlo de secuencias de trades: re-muestrea los R-multiples realizados
+(TradeTracker, TradeJournal o el ledger de backtest/engine.py) en muchos
+caminos de riesgo fijo compuesto y da la distribución de drawdown máximo,
+retorno, rachas y probabilidad de ruina.
+
+- bootstrap (block=None): cada trade sale al azar, independiente.
+- block bootstrap (block=k): bloques circulares de k trades consecutivos,
+  conserva las rachas y la dependencia entre trades seguidos.
+
+Todos los caminos se simulan a la vez como una matriz (caminos x trades)
+con cumsum de log(1 + R * riesgo) (por tramos de _MAX_CELLS celdas para
+acotar memoria). risk_table reusa los mismos caminos para varios riesgos
+por trade, así la comparación no depende del azar.
+
+    r = ledger_r(run_backtest(df, setups)["ledger"])
+    sim = simulate(r, risk_percent=1.0, paths=100_000, block=5, trades_per_day=4)
+    sim["stats"]
+    RiskManager().suggest_risk_percent(r, max_drawdown_percent=20)
+"""
+import numpy as np
+import pandas as pd
+
+# Tope de celdas (caminos x trades) por tramo
+_MAX_CELLS = 1 << 22
+# Percentiles de las distribuciones en stats / risk_table
+PERCENTILES = (5, 50, 95, 99)
+
+
+def tracker_r(tracker):
+    """R-multiples de los trades cerrados (WIN / LOSS) de un TradeTracker."""
+    out = []
+    for t in tracker.trades:
+        if t.get('status') not in ('WIN', 'LOSS'):
+            continue
+        risk = abs(t['entry'] - t['sl'])
+        if risk > 0:
+            side = 1 if t['type'] == 'BUY' else -1
+            out.append((t['exit_price'] - t['entry']) * side / risk)
+    return np.asarray(out, dtype=np.float64)
+
+
+def journal_r(journal):
+    """
+    R-multiples del TradeJournal: cada trade se evalúa con _evaluate_trade
+    (descarga, como get_stats); 'win' vale |TP - entrada| / |entrada - SL|
+    y 'loss' -1. Los abiertos o sin datos no cuentan.
+    """
+    out = []
+    for t in journal.trades:
+        if not all(k in t for k in ('entry', 'sl', 'tp')):
+            continue
+        risk = abs(t['entry'] - t['sl'])
+        if risk <= 0:
+            continue
+        res = journal._evaluate_trade(t)
+        if res == 'win':
+            out.append(abs(t['tp'] - t['entry']) / risk)
+        elif res == 'loss':
+            out.append(-1.0)
+    return np.asarray(out, dtype=np.float64)
+
+
+def ledger_r(ledger):
+    """R-multiples de un ledger de backtest (sin los trades 'open' al final de los datos)."""
+    if ledger is None or len(ledger) == 0:
+        return np.empty(0)
+    return ledger.loc[ledger['outcome'] != 'open', 'r'].to_numpy(dtype=np.float64)
+
+
+def _sample(rng, n_source, paths, n_trades, block):
+    """Índices (paths x n_trades) del bootstrap simple o por bloques circulares."""
+    if not block or block <= 1:
+        return rng.integers(0, n_source, size=(paths, n_trades))
+    n_blocks = -(-n_trades // block)
+    starts = rng.integers(0, n_source, size=(paths, n_blocks, 1))
+    return ((starts + np.arange(block)) % n_source).reshape(paths, n_blocks * block)[:, :n_trades]
+
+
+def _longest_run(mask):
+    """Racha más larga de True por fila."""
+    count = np.cumsum(mask, axis=1, dtype=np.int32)
+    last_reset = np.maximum.accumulate(np.where(mask, 0, count), axis=1)
+    return (count - last_reset).max(axis=1, initial=0)
+
+
+def _paths(r, risk_percents, paths, n_trades, block, ruin_percent, daily_limit, trades_per_day, seed):
+    """Distribuciones por camino para cada riesgo (mismos caminos para todos)."""
+    r = np.asarray(r, dtype=np.float64)
+    r = r[np.isfinite(r)]
+    if r.size == 0:
+        raise ValueError("No hay R-multiples para simular")
+    n_trades = int(n_trades or r.size)
+    rng = np.random.default_rng(seed)
+    ruin_log = np.log1p(-ruin_percent / 100.0) if ruin_percent < 100 else -np.inf
+    daily_log = np.log1p(-daily_limit / 100.0) if daily_limit is not None and trades_per_day else None
+    if daily_log is not None:
+        day_start = np.arange(n_trades) // int(trades_per_day) * int(trades_per_day)
+
+    out = {risk: {k: np.empty(paths) for k in ('max_drawdown_pct', 'return_pct')} for risk in risk_percents}
+    for risk in risk_percents:
+        out[risk]['ruined'] = np.empty(paths, dtype=bool)
+        out[risk]['daily_breach'] = np.empty(paths, dtype=bool) if daily_log is not None else None
+    loss_streak = np.empty(paths, dtype=np.int32)
+    win_streak = np.empty(paths, dtype=np.int32)
+
+    chunk = max(1, _MAX_CELLS // n_trades)
+    for lo in range(0, paths, chunk):
+        hi = min(paths, lo + chunk)
+        sample = r[_sample(rng, r.size, hi - lo, n_trades, block)]
+        loss_streak[lo:hi] = _longest_run(sample < 0)
+        win_streak[lo:hi] = _longest_run(sample > 0)
+        for risk in risk_percents:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                # Log-equity relativo al balance inicial (-inf = cuenta en cero)
+                log_equity = np.cumsum(np.log(np.maximum(1.0 + sample * risk / 100.0, 0.0)), axis=1)
+                peak = np.maximum.accumulate(np.maximum(log_equity, 0.0), axis=1)
+            stats = out[risk]
+            stats['max_drawdown_pct'][lo:hi] = -np.expm1((log_equity - peak).min(axis=1)) * 100.0
+            stats['return_pct'][lo:hi] = np.expm1(log_equity[:, -1]) * 100.0
+            stats['ruined'][lo:hi] = log_equity.min(axis=1) <= ruin_log
+            if daily_log is not None:
+                before = np.concatenate([np.zeros((hi - lo, 1)), log_equity[:, :-1]], axis=1)
+                with np.errstate(invalid='ignore'):
+                    stats['daily_breach'][lo:hi] = ((log_equity - before[:, day_start]) <= daily_log).any(axis=1)
+    for risk in risk_percents:
+        out[risk]['loss_streak'] = loss_streak
+        out[risk]['win_streak'] = win_streak
+    return out
+
+
+def _stats(sim, ruin_percent, daily_limit):
+    stats = {}
+    for key in ('max_drawdown_pct', 'return_pct', 'loss_streak', 'win_streak'):
+        for q, value in zip(PERCENTILES, np.percentile(sim[key], PERCENTILES)):
+            stats[f'{key}_p{q}'] = round(float(value), 2)
+    stats['ruin_probability'] = round(float(sim['ruined'].mean()) * 100.0, 3)
+    stats['ruin_percent'] = ruin_percent
+    if sim['daily_breach'] is not None:
+        stats['daily_breach_probability'] = round(float(sim['daily_breach'].mean()) * 100.0, 3)
+        stats['daily_limit_percent'] = daily_limit
+    return stats
+
+
+def simulate(r, risk_percent=1.0, paths=100_000, n_trades=None, block=None, ruin_percent=50.0,
+             daily_limit=5.0, trades_per_day=None, seed=None):
+    """
+    Monte Carlo de `paths` secuencias de n_trades trades (por defecto tantos
+    como R-multiples) arriesgando risk_percent del balance vigente en cada uno.
+
+    - ruin_percent: ruina = equity por debajo de (100 - ruin_percent)% del
+      balance inicial en algún momento del camino.
+    - daily_limit / trades_per_day: con trades_per_day, además cuenta los
+      caminos donde algún día (bloques de trades_per_day trades) pierde
+      daily_limit% o más desde el balance de apertura del día
+      (RiskManager.max_daily_drawdown_percent).
+
+    Devuelve arrays por camino (max_drawdown_pct, return_pct, loss_streak,
+    win_streak, ruined, daily_breach) y "stats" con percentiles y
+    probabilidades (en %).
+    """
+    sim = _paths(r, [risk_percent], paths, n_trades, block, ruin_percent, daily_limit, trades_per_day, seed)[risk_percent]
+    sim['stats'] = _stats(sim, ruin_percent, daily_limit)
+    return sim
+
+
+def risk_table(r, risk_percents=(0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0), paths=100_000, n_trades=None, block=None,
+               ruin_percent=50.0, daily_limit=5.0, trades_per_day=None, seed=None):
+    """Stats de simulate para varios riesgos por trade sobre los mismos caminos (una fila por riesgo)."""
+    risk_percents = [float(risk) for risk in risk_percents]
+    sims = _paths(r, risk_percents, paths, n_trades, block, ruin_percent, daily_limit, trades_per_day, seed)
+    rows = [{'risk_percent': risk, **_stats(sims[risk], ruin_percent, daily_limit)} for risk in risk_percents]
+    return pd.DataFrame(rows)
+
+
+def suggest_risk(r, max_drawdown_percent=20.0, confidence=95, max_ruin_probability=1.0, ruin_percent=50.0,
+                 max_daily_breach_probability=None, risk_percents=None, **kwargs):
+    """
+    Mayor riesgo por trade (de risk_percents) cuyo drawdown máximo en el
+    percentil `confidence` no pasa max_drawdown_percent y cuya probabilidad
+    de ruina (%) no pasa max_ruin_probability (y, con trades_per_day, la de
+    romper el límite diario no pasa max_daily_breach_probability).
+    Devuelve (riesgo o None, tabla de risk_table).
+    """
+    if confidence not in PERCENTILES:
+        raise ValueError(f"confidence debe ser uno de {PERCENTILES}")
+    if risk_percents is None:
+        risk_percents = np.round(np.arange(0.25, 5.01, 0.25), 2)
+    table = risk_table(r, risk_percents, ruin_percent=ruin_percent, **kwargs)
+    ok = (table[f'max_drawdown_pct_p{confidence}'] <= max_drawdown_percent) & \
+         (table['ruin_probability'] <= max_ruin_probability)
+    if max_daily_breach_probability is not None and 'daily_breach_probability' in table:
+        ok &= table['daily_breach_probability'] <= max_daily_breach_probability
+    risk = float(table.loc[ok, 'risk_percent'].max()) if ok.any() else None
+    return risk, table
@@ -0,0 +1,164 @@
+"""
+Ejecución en procesos para escaneos grandes en modo clásico.
+
+Con los datos ya en cache el escaneo es CPU puro (SMCAnalyzer.analyze +
+_find_setup) y los hilos se serializan en el GIL. Acá los frames del
+timeframe operativo se copian una sola vez a un bloque de memoria compartida
+(matriz float64 velas x columnas + fechas int64) y un pool de procesos corre
+run_analysis sobre cada par leyendo de ese bloque, sin serializar los
+DataFrames. El sesgo HTF/D1 viene precalculado por preload (panel), así que
+los workers no descargan nada.
+
+Los workers devuelven el resultado en formato compacto (ver
+SMCAnalyzer.to_compact) y no escriben el journal: las operaciones que
+hubieran registrado vuelven en "journal_trades" y las registra el proceso
+principal.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from market_data.store import to_utc_ns
+
+# Columnas que viajan por memoria compartida (las que usan analyze y _find_setup)
+SHARED_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'is_london', 'is_ny', 'is_killzone']
+BOOL_COLUMNS = {'is_london', 'is_ny', 'is_killzone'}
+
+
+def default_workers():
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+def pack_frames(frames):
+    """
+    {par: df} -> (SharedMemory, layout). layout tiene el nombre del bloque, la
+    cantidad total de velas y {par: (desde, hasta)}. Los pares sin datos quedan
+    fuera. El llamador cierra y libera el bloque (close + unlink).
+    """
+    frames = {pair: df for pair, df in frames.items() if df is not None and not df.empty}
+    rows = sum(len(df) for df in frames.values())
+    width = len(SHARED_COLUMNS)
+    # values (rows x width, float64) seguido de dates (rows, int64)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, rows * (width + 1) * 8))
+    values = np.ndarray((rows, width), dtype=np.float64, buffer=shm.buf)
+    dates = np.ndarray((rows,), dtype=np.int64, buffer=shm.buf, offset=rows * width * 8)
+
+    spans = {}
+    start = 0
+    for pair, df in frames.items():
+        stop = start + len(df)
+        for k, col in enumerate(SHARED_COLUMNS):
+            values[start:stop, k] = df[col].to_numpy(dtype=np.float64) if col in df.columns else np.nan
+        dates[start:stop] = to_utc_ns(df['Date'] if 'Date' in df.columns else df.index)
+        spans[pair] = (start, stop)
+        start = stop
+    return shm, {"name": shm.name, "rows": rows, "spans": spans}
+
+
+def unpack_frame(values, dates, span):
+    """Reconstruye el frame de un par con el formato de data_loader (índice y columna 'Date')."""
+    start, stop = span
+    index = pd.DatetimeIndex(dates[start:stop].copy(), tz='UTC', name='Date')
+    df = pd.DataFrame(values[start:stop].copy(), index=index, columns=SHARED_COLUMNS)
+    for col in BOOL_COLUMNS:
+        df[col] = df[col] != 0
+    df.insert(0, 'Date', index)
+    return df
+
+
+class _DeferredJournal:
+    """Journal del worker: junta las operaciones para que las registre el proceso principal."""
+    def __init__(self):
+        self.trades = []
+
+    def log_trade(self, trade_data):
+        self.trades.append(trade_data)
+
+
+# Estado de cada proceso del pool (lo arma init_worker)
+_worker = {}
+
+
+def init_worker(bot_class, bot_kwargs, layout):
+    """
+    Inicializador de los procesos del pool: se conecta al bloque de
+    pack_frames y arma un bot propio. Lo usan también los barridos de
+    backtest/sweep.py.
+    """
+    # Los workers comparten el resource tracker del proceso principal, que es
+    # quien libera el bloque (unlink) al terminar
+    shm = shared_memory.SharedMemory(name=layout["name"])
+    rows, width = layout["rows"], len(SHARED_COLUMNS)
+    _worker["shm"] = shm
+    _worker["values"] = np.ndarray((rows, width), dtype=np.float64, buffer=shm.buf)
+    _worker["dates"] = np.ndarray((rows,), dtype=np.int64, buffer=shm.buf, offset=rows * width * 8)
+    _worker["spans"] = layout["spans"]
+    _worker["bot"] = bot_class(**bot_kwargs)
+
+
+def worker_bot():
+    return _worker["bot"]
+
+
+def worker_frame(pair):
+    """Frame del par reconstruido desde la memoria compartida (dentro de un worker)."""
+    return unpack_frame(_worker["values"], _worker["dates"], _worker["spans"][pair])
+
+
+def _analyze_pair(pair, timeframe, bias):
+    bot = _worker["bot"]
+    bot.journal = _DeferredJournal()
+    df = worker_frame(pair)
+    result = bot.run_analysis(pair=pair, timeframe=timeframe, preloaded={timeframe: df, "bias": bias})
+    result["journal_trades"] = bot.journal.trades
+    return result
+
+
+def bot_kwargs(bot):
+    """Parámetros para reconstruir el bot en los workers (modo clásico, resultados compactos)."""
+    return {
+        "strict_mode": bot.strict_mode,
+        "min_atr_m5": bot.min_atr_m5,
+        "min_atr_m15": bot.min_atr_m15,
+        "use_ai": False,
+        "compact_results": True,
+        "pivot_mode": bot.smc.pivot_mode,
+    }
+
+
+def analyze_in_processes(bot, pairs, timeframe, preloaded, workers=None):
+    """
+    Generador de (par, resultado, error) a medida que terminan, con
+    run_analysis corriendo en `workers` procesos. preloaded es el resultado
+    de bot.preload(pairs, timeframe). Las operaciones detectadas se registran
+    en bot.journal desde este proceso.
+    """
+    workers = workers or default_workers()
+    frames = {pair: (preloaded.get(pair) or {}).get(timeframe) for pair in pairs}
+    shm, layout = pack_frames(frames)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(type(bot), bot_kwargs(bot), layout)) as pool:
+            futures = {}
+            for pair in pairs:
+                if pair not in layout["spans"]:
+                    yield pair, {"pair": pair, "error": "Fallo descarga de datos (Yahoo Finance)"}, None
+                    continue
+                bias = (preloaded.get(pair) or {}).get("bias", {})
+                futures[pool.submit(_analyze_pair, pair, timeframe, bias)] = pair
+            for future in as_completed(futures):
+                pair = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    yield pair, None, e
+                    continue
+                for trade in result.pop("journal_trades", []):
+                    bot.journal.log_trade(trade)
+                yield pair, result, None
+    finally:
+        shm.close()
+        shm.unlink()
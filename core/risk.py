@@ -1,3 +1,8 @@
+import numpy as np
+
+from core.montecarlo import simulate, suggest_risk
+
+
 class RiskManager:
     def __init__(self, account_balance=100000, risk_per_trade_percent=1.0):
         self.account_balance = account_balance
@@ -43,3 +48,33 @@ class RiskManager:
             return False, "Ratio Riesgo/Beneficio insuficiente (< 1:2)"
         
         return False, "Probabilidad estimada insuficiente (< 65%)"
+
+    def validate_trades(self, probability, risk_reward_ratio):
+        """
+        validate_trade vectorizado (backtests): máscara de los trades que
+        aprobaría. Con probabilidad < 65% ninguno pasa, con >= 65% hace falta
+        RR >= 1:1.
+        """
+        probability = np.asarray(probability)
+        risk_reward_ratio = np.asarray(risk_reward_ratio)
+        with np.errstate(invalid='ignore'):
+            return (probability >= 65) & ~(risk_reward_ratio < 1.0)
+
+    def monte_carlo(self, r_multiples, trades_per_day=None, **kwargs):
+        """
+        core.montecarlo.simulate con el riesgo por trade actual y
+        max_daily_drawdown_percent como límite diario (con trades_per_day).
+        """
+        return simulate(r_multiples, risk_percent=self.risk_per_trade_percent,
+                        daily_limit=self.max_daily_drawdown_percent, trades_per_day=trades_per_day, **kwargs)
+
+    def suggest_risk_percent(self, r_multiples, max_drawdown_percent=20.0, confidence=95, trades_per_day=None,
+                             **kwargs):
+        """
+        Riesgo por trade sugerido por Monte Carlo (core.montecarlo.suggest_risk)
+        para los R-multiples realizados: el mayor cuyo drawdown máximo en el
+        percentil `confidence` no pasa max_drawdown_percent. No cambia
+        risk_per_trade_percent; devuelve (riesgo o None, tabla por riesgo).
+        """
+        return suggest_risk(r_multiples, max_drawdown_percent=max_drawdown_percent, confidence=confidence,
+                            daily_limit=self.max_daily_drawdown_percent, trades_per_day=trades_per_day, **kwargs)
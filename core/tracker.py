@@ -3,6 +3,7 @@ import json
 import os
 from datetime import datetime
 import yfinance as yf
+from market_data.ratelimit import yahoo_governor
 
 class TradeTracker:
     def __init__(self, filepath="trade_history.json"):
@@ -56,7 +57,7 @@ class TradeTracker:
                 # Bajar datos recientes para verificar
                 # Usamos intervalo 5m para tener granularidad
                 try:
-                    df = yf.download(trade['pair'], period="5d", interval="5m", progress=False)
+                    df = yahoo_governor.call(yf.download, trade['pair'], period="5d", interval="5m", progress=False, retry_empty=False)
                 except Exception:
                     continue
                     
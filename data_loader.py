@@ -1,69 +1,299 @@
-import yfinance as yf
 import pandas as pd
 from datetime import datetime, time
 import pytz
+from market_data.store import OHLCVStore
+from market_data.resample import resample_ohlcv
+from market_data.timeframes import base_timeframe
+from market_data.cache import CandleCache
+from market_data.singleflight import SingleFlight
+from market_data.providers import provider_from_env
+from market_data.async_fetch import fetch_engine
 
-def load_data(pair, timeframe, limit=1000):
+# Ventana histórica por timeframe (equivalente a period="7d"/"60d"/"1y")
+PERIOD_DAYS = {"1m": 7, "5m": 7, "1d": 365}
+DEFAULT_PERIOD_DAYS = 60
+
+# Almacén en disco compartido por todo el proceso (ver market_data/store.py)
+_store = OHLCVStore()
+
+# Cache en memoria hasta el cierre de vela, compartida por hilos/tabs (ver market_data/cache.py)
+_cache = CandleCache()
+
+# Descargas en vuelo: pedidos concurrentes de la misma clave comparten una sola descarga
+_flights = SingleFlight()
+
+# Proveedor de datos (yfinance por defecto, replay de archivos grabados para offline)
+_provider = provider_from_env()
+
+
+def get_provider():
+    return _provider
+
+
+def set_provider(provider):
+    """Cambia el backend de datos (ver market_data/providers.py) y vacía la cache en memoria."""
+    global _provider
+    _provider = provider
+    _cache.invalidate()
+    return provider
+
+
+def cache_stats():
+    """Contadores de la cache en memoria (hits/misses/evictions) y descargas compartidas."""
+    stats = _cache.stats()
+    stats["coalesced"] = _flights.shared
+    return stats
+
+
+def _period_days(timeframe):
+    return PERIOD_DAYS.get(timeframe, DEFAULT_PERIOD_DAYS)
+
+
+def _normalize(df):
+    """Deja el frame con columna 'Date' (UTC) y OHLCV float, sin NaN."""
+    if df is None or df.empty:
+        return None
+
+    # Reset index para tener 'Date' como columna
+    df = df.reset_index()
+
+    # Normalizar nombres de columnas (yfinance a veces devuelve 'Datetime' o 'Date')
+    if 'Datetime' in df.columns:
+        df.rename(columns={'Datetime': 'Date'}, inplace=True)
+    elif 'Date' not in df.columns:
+        # Si el índice es la fecha pero no tiene nombre
+        df['Date'] = df.index
+
+    dates = pd.to_datetime(df['Date'])
+    df['Date'] = dates.dt.tz_localize('UTC') if dates.dt.tz is None else dates.dt.tz_convert('UTC')
+
+    # Asegurar que las columnas numéricas sean float
+    cols = ['Open', 'High', 'Low', 'Close', 'Volume']
+    for col in cols:
+        if col in df.columns:
+            df[col] = df[col].astype(float)
+
+    # Eliminar filas con NaN
+    df.dropna(inplace=True)
+    return df if not df.empty else None
+
+
+def _load_base(pair, timeframe):
     """
-    Descarga datos de Yahoo Finance.
-    Timeframes soportados por yfinance: 1m, 2m, 5m, 15m, 30m, 60m, 90m, 1h, 1d, 5d, 1wk, 1mo, 3mo
+    Serie base (sin info de sesión) desde el almacén en disco + cola incremental.
+    Lee primero el almacén local y sólo descarga las velas posteriores a la
+    última guardada (la última vela se vuelve a pedir porque puede estar en formación).
     """
-    try:
-        print(f"Descargando datos para {pair} ({timeframe})...")
-        
-        # Mapeo de timeframes para yfinance
-        interval_map = {
-            "1m": "1m", "5m": "5m", "15m": "15m", 
-            "1h": "1h", "4h": "1h", "1d": "1d"
-        }
-        
-        yf_interval = interval_map.get(timeframe, "1h")
-        period = "7d" if timeframe in ["1m", "5m"] else "60d"
-        if timeframe == "1d": period = "1y"
+    provider = _provider
+    if not provider.live:
+        # Datos grabados: se sirven tal cual, sin almacén ni ventana relativa a "ahora"
+        return _normalize(provider.history(pair, timeframe))
 
-        # USAR SESSION: yfinance actual prefiere manejar su propia sesión o requiere curl_cffi.
-        # Eliminamos la sesión manual de requests que causa conflictos.
-        
-        # FORZAR descarga sin hilos y con progresa desactivado para evitar errores de NoneType en UI
-        ticker = yf.Ticker(pair)
-        df = ticker.history(period=period, interval=yf_interval)
+    now = pd.Timestamp.now(tz='UTC')
+    window_start = now - pd.Timedelta(days=_period_days(timeframe))
+    last_ts = _store.last_timestamp(pair, timeframe)
 
-        if df.empty:
-            # Intento secundario con yf.download directo si Ticker() falla
-            df = yf.download(pair, period=period, interval=yf_interval, progress=False, threads=False)
+    if last_ts is not None and last_ts > window_start:
+        print(f"Actualizando datos para {pair} ({timeframe}) desde {last_ts}...")
+        try:
+            new = _normalize(provider.history(pair, timeframe, start=last_ts))
+        except Exception as e:
+            print(f"[CACHE] Falló descarga incremental de {pair}: {e}. Usando datos en disco.")
+            new = None
+        if new is not None:
+            return _store.append(pair, timeframe, new, min_ts=window_start)
+        df = _store.read(pair, timeframe)
+        if df is not None:
+            df = df[df['Date'] >= window_start].reset_index(drop=True)
+        return df
 
-        if df is None or df.empty:
-            print(f"[ERROR] No se pudieron cargar datos para {pair} ({timeframe})")
-            return None
+    print(f"Descargando datos para {pair} ({timeframe})...")
+    df = _normalize(provider.history(pair, timeframe))
+    if df is not None:
+        df = _store.append(pair, timeframe, df, min_ts=window_start)
+    return df
 
-        # Reset index para tener 'Date' como columna
-        df.reset_index(inplace=True)
-
-        # Normalizar nombres de columnas (yfinance a veces devuelve 'Datetime' o 'Date')
-        if 'Datetime' in df.columns:
-            df.rename(columns={'Datetime': 'Date'}, inplace=True)
-        elif 'Date' not in df.columns:
-            # Si el índice es la fecha pero no tiene nombre
-            df['Date'] = df.index
-
-        # Asegurar que las columnas numéricas sean float
-        cols = ['Open', 'High', 'Low', 'Close', 'Volume']
-        for col in cols:
-            if col in df.columns:
-                df[col] = df[col].astype(float)
-        
-        # Eliminar filas con NaN
-        df.dropna(inplace=True)
 
-        # Añadir información de sesión (Londres/NY)
-        df = add_session_info(df)
+def _fetch_base(pair, timeframe):
+    """_load_base con single-flight por (par, serie base)."""
+    return _flights.do(("base", pair, timeframe), _load_base, pair, timeframe)
 
-        return df
+
+def _finalize(df, timeframe):
+    """Deriva el timeframe pedido desde la serie base y añade info de sesión."""
+    if df is None or df.empty:
+        return None
+    if base_timeframe(timeframe) != timeframe:
+        df = resample_ohlcv(df, timeframe)
+    else:
+        # La serie base puede compartirse entre varios timeframes: no mutarla
+        df = df.copy()
+    # Añadir información de sesión (Londres/NY)
+    return add_session_info(df)
+
+
+def load_data(pair, timeframe, limit=1000):
+    """
+    Descarga datos de Yahoo Finance.
+    Timeframes soportados: 1m, 5m, 15m, 1h, 4h, 1d.
+    1h y 4h se construyen re-muestreando la serie base de 15m (ver market_data/resample.py).
+    Dentro de una misma vela se sirve desde la cache en memoria.
+    """
+    cached = _cache.get(pair, timeframe)
+    if cached is not None:
+        return cached
+    try:
+        df = _finalize(_fetch_base(pair, base_timeframe(timeframe)), timeframe)
+        if df is None or df.empty:
+            print(f"[ERROR] No se pudieron cargar datos para {pair} ({timeframe})")
+            return None
+        return _cache.put(pair, timeframe, df)
 
     except Exception as e:
         print(f"Excepción al descargar datos de {pair}: {e}")
         return None
 
+
+def load_timeframes(pair, timeframes):
+    """
+    Carga varios timeframes de un par descargando cada serie base una sola vez
+    (p.ej. M15 + H1 + H4 salen de la misma descarga de 15m).
+    Devuelve {timeframe: DataFrame o None}.
+    """
+    bases = {}
+    out = {}
+    for tf in dict.fromkeys(timeframes):
+        out[tf] = _cache.get(pair, tf)
+        if out[tf] is not None:
+            continue
+        base = base_timeframe(tf)
+        try:
+            if base not in bases:
+                bases[base] = _fetch_base(pair, base)
+            out[tf] = _cache.put(pair, tf, _finalize(bases[base], tf))
+        except Exception as e:
+            print(f"Excepción al cargar {pair} ({tf}): {e}")
+            out[tf] = None
+        if out[tf] is None:
+            print(f"[ERROR] No se pudieron cargar datos para {pair} ({tf})")
+    return out
+
+
+def _load_base_many(pairs, timeframe):
+    """
+    Series base de varios pares con peticiones agrupadas.
+    Los pares sin datos en disco se bajan completos en una petición y los que
+    ya están en disco comparten otra desde la vela guardada más antigua.
+    """
+    provider = _provider
+    if not provider.live:
+        return {pair: _normalize(df) for pair, df in provider.history_many(pairs, timeframe).items()}
+
+    result = {pair: None for pair in pairs}
+    now = pd.Timestamp.now(tz='UTC')
+    window_start = now - pd.Timedelta(days=_period_days(timeframe))
+
+    warm, cold = {}, []
+    for pair in pairs:
+        last_ts = _store.last_timestamp(pair, timeframe)
+        if last_ts is not None and last_ts > window_start:
+            warm[pair] = last_ts
+        else:
+            cold.append(pair)
+
+    batches = []
+    if cold:
+        batches.append((cold, None))
+    if warm:
+        batches.append((list(warm), min(warm.values())))
+
+    for batch, start in batches:
+        print(f"Descarga agrupada de {len(batch)} activos ({timeframe})" + (f" desde {start}" if start is not None else "") + "...")
+        try:
+            frames = provider.history_many(batch, timeframe, start=start)
+        except Exception as e:
+            print(f"Excepción en descarga agrupada ({timeframe}): {e}")
+            frames = {}
+
+        for pair in batch:
+            try:
+                new = _normalize(frames.get(pair))
+                if new is not None:
+                    result[pair] = _store.append(pair, timeframe, new, min_ts=window_start)
+                elif start is not None:
+                    # Sin velas nuevas (o fallo): se sirve lo guardado en disco
+                    df = _store.read(pair, timeframe)
+                    if df is not None:
+                        result[pair] = df[df['Date'] >= window_start].reset_index(drop=True)
+            except Exception as e:
+                print(f"Excepción al procesar datos de {pair}: {e}")
+
+    return result
+
+
+def load_universe(pairs, timeframes):
+    """
+    Carga masiva de varios timeframes para todo un universo: una petición
+    agrupada por serie base (no por timeframe ni por par).
+    Devuelve {par: {timeframe: DataFrame o None}}.
+    """
+    pairs = list(dict.fromkeys(pairs))
+    out = {pair: {} for pair in pairs}
+    if not pairs:
+        return out
+
+    timeframes = list(dict.fromkeys(timeframes))
+    missing = {}
+    for tf in timeframes:
+        for pair in pairs:
+            df = _cache.get(pair, tf)
+            if df is not None:
+                out[pair][tf] = df
+            else:
+                missing.setdefault(base_timeframe(tf), {})[pair] = True
+
+    bases = {}
+    for base, base_pairs in missing.items():
+        base_pairs = list(base_pairs)
+        key = ("batch", base, tuple(sorted(base_pairs)))
+        bases[base] = _flights.do(key, _load_base_many, base_pairs, base)
+    for tf in timeframes:
+        base = base_timeframe(tf)
+        for pair in pairs:
+            if tf in out[pair]:
+                continue
+            try:
+                out[pair][tf] = _cache.put(pair, tf, _finalize(bases[base][pair], tf))
+            except Exception as e:
+                print(f"Excepción al procesar datos de {pair} ({tf}): {e}")
+                out[pair][tf] = None
+            if out[pair][tf] is None:
+                print(f"[ERROR] No se pudieron cargar datos para {pair} ({tf})")
+    return out
+
+
+def load_many(pairs, timeframe, limit=1000):
+    """
+    Versión masiva de load_data para escanear todo el universo.
+    Devuelve {par: DataFrame o None}.
+    """
+    return {pair: frames.get(timeframe) for pair, frames in load_universe(pairs, [timeframe]).items()}
+
+
+async def load_data_async(pair, timeframe, limit=1000):
+    """load_data para código asyncio (corre en el pool del motor de descargas)."""
+    return await fetch_engine.run(load_data, pair, timeframe, limit)
+
+
+async def load_many_async(pairs, timeframe, concurrency=None):
+    """
+    Descarga individual de todos los pares a la vez (como mucho `concurrency`
+    en curso). Alternativa a load_many cuando la petición agrupada falla.
+    Devuelve {par: DataFrame o None}.
+    """
+    return await fetch_engine.gather(lambda pair: load_data(pair, timeframe), pairs, limit=concurrency)
+
+
 def add_session_info(df):
     """
     Añade columnas booleanas para sesiones de Londres y Nueva York.
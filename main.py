@@ -1,20 +1,23 @@
 import os
 import sys
 import time
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import pandas as pd
 import streamlit as st
 import plotly.graph_objects as go
 import plotly.express as px
 from streamlit.web import cli as stcli
-from core.bot import InstitutionalBot, ArgentinaBot
+from core.bot import InstitutionalBot, ArgentinaBot, analysis_cache_stats
 from core.journal import TradeJournal
 from core.tracker import TradeTracker
 from core.notifications import TelegramNotifier
+from market_data.timeframes import TIMEFRAME_SECONDS, seconds_to_candle_close
+from data_loader import cache_stats
+from market_data.ratelimit import yahoo_governor
+from market_data.async_fetch import fetch_engine
 import yfinance as yf
 import matplotlib.pyplot as plt
 import io
-import concurrent.futures
 import socket
 import qrcode
 from PIL import Image
@@ -122,22 +125,11 @@ inject_security()
 def get_candle_countdown(timeframe):
     """Calcula el tiempo restante para el cierre de vela y la hora de apertura de la siguiente."""
     now = datetime.utcnow()
-    
-    if timeframe == '1m':
-        interval_seconds = 60
-    elif timeframe == '5m':
-        interval_seconds = 5 * 60
-    elif timeframe == '15m':
-        interval_seconds = 15 * 60
-    elif timeframe == '1h':
-        interval_seconds = 60 * 60
-    else:
-        return "N/A", "N/A"
 
-    # Calcular segundos pasados desde el inicio del intervalo
-    total_seconds = now.hour * 3600 + now.minute * 60 + now.second
-    seconds_past = total_seconds % interval_seconds
-    seconds_left = interval_seconds - seconds_past
+    # Misma lógica de cierre de vela que usa la cache de datos (market_data/timeframes.py)
+    seconds_left = seconds_to_candle_close(timeframe, now.replace(tzinfo=timezone.utc).timestamp())
+    if seconds_left is None:
+        return "N/A", "N/A"
     
     next_open_dt = now + timedelta(seconds=seconds_left)
     
@@ -150,11 +142,7 @@ def get_candle_countdown(timeframe):
     return countdown_str, next_open_str
 
 def timeframe_seconds(tf):
-    if tf == '1m': return 60
-    if tf == '5m': return 5 * 60
-    if tf == '15m': return 15 * 60
-    if tf == '1h': return 60 * 60
-    return 0
+    return TIMEFRAME_SECONDS.get(tf, 0)
 
 def format_total_time(seconds):
     m = int(seconds // 60)
@@ -218,6 +206,18 @@ def create_chart(pair_name, df, signal=None, smc_levels=None):
             fig.add_hline(y=supply, line_dash="dash", line_color="rgba(255, 0, 0, 0.5)", annotation_text="Supply")
         if demand:
             fig.add_hline(y=demand, line_dash="dash", line_color="rgba(0, 255, 0, 0.5)", annotation_text="Demand")
+        eqh = smc_levels.get('liquidity_above')
+        eql = smc_levels.get('liquidity_below')
+        if eqh:
+            fig.add_hline(y=eqh, line_dash="dot", line_color="rgba(255, 165, 0, 0.6)", annotation_text="EQH")
+        if eql:
+            fig.add_hline(y=eql, line_dash="dot", line_color="rgba(255, 165, 0, 0.6)", annotation_text="EQL")
+        active_demand = smc_levels.get('active_demand')
+        active_supply = smc_levels.get('active_supply')
+        if active_demand:
+            fig.add_hrect(y0=active_demand['bottom'], y1=active_demand['top'], fillcolor="rgba(0, 255, 0, 0.12)", line_width=0, annotation_text=f"Demanda {active_demand['kind']}")
+        if active_supply:
+            fig.add_hrect(y0=active_supply['bottom'], y1=active_supply['top'], fillcolor="rgba(255, 0, 0, 0.12)", line_width=0, annotation_text=f"Oferta {active_supply['kind']}")
 
     # Add Signal Levels
     if signal:
@@ -269,7 +269,7 @@ def render_scanner(bot_instance, pairs, pair_names, key_prefix="scan"):
     st.write("⏱️ **Timeframe**")
     selected_timeframe = st.select_slider(
         "Selecciona temporalidad",
-        options=["1m", "5m", "15m", "1h"],
+        options=["1m", "5m", "15m", "1h", "4h"],
         value="1h",
         key=f"{key_prefix}_tf_slider",
         label_visibility="collapsed"
@@ -283,110 +283,122 @@ def render_scanner(bot_instance, pairs, pair_names, key_prefix="scan"):
         progress_bar = st.progress(0)
         
         results_container = st.container()
-        
-        def analyze_wrapper(ticker):
-            # Wrapper para ejecutar el análisis
-            try:
-                return bot_instance.run_analysis(pair=ticker, timeframe=selected_timeframe)
-            except Exception as e:
-                return {"pair": ticker, "error": str(e)}
 
-        # Ejecución paralela
-        with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
-            future_to_ticker = {executor.submit(analyze_wrapper, ticker): ticker for ticker in pairs}
-            
-            completed_count = 0
-            for future in concurrent.futures.as_completed(future_to_ticker):
-                ticker = future_to_ticker[future]
-                completed_count += 1
-                progress_bar.progress(completed_count / len(pairs))
-                pair_name = pair_names.get(ticker, ticker)
+        completed = {"count": 0}
+
+        def show_result(ticker, result, error):
+            completed["count"] += 1
+            progress_bar.progress(completed["count"] / len(pairs))
+            pair_name = pair_names.get(ticker, ticker)
                 
-                try:
-                    result = future.result()
+            try:
+                if error is not None:
+                    raise error
                     
-                    # --- RENDERIZADO INMEDIATO ---
-                    with results_container:
-                        # Validar si hay error
-                        if not result or result.get("error") or not result.get("market_context"):
-                            error_msg = result.get('error', 'Error desconocido') if result else "Resultado Nulo"
-                            st.error(f"❌ {pair_name}: {error_msg}")
-                            continue
-
-                        # Datos válidos
-                        signal = result.get("signal")
-                        market_ctx = result["market_context"]
-                        smc_levels = result.get("smc_levels", {})
-                        df_hist = result.get("df")
+                # --- RENDERIZADO INMEDIATO ---
+                with results_container:
+                    # Validar si hay error
+                    if not result or result.get("error") or not result.get("market_context"):
+                        error_msg = result.get('error', 'Error desconocido') if result else "Resultado Nulo"
+                        st.error(f"❌ {pair_name}: {error_msg}")
+                        return
+
+                    # Datos válidos
+                    signal = result.get("signal")
+                    market_ctx = result["market_context"]
+                    smc_levels = result.get("smc_levels", {})
+                    df_hist = result.get("df")
                         
-                        # Gráfico
-                        fig = create_chart(pair_name, df_hist, signal, smc_levels)
+                    # Gráfico
+                    fig = create_chart(pair_name, df_hist, signal, smc_levels)
                         
-                        if signal:
-                            # TARJETA DE SEÑAL
-                            card_class = "card-success"
-                            signal_type = signal['type']
-                            signal_color = "signal-buy" if signal_type == "BUY" else "signal-sell"
+                    if signal:
+                        # TARJETA DE SEÑAL
+                        card_class = "card-success"
+                        signal_type = signal['type']
+                        signal_color = "signal-buy" if signal_type == "BUY" else "signal-sell"
                             
-                            html_content = f"""
-                            <div class="card-container {card_class}">
-                                <div class="signal-header {signal_color}">
-                                    {pair_name} • {signal_type}
-                                </div>
-                                <div style="display:flex; justify-content:space-around; text-align:center;">
-                                    <div><div class="metric-label">Precio</div><div class="metric-value">${market_ctx['current_price']:.2f}</div></div>
-                                    <div><div class="metric-label">Prob</div><div class="metric-value">{signal['prob']}%</div></div>
-                                </div>
-                                <hr style="border-color:#333;">
-                                <div style="display:grid; grid-template-columns:1fr 1fr 1fr; text-align:center; gap:5px;">
-                                    <div><div class="metric-label" style="color:#1E90FF">Entrada</div><div style="color:white; font-weight:bold">${signal['entry']:.2f}</div></div>
-                                    <div><div class="metric-label" style="color:#FF4B4B">Stop</div><div style="color:white; font-weight:bold">${signal['sl']:.2f}</div></div>
-                                    <div><div class="metric-label" style="color:#00D26A">Take</div><div style="color:white; font-weight:bold">${signal['tp']:.2f}</div></div>
-                                </div>
-                                <div style="margin-top:10px; text-align:center; font-style:italic; color:#888;">{signal['reason']}</div>
+                        html_content = f"""
+                        <div class="card-container {card_class}">
+                            <div class="signal-header {signal_color}">
+                                {pair_name} • {signal_type}
                             </div>
-                            """
-                            st.markdown(html_content, unsafe_allow_html=True)
-                            
-                            c_gauge, c_chart = st.columns([1, 2])
-                            with c_gauge: 
-                                st.plotly_chart(create_gauge_chart(signal['prob']), use_container_width=True, key=f"gauge_{pair_name}_{selected_timeframe}")
-                            with c_chart: 
-                                if fig: 
-                                    st.plotly_chart(fig, use_container_width=True, key=f"chart_{pair_name}_{selected_timeframe}")
-                                else:
-                                    st.warning(f"⚠️ Gráfico no disponible para {pair_name}")
-                        else:
-                            # TARJETA NEUTRAL
-                            st.markdown(f"""
-                            <div class="card-container" style="border-left: 5px solid #888;">
-                                <div class="signal-header" style="color:#888; border:1px solid #888;">{pair_name} • NEUTRAL</div>
-                                <div style="display:flex; justify-content:space-around; text-align:center; margin-bottom:10px;">
-                                    <div><div class="metric-label">Precio</div><div class="metric-value">${market_ctx.get('current_price', 0):.2f}</div></div>
-                                    <div><div class="metric-label">Tendencia</div><div class="metric-value" style="font-size:1em">{market_ctx.get('bias', 'NEUTRAL')}</div></div>
-                                </div>
-                                <div style="text-align:center; color:#fff; font-size: 1.1em; font-weight: bold; padding:15px; background:rgba(255,255,255,0.1); border-radius:8px; margin-top:10px;">
-                                    💡 CONSEJO: {result.get('filter_reason', 'Análisis completado sin señal clara.')}
-                                </div>
+                            <div style="display:flex; justify-content:space-around; text-align:center;">
+                                <div><div class="metric-label">Precio</div><div class="metric-value">${market_ctx['current_price']:.2f}</div></div>
+                                <div><div class="metric-label">Prob</div><div class="metric-value">{signal['prob']}%</div></div>
+                            </div>
+                            <hr style="border-color:#333;">
+                            <div style="display:grid; grid-template-columns:1fr 1fr 1fr; text-align:center; gap:5px;">
+                                <div><div class="metric-label" style="color:#1E90FF">Entrada</div><div style="color:white; font-weight:bold">${signal['entry']:.2f}</div></div>
+                                <div><div class="metric-label" style="color:#FF4B4B">Stop</div><div style="color:white; font-weight:bold">${signal['sl']:.2f}</div></div>
+                                <div><div class="metric-label" style="color:#00D26A">Take</div><div style="color:white; font-weight:bold">${signal['tp']:.2f}</div></div>
                             </div>
-                            """, unsafe_allow_html=True)
+                            <div style="margin-top:10px; text-align:center; font-style:italic; color:#888;">{signal['reason']}</div>
+                        </div>
+                        """
+                        st.markdown(html_content, unsafe_allow_html=True)
+                            
+                        c_gauge, c_chart = st.columns([1, 2])
+                        with c_gauge: 
+                            st.plotly_chart(create_gauge_chart(signal['prob']), use_container_width=True, key=f"gauge_{pair_name}_{selected_timeframe}")
+                        with c_chart: 
                             if fig: 
-                                st.plotly_chart(fig, use_container_width=True, key=f"chart_neutral_{pair_name}_{selected_timeframe}")
-                            else: 
-                                st.warning(f"⚠️ No se pudo generar gráfico para {pair_name} (Datos insuficientes o error de carga)")
-
-                        # LOGS
-                        with st.expander(f"📜 Logs: {pair_name}"):
-                            if result.get("ai_log"):
-                                st.code(result.get("ai_log"), language="json")
+                                st.plotly_chart(fig, use_container_width=True, key=f"chart_{pair_name}_{selected_timeframe}")
                             else:
-                                st.text("No hay respuesta de IA.")
-                            st.json(result)
+                                st.warning(f"⚠️ Gráfico no disponible para {pair_name}")
+                    else:
+                        # TARJETA NEUTRAL
+                        st.markdown(f"""
+                        <div class="card-container" style="border-left: 5px solid #888;">
+                            <div class="signal-header" style="color:#888; border:1px solid #888;">{pair_name} • NEUTRAL</div>
+                            <div style="display:flex; justify-content:space-around; text-align:center; margin-bottom:10px;">
+                                <div><div class="metric-label">Precio</div><div class="metric-value">${market_ctx.get('current_price', 0):.2f}</div></div>
+                                <div><div class="metric-label">Tendencia</div><div class="metric-value" style="font-size:1em">{market_ctx.get('bias', 'NEUTRAL')}</div></div>
+                            </div>
+                            <div style="text-align:center; color:#fff; font-size: 1.1em; font-weight: bold; padding:15px; background:rgba(255,255,255,0.1); border-radius:8px; margin-top:10px;">
+                                💡 CONSEJO: {result.get('filter_reason', 'Análisis completado sin señal clara.')}
+                            </div>
+                        </div>
+                        """, unsafe_allow_html=True)
+                        if fig: 
+                            st.plotly_chart(fig, use_container_width=True, key=f"chart_neutral_{pair_name}_{selected_timeframe}")
+                        else: 
+                            st.warning(f"⚠️ No se pudo generar gráfico para {pair_name} (Datos insuficientes o error de carga)")
+
+                    # LOGS
+                    with st.expander(f"📜 Logs: {pair_name}"):
+                        if result.get("ai_log"):
+                            st.code(result.get("ai_log"), language="json")
+                        else:
+                            st.text("No hay respuesta de IA.")
+                        st.json(result)
+
+            except Exception as e:
+                st.error(f"Error procesando {pair_name}: {e}")
+
+        # Escaneo del universo: descarga masiva, sesgo HTF/D1 en panel y análisis
+        # por par (hilos, o procesos en modo clásico), render a medida que terminan
+        with st.spinner("Analizando el universo..."):
+            batch = bot_instance.scan(
+                pairs, selected_timeframe,
+                workers=st.session_state.get('scan_workers', 0),
+                concurrency=st.session_state.get('fetch_concurrency', fetch_engine.concurrency),
+                on_result=show_result,
+            )
+        memory = batch["memory"]
+        timings = batch["timings"]
 
-                except Exception as e:
-                    st.error(f"Error procesando {pair_name}: {e}")
-        
         st.success("✅ Análisis Completo Finalizado")
+        stats = cache_stats()
+        st.caption(f"Cache de datos: {stats['hits']} hits / {stats['misses']} misses ({stats['hit_rate']}%) • {stats['entries']} frames en memoria")
+        analysis_stats = analysis_cache_stats()
+        st.caption(f"Cache de análisis: {analysis_stats['hits']} hits / {analysis_stats['misses']} misses ({analysis_stats['hit_rate']}%) • {analysis_stats['entries']} análisis en memoria")
+        st.caption(f"Tiempos: descarga + sesgo HTF/D1 {timings['fetch']:.2f}s • noticias {timings['news']:.2f}s • análisis {timings['analysis']:.2f}s • total {timings['total']:.2f}s")
+        rate = yahoo_governor.metrics()
+        if memory["full"]:
+            saving = (1 - memory["stored"] / memory["full"]) * 100
+            st.caption(f"Memoria de resultados: {memory['stored'] / 1024:.0f} KB (sin compactar {memory['full'] / 1024:.0f} KB, ahorro {saving:.0f}%)")
+        st.caption(f"Yahoo: {rate['requests']} peticiones • {rate['throttled']} limitadas • {rate['retries']} reintentos • {rate['failures']} fallos • tasa actual {rate['current_rate']}/s")
 
 # --- FUNCIÓN PRINCIPAL DE INTERFAZ ---
 def main_gui():
@@ -517,6 +529,12 @@ def main_gui():
 
         st.divider()
 
+        st.session_state['fetch_concurrency'] = st.number_input("Descargas simultáneas (escáner)", min_value=1, max_value=64, value=fetch_engine.concurrency, step=1)
+        st.session_state['scan_workers'] = st.number_input("Procesos de análisis (modo clásico, 0 = hilos)", min_value=0, max_value=64, value=0, step=1)
+        st.divider()
+
+        compact = st.toggle("Resultados compactos (menos memoria por sesión)", value=False)
+        confirmed_pivots = st.toggle("Pivots confirmados (sin mirar velas futuras)", value=False)
         strict = st.toggle("Modo Ultra Estricto (M5/M15)", value=False)
         atr_m5 = st.number_input("ATR mínimo M5 (pips)", value=5.0, step=0.5)
         atr_m15 = st.number_input("ATR mínimo M15 (pips)", value=8.0, step=0.5)
@@ -661,8 +679,9 @@ def main_gui():
     final_ai_key = user_input_key if user_input_key else env_config.get("DEEPSEEK_API_KEY", "")
     
     # Instanciamos AMBOS bots para uso simultáneo en diferentes tabs
-    bot_forex = InstitutionalBot(strict_mode=strict, min_atr_m5=atr_m5, min_atr_m15=atr_m15, use_ai=use_ai, ai_model=ai_model, ai_api_key=final_ai_key)
-    bot_ar = ArgentinaBot(strict_mode=strict, min_atr_m5=atr_m5, min_atr_m15=atr_m15, use_ai=use_ai, ai_model=ai_model, ai_api_key=final_ai_key)
+    pivot_mode = "confirmed" if confirmed_pivots else "centered"
+    bot_forex = InstitutionalBot(strict_mode=strict, min_atr_m5=atr_m5, min_atr_m15=atr_m15, use_ai=use_ai, ai_model=ai_model, ai_api_key=final_ai_key, compact_results=compact, pivot_mode=pivot_mode)
+    bot_ar = ArgentinaBot(strict_mode=strict, min_atr_m5=atr_m5, min_atr_m15=atr_m15, use_ai=use_ai, ai_model=ai_model, ai_api_key=final_ai_key, compact_results=compact, pivot_mode=pivot_mode)
 
     # --- TABS DE NAVEGACIÓN ---
     # Ahora separamos claramente los escáneres
@@ -679,7 +698,7 @@ def main_gui():
         def get_macro_metric(ticker_symbol):
             try:
                 t = yf.Ticker(ticker_symbol)
-                hist = t.history(period="2d")
+                hist = yahoo_governor.call(t.history, period="2d")
                 if len(hist) >= 1:
                     curr = hist['Close'].iloc[-1]
                     prev = hist['Close'].iloc[0] if len(hist) > 1 else curr
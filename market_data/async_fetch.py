@@ -0,0 +1,69 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncFetchEngine:
+    """
+    Motor asyncio para descargas y análisis por par.
+    yfinance es bloqueante, así que cada llamada corre en un pool de hilos
+    persistente (se reutiliza entre escaneos y con él la sesión HTTP que
+    yfinance comparte por host) y asyncio limita la concurrencia y entrega
+    los resultados a medida que terminan.
+    """
+    def __init__(self, concurrency=16):
+        self.concurrency = concurrency
+        self._executor = None
+        self._workers = 0
+        self._lock = threading.Lock()
+
+    def _get_executor(self, limit):
+        with self._lock:
+            if self._executor is None or self._workers < limit:
+                old = self._executor
+                self._executor = ThreadPoolExecutor(max_workers=limit, thread_name_prefix="fetch")
+                self._workers = limit
+                if old is not None:
+                    old.shutdown(wait=False)
+            return self._executor
+
+    async def run(self, fn, *args, **kwargs):
+        """Ejecuta una función bloqueante en el pool y la espera."""
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor(self.concurrency)
+        return await loop.run_in_executor(executor, functools.partial(fn, *args, **kwargs))
+
+    async def map_as_completed(self, fn, items, limit=None):
+        """
+        Lanza fn(item) para todos los items a la vez (como mucho `limit`
+        en curso) y produce (item, resultado, error) en orden de llegada.
+        """
+        limit = max(1, int(limit or self.concurrency))
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor(limit)
+        semaphore = asyncio.Semaphore(limit)
+
+        async def one(item):
+            async with semaphore:
+                try:
+                    return item, await loop.run_in_executor(executor, fn, item), None
+                except Exception as e:
+                    return item, None, e
+
+        for future in asyncio.as_completed([one(item) for item in items]):
+            yield await future
+
+    async def gather(self, fn, items, limit=None):
+        """Versión no incremental: {item: resultado} (None si falló, con el error impreso)."""
+        out = {}
+        async for item, result, error in self.map_as_completed(fn, items, limit=limit):
+            if error is not None:
+                print(f"[FETCH] Error en {item}: {error}")
+            out[item] = result
+        return out
+
+
+# Motor compartido por el proceso. FETCH_CONCURRENCY ajusta el límite por defecto.
+fetch_engine = AsyncFetchEngine(concurrency=int(os.environ.get("FETCH_CONCURRENCY", "16")))
@@ -0,0 +1,72 @@
+import threading
+import time
+from collections import OrderedDict
+from market_data.timeframes import next_candle_close
+
+
+class CandleCache:
+    """
+    Cache en memoria de frames por (par, timeframe), compartida entre hilos.
+    Cada entrada vence en el próximo cierre de vela de su timeframe, así que
+    dentro de una misma vela los reruns de Streamlit no vuelven a descargar.
+    Eviction LRU cuando se supera max_entries.
+
+    Los frames se comparten entre quienes los piden: no deben modificarse
+    in-place (SMCAnalyzer.analyze trabaja sobre una copia).
+    """
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, pair, timeframe, now=None):
+        now = time.time() if now is None else now
+        key = (pair, timeframe)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, df = entry
+            if now >= expires_at:
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return df
+
+    def put(self, pair, timeframe, df, now=None):
+        if df is None or df.empty:
+            return df
+        expires_at = next_candle_close(timeframe, now)
+        if expires_at is None:
+            return df
+        key = (pair, timeframe)
+        with self._lock:
+            self._data[key] = (expires_at, df)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        return df
+
+    def invalidate(self, pair=None, timeframe=None):
+        with self._lock:
+            for key in list(self._data):
+                if (pair is None or key[0] == pair) and (timeframe is None or key[1] == timeframe):
+                    del self._data[key]
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total * 100.0, 2) if total else 0.0,
+            }
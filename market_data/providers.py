@@ -0,0 +1,158 @@
+import os
+import threading
+import pandas as pd
+import yfinance as yf
+from market_data.store import DEFAULT_ROOT, OHLCV_COLUMNS, file_stem
+from market_data.ratelimit import yahoo_governor
+
+# Mapeo de timeframes para yfinance
+INTERVAL_MAP = {
+    "1m": "1m", "5m": "5m", "15m": "15m",
+    "1h": "1h", "1d": "1d"
+}
+
+DEFAULT_REPLAY_ROOT = os.path.join(os.path.dirname(DEFAULT_ROOT), "replay")
+
+
+class MarketDataProvider:
+    """
+    Interfaz de proveedor de datos de mercado.
+    history() devuelve un frame crudo indexado por fecha con columnas OHLCV;
+    data_loader se encarga de normalizarlo (Date UTC, floats, sesiones).
+    live=False indica datos grabados: no pasan por el almacén en disco ni
+    se recortan a la ventana relativa a "ahora".
+    """
+    name = "base"
+    live = True
+
+    def history(self, pair, timeframe, start=None):
+        raise NotImplementedError
+
+    def history_many(self, pairs, timeframe, start=None):
+        """Por defecto una llamada por par; los backends con API masiva la sobreescriben."""
+        return {pair: self.history(pair, timeframe, start=start) for pair in pairs}
+
+
+class YFinanceProvider(MarketDataProvider):
+    name = "yfinance"
+    live = True
+
+    def _params(self, timeframe):
+        yf_interval = INTERVAL_MAP.get(timeframe, "1h")
+        period = "7d" if timeframe in ["1m", "5m"] else "60d"
+        if timeframe == "1d": period = "1y"
+        return yf_interval, period
+
+    def history(self, pair, timeframe, start=None):
+        """
+        Descarga cruda desde Yahoo. Sin start baja la ventana completa (period),
+        con start sólo las velas desde ese timestamp (cola incremental).
+        """
+        yf_interval, period = self._params(timeframe)
+
+        # USAR SESSION: yfinance actual prefiere manejar su propia sesión o requiere curl_cffi.
+        # Eliminamos la sesión manual de requests que causa conflictos.
+
+        # FORZAR descarga sin hilos y con progresa desactivado para evitar errores de NoneType en UI
+        # Todas las peticiones pasan por el gobernador global (límite + reintentos)
+        ticker = yf.Ticker(pair)
+        if start is None:
+            df = yahoo_governor.call(ticker.history, period=period, interval=yf_interval)
+        else:
+            df = yahoo_governor.call(ticker.history, start=start, interval=yf_interval)
+
+        if df.empty and start is None:
+            # Intento secundario con yf.download directo si Ticker() falla
+            df = yahoo_governor.call(yf.download, pair, period=period, interval=yf_interval, progress=False, threads=False)
+        return df
+
+    def history_many(self, pairs, timeframe, start=None):
+        """Una sola petición agrupada a Yahoo para varios tickers."""
+        yf_interval, period = self._params(timeframe)
+        if start is None:
+            data = yahoo_governor.call(yf.download, pairs, period=period, interval=yf_interval, group_by='ticker',
+                                       auto_adjust=True, progress=False, threads=True)
+        else:
+            data = yahoo_governor.call(yf.download, pairs, start=start, interval=yf_interval, group_by='ticker',
+                                       auto_adjust=True, progress=False, threads=True)
+        return self._split_tickers(data, pairs)
+
+    def _split_tickers(self, data, pairs):
+        """Separa el frame agrupado (columnas ticker/campo) en un frame por ticker."""
+        out = {}
+        if data is None or data.empty:
+            return out
+        if isinstance(data.columns, pd.MultiIndex):
+            available = set(data.columns.get_level_values(0))
+            for pair in pairs:
+                if pair in available:
+                    out[pair] = data[pair]
+        elif len(pairs) == 1:
+            out[pairs[0]] = data
+        return out
+
+
+class ReplayProvider(MarketDataProvider):
+    """
+    Reproduce velas grabadas desde archivos locales (<par>__<tf>.parquet o .csv
+    con columna Date + OHLCV). Sin red: para escaneos offline, benchmarks y
+    tests de rendimiento. end opcional corta la serie en ese instante.
+    """
+    name = "replay"
+    live = False
+
+    def __init__(self, root=None, end=None):
+        self.root = root or os.environ.get("MARKET_DATA_REPLAY_DIR", DEFAULT_REPLAY_ROOT)
+        self.end = pd.Timestamp(end) if end is not None else None
+        if self.end is not None and self.end.tz is None:
+            self.end = self.end.tz_localize('UTC')
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def _read(self, pair, timeframe):
+        key = (pair, timeframe)
+        with self._lock:
+            if key in self._frames:
+                return self._frames[key]
+        stem = os.path.join(self.root, file_stem(pair, timeframe))
+        df = None
+        if os.path.exists(stem + ".parquet"):
+            df = pd.read_parquet(stem + ".parquet")
+        elif os.path.exists(stem + ".csv"):
+            df = pd.read_csv(stem + ".csv", float_precision="round_trip")
+        if df is not None:
+            if 'Date' not in df.columns:
+                df = df.reset_index().rename(columns={df.index.name or 'index': 'Date'})
+            df['Date'] = pd.to_datetime(df['Date'], utc=True)
+            df = df.set_index('Date').sort_index()
+        with self._lock:
+            self._frames[key] = df
+        return df
+
+    def history(self, pair, timeframe, start=None):
+        df = self._read(pair, timeframe)
+        if df is None:
+            return pd.DataFrame()
+        if start is not None:
+            df = df[df.index >= start]
+        if self.end is not None:
+            df = df[df.index <= self.end]
+        return df
+
+    def record(self, pair, timeframe, df):
+        """Graba un frame (columna o índice Date + OHLCV) como CSV reproducible."""
+        os.makedirs(self.root, exist_ok=True)
+        if 'Date' not in df.columns:
+            df = df.reset_index().rename(columns={df.index.name or 'index': 'Date'})
+        path = os.path.join(self.root, file_stem(pair, timeframe) + ".csv")
+        df[['Date'] + [c for c in OHLCV_COLUMNS if c in df.columns]].to_csv(path, index=False)
+        with self._lock:
+            self._frames.pop((pair, timeframe), None)
+        return path
+
+
+def provider_from_env():
+    """Proveedor por defecto: MARKET_DATA_PROVIDER=replay usa los archivos grabados."""
+    if os.environ.get("MARKET_DATA_PROVIDER", "yfinance").lower() == "replay":
+        return ReplayProvider()
+    return YFinanceProvider()
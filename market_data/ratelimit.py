@@ -0,0 +1,155 @@
+import random
+import threading
+import time
+from urllib.error import HTTPError, URLError
+
+
+def is_throttle_error(exc):
+    """Heurística: errores de Yahoo por exceso de peticiones (429 / YFRateLimitError)."""
+    name = type(exc).__name__.lower()
+    msg = str(exc).lower()
+    return "ratelimit" in name or "429" in msg or "too many requests" in msg or "rate limit" in msg
+
+
+def is_transient_error(exc):
+    """
+    Errores que vale la pena reintentar: throttling, timeouts, cortes de red
+    y 5xx. Un ticker inexistente, un KeyError o un error de parseo no se
+    arreglan esperando.
+    """
+    if is_throttle_error(exc) or isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    if isinstance(exc, HTTPError):
+        return exc.code >= 500
+    if isinstance(exc, URLError):
+        return True
+    # requests / curl_cffi: ConnectionError, Timeout, ReadTimeout... no heredan de los builtins
+    names = [cls.__name__.lower() for cls in type(exc).__mro__]
+    return any("timeout" in name or name == "connectionerror" for name in names)
+
+
+def _is_empty(result):
+    if result is None:
+        return True
+    empty = getattr(result, "empty", None)
+    return bool(empty) if empty is not None else False
+
+
+class RateGovernor:
+    """
+    Gobernador global de peticiones a un host (token bucket + AIMD).
+    Cada llamada consume un token; si el proveedor responde con throttling
+    la tasa se reduce a la mitad y se reintenta con backoff exponencial con
+    jitter, y cada éxito la vuelve a subir de a poco hasta max_rate.
+    Así el throughput se queda en la tasa máxima sostenible en vez de caer
+    en fallos en cascada.
+    """
+    def __init__(self, max_rate=4.0, burst=8, min_rate=0.2, increase_step=0.05,
+                 max_retries=4, max_empty_retries=1, base_delay=1.0, max_delay=30.0):
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.increase_step = increase_step
+        self.burst = burst
+        self.max_retries = max_retries
+        self.max_empty_retries = max_empty_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._lock = threading.Lock()
+        self._rate = max_rate
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+
+        self.requests = 0
+        self.throttled = 0
+        self.retries = 0
+        self.failures = 0
+        self.wait_seconds = 0.0
+
+    def acquire(self):
+        """Bloquea hasta que haya un token disponible."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self._rate)
+                self._last = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    self.requests += 1
+                    self.wait_seconds += waited
+                    return waited
+                delay = (1.0 - self._tokens) / self._rate
+            time.sleep(delay)
+            waited += delay
+
+    def _on_success(self):
+        with self._lock:
+            self._rate = min(self.max_rate, self._rate + self.increase_step)
+
+    def _on_throttle(self):
+        with self._lock:
+            self.throttled += 1
+            self._rate = max(self.min_rate, self._rate * 0.5)
+            # Vaciar el bucket: nadie sale en ráfaga justo después de un 429
+            self._tokens = min(self._tokens, 0.0)
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def call(self, fn, *args, retry_empty=True, **kwargs):
+        """
+        Ejecuta fn respetando el límite global. Reintenta los errores
+        transitorios (is_transient_error, hasta max_retries) y, si
+        retry_empty, resultados vacíos (hasta max_empty_retries: Yahoo suele
+        devolver frames vacíos cuando limita). Cualquier otro error se relanza
+        en el acto, igual que el último transitorio.
+        """
+        attempt = 0
+        empty_attempts = 0
+        while True:
+            self.acquire()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if is_throttle_error(e):
+                    self._on_throttle()
+                if attempt >= self.max_retries or not is_transient_error(e):
+                    with self._lock:
+                        self.failures += 1
+                    raise
+                delay = self._backoff(attempt)
+                attempt += 1
+                with self._lock:
+                    self.retries += 1
+                print(f"[RATE] Reintento {attempt}/{self.max_retries} en {delay:.1f}s: {e}")
+                time.sleep(delay)
+                continue
+
+            if retry_empty and _is_empty(result) and empty_attempts < self.max_empty_retries:
+                # Frame vacío: el throttling "suave" de Yahoo, también baja la tasa
+                self._on_throttle()
+                empty_attempts += 1
+                with self._lock:
+                    self.retries += 1
+                time.sleep(self._backoff(empty_attempts))
+                continue
+
+            self._on_success()
+            return result
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "retries": self.retries,
+                "failures": self.failures,
+                "wait_seconds": round(self.wait_seconds, 2),
+                "current_rate": round(self._rate, 3),
+            }
+
+
+# Gobernador compartido por todo el proceso para las peticiones a Yahoo Finance
+# (data_loader, TradeJournal, TradeTracker y el dashboard macro).
+yahoo_governor = RateGovernor()
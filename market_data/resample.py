@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+from market_data.store import OHLCV_COLUMNS, to_utc_ns
+from market_data.timeframes import TIMEFRAME_SECONDS
+
+
+def resample_arrays(ts, open_, high, low, close, volume, step_ns):
+    """
+    Agrega velas ordenadas por tiempo a buckets de step_ns nanosegundos (UTC).
+    Todo vectorizado: los cortes de bucket se calculan una vez y cada campo
+    se reduce con ufunc.reduceat.
+    """
+    if len(ts) == 0:
+        empty = np.array([], dtype=float)
+        return np.array([], dtype='int64'), empty, empty, empty, empty, empty
+    bucket = ts // step_ns
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(ts)] - 1
+    return (
+        bucket[starts] * step_ns,
+        open_[starts],
+        np.maximum.reduceat(high, starts),
+        np.minimum.reduceat(low, starts),
+        close[ends],
+        np.add.reduceat(volume, starts),
+    )
+
+
+def resample_ohlcv(df, timeframe):
+    """
+    Construye velas de `timeframe` a partir de un frame más fino
+    (columna 'Date' + OHLCV). Devuelve un frame con el mismo formato.
+    """
+    if df is None or df.empty:
+        return df
+    step_ns = TIMEFRAME_SECONDS[timeframe] * 10**9
+    ts = to_utc_ns(df['Date'])
+    order = np.argsort(ts, kind='stable')
+    cols = [df[col].to_numpy(dtype=float)[order] for col in OHLCV_COLUMNS]
+    out_ts, o, h, l, c, v = resample_arrays(ts[order], *cols, step_ns=step_ns)
+    out = pd.DataFrame({'Open': o, 'High': h, 'Low': l, 'Close': c, 'Volume': v})
+    out.insert(0, 'Date', pd.to_datetime(out_ts, unit='ns', utc=True))
+    return out
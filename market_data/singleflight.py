@@ -0,0 +1,51 @@
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalescencia de peticiones concurrentes: si varios hilos piden la misma
+    clave a la vez, sólo el primero ejecuta la descarga y el resto espera y
+    comparte su resultado (o su excepción).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.shared = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
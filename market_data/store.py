@@ -0,0 +1,144 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+# Layout binario de cada vela guardada en disco (timestamp UTC en nanosegundos + OHLCV)
+OHLCV_DTYPE = np.dtype([
+    ('ts', '<i8'),
+    ('Open', '<f8'),
+    ('High', '<f8'),
+    ('Low', '<f8'),
+    ('Close', '<f8'),
+    ('Volume', '<f8'),
+])
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+DEFAULT_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "ohlcv")
+
+
+def file_stem(pair, timeframe):
+    """Nombre de archivo seguro para un par/timeframe (p.ej. 'EURUSD=X' -> 'EURUSD_X__15m')."""
+    safe_pair = "".join(c if c.isalnum() or c in "-_." else "_" for c in pair)
+    return f"{safe_pair}__{timeframe}"
+
+
+def to_utc_ns(dates):
+    """Convierte una serie/índice de fechas a int64 (ns desde epoch, UTC)."""
+    idx = pd.DatetimeIndex(dates)
+    if idx.tz is None:
+        idx = idx.tz_localize('UTC')
+    else:
+        idx = idx.tz_convert('UTC')
+    return np.asarray(idx.tz_localize(None), dtype='datetime64[ns]').view('int64')
+
+
+def records_to_frame(arr):
+    """Estructura NumPy (OHLCV_DTYPE) -> DataFrame con columna 'Date' en UTC."""
+    # np.array copia: el DataFrame no debe retener el memory-map (Windows bloquea el archivo)
+    df = pd.DataFrame({col: np.array(arr[col], dtype=float) for col in OHLCV_COLUMNS})
+    df.insert(0, 'Date', pd.to_datetime(np.array(arr['ts']), unit='ns', utc=True))
+    return df
+
+
+def frame_to_records(df):
+    """DataFrame normalizado (columna 'Date' + OHLCV) -> estructura NumPy OHLCV_DTYPE."""
+    arr = np.empty(len(df), dtype=OHLCV_DTYPE)
+    arr['ts'] = to_utc_ns(df['Date'])
+    for col in OHLCV_COLUMNS:
+        arr[col] = df[col].to_numpy(dtype=float) if col in df.columns else 0.0
+    return arr
+
+
+class OHLCVStore:
+    """
+    Almacén local columnar de velas OHLCV.
+    Un archivo .npy por par/timeframe, leído con memory-map para que los
+    arranques en frío salgan de disco y sólo se descargue la cola nueva.
+    """
+    def __init__(self, root=None):
+        self.root = root or os.environ.get("OHLCV_CACHE_DIR", DEFAULT_ROOT)
+        self._lock = threading.Lock()
+
+    def _path(self, pair, timeframe):
+        return os.path.join(self.root, file_stem(pair, timeframe) + ".npy")
+
+    def read_records(self, pair, timeframe):
+        """Devuelve el array estructurado guardado (memory-mapped) o None."""
+        path = self._path(pair, timeframe)
+        if not os.path.exists(path):
+            return None
+        try:
+            arr = np.load(path, mmap_mode='r')
+        except Exception as e:
+            print(f"[CACHE] Archivo corrupto {path}: {e}")
+            return None
+        if arr.dtype != OHLCV_DTYPE or len(arr) == 0:
+            return None
+        return arr
+
+    def read(self, pair, timeframe):
+        arr = self.read_records(pair, timeframe)
+        if arr is None:
+            return None
+        return records_to_frame(arr)
+
+    def last_timestamp(self, pair, timeframe):
+        """Timestamp (UTC) de la última vela guardada, sin cargar el archivo completo."""
+        arr = self.read_records(pair, timeframe)
+        if arr is None:
+            return None
+        return pd.Timestamp(int(arr['ts'][-1]), unit='ns', tz='UTC')
+
+    def write(self, pair, timeframe, df):
+        """Reemplaza el contenido guardado. Escritura atómica (tmp + rename)."""
+        arr = frame_to_records(df)
+        path = self._path(pair, timeframe)
+        with self._lock:
+            os.makedirs(self.root, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, 'wb') as f:
+                np.save(f, arr)
+            os.replace(tmp, path)
+        return df
+
+    def append(self, pair, timeframe, df_new, min_ts=None):
+        """
+        Agrega velas nuevas a las guardadas y devuelve la serie completa.
+        Las velas con timestamp repetido se reemplazan (la última vela guardada
+        suele ser una vela en formación). min_ts recorta el histórico viejo.
+        """
+        old = self.read_records(pair, timeframe)
+        new = frame_to_records(df_new)
+        if old is not None and len(new) > 0:
+            old = old[old['ts'] < new['ts'][0]]
+            merged = np.concatenate([old, new])
+        elif old is not None:
+            merged = np.array(old)
+        else:
+            merged = new
+        old = None  # liberar el memory-map antes de reescribir el archivo
+        # Orden y unicidad por timestamp (se queda con la última ocurrencia)
+        order = np.argsort(merged['ts'], kind='stable')
+        merged = merged[order]
+        if len(merged) > 1:
+            keep = np.append(merged['ts'][1:] != merged['ts'][:-1], True)
+            merged = merged[keep]
+        if min_ts is not None:
+            merged = merged[merged['ts'] >= to_utc_ns([min_ts])[0]]
+        df = records_to_frame(merged)
+        return self.write(pair, timeframe, df)
+
+    def clear(self, pair=None, timeframe=None):
+        """Borra los archivos guardados (todos, de un par o de un par/timeframe)."""
+        if not os.path.isdir(self.root):
+            return
+        prefix = os.path.basename(self._path(pair, "")).split("__")[0] + "__" if pair else ""
+        suffix = f"__{timeframe}.npy" if timeframe else ".npy"
+        for name in os.listdir(self.root):
+            if name.startswith(prefix) and name.endswith(suffix):
+                try:
+                    os.remove(os.path.join(self.root, name))
+                except OSError:
+                    pass
@@ -0,0 +1,52 @@
+import time
+
+# Duración de cada timeframe en segundos
+TIMEFRAME_SECONDS = {
+    "1m": 60,
+    "5m": 5 * 60,
+    "15m": 15 * 60,
+    "1h": 60 * 60,
+    "4h": 4 * 60 * 60,
+    "1d": 24 * 60 * 60,
+}
+
+# Serie base desde la que se deriva cada timeframe.
+# 1h y 4h salen de 15m (misma ventana de 60 días que Yahoo da para 1h),
+# 1m/5m tienen ventana de 7 días y 1d se guarda aparte (ventana de 1 año).
+BASE_TIMEFRAME = {
+    "1m": "1m",
+    "5m": "5m",
+    "15m": "15m",
+    "1h": "15m",
+    "4h": "15m",
+    "1d": "1d",
+}
+
+
+def base_timeframe(timeframe):
+    return BASE_TIMEFRAME.get(timeframe, timeframe)
+
+
+def timeframe_seconds(timeframe):
+    return TIMEFRAME_SECONDS.get(timeframe, 0)
+
+
+def seconds_to_candle_close(timeframe, now=None):
+    """
+    Segundos que faltan para el cierre de la vela actual (velas alineadas a UTC).
+    Devuelve None si el timeframe no es conocido.
+    """
+    interval_seconds = timeframe_seconds(timeframe)
+    if not interval_seconds:
+        return None
+    now = time.time() if now is None else now
+    # Segundos pasados desde el inicio del intervalo
+    seconds_past = now % interval_seconds
+    return interval_seconds - seconds_past
+
+
+def next_candle_close(timeframe, now=None):
+    """Epoch (segundos) del próximo cierre de vela, o None si el timeframe no es conocido."""
+    now = time.time() if now is None else now
+    left = seconds_to_candle_close(timeframe, now)
+    return None if left is None else now + left
@@ -0,0 +1,42 @@
+"""
+Escáner sin interfaz (servidor / cron): el mismo InstitutionalBot.scan que usa
+el escáner de Streamlit.
+
+    python scan.py EURUSD=X GBPUSD=X GC=F --timeframe 15m --workers 4
+    python scan.py GGAL.BA YPFD.BA --argentina
+"""
+import argparse
+
+from core.bot import ArgentinaBot, InstitutionalBot
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Escaneo SMC de un universo de pares")
+    parser.add_argument("pairs", nargs="+", help="Tickers de Yahoo Finance")
+    parser.add_argument("--timeframe", default="1h", choices=["1m", "5m", "15m", "1h", "4h"])
+    parser.add_argument("--workers", type=int, default=0, help="Procesos de análisis (0 = hilos)")
+    parser.add_argument("--concurrency", type=int, default=None, help="Pares simultáneos en modo hilos")
+    parser.add_argument("--argentina", action="store_true", help="Usar ArgentinaBot (CEDEARs / Merval)")
+    parser.add_argument("--confirmed-pivots", action="store_true", help="Pivots sin mirar velas futuras")
+    args = parser.parse_args()
+
+    bot_class = ArgentinaBot if args.argentina else InstitutionalBot
+    bot = bot_class(use_ai=False, pivot_mode="confirmed" if args.confirmed_pivots else "centered")
+    batch = bot.scan(args.pairs, args.timeframe, workers=args.workers, concurrency=args.concurrency)
+
+    print(f"\n=== ESCANEO {args.timeframe}: {len(args.pairs)} activos ===")
+    for pair in args.pairs:
+        result = batch["results"].get(pair) or {}
+        if pair in batch["errors"]:
+            print(f"{pair:<12} ERROR  {batch['errors'][pair]}")
+        elif result.get("signal"):
+            signal = result["signal"]
+            print(f"{pair:<12} {signal['type']:<6} entrada {signal['entry']:.5f}  SL {signal['sl']:.5f}  "
+                  f"TP {signal['tp']:.5f}  prob {signal['prob']}%  ({signal['reason']})")
+        else:
+            print(f"{pair:<12} -      {result.get('filter_reason') or 'sin señal'}")
+    print("Tiempos: " + " • ".join(f"{stage} {seconds:.2f}s" for stage, seconds in batch["timings"].items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Fixtures compartidas de los tests. Uso (desde la raíz del repo):
+    python -m pytest tests
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_loader import add_session_info
+
+
+def synthetic_ohlcv(n, seed=0):
+    """Paseo aleatorio de velas de 15m (mismo formato que data_loader)."""
+    rng = np.random.default_rng(seed)
+    close = 1.10 + np.cumsum(rng.normal(0, 0.0005, n))
+    spread = np.abs(rng.normal(0, 0.0004, n))
+    df = pd.DataFrame({
+        'Date': pd.date_range('2024-01-01', periods=n, freq='15min', tz='UTC'),
+        'Open': np.r_[close[0], close[:-1]],
+        'High': close + spread,
+        'Low': close - spread,
+        'Close': close,
+        'Volume': rng.integers(100, 1000, n).astype(float),
+    })
+    return add_session_info(df)
+
+
+@pytest.fixture(scope="session")
+def ohlcv():
+    return synthetic_ohlcv(1200, seed=7)
+
+
+def assert_same_frame(got, expected):
+    """Mismas columnas de expected y mismos valores (floats con tolerancia)."""
+    got = got[expected.columns]
+    pd.testing.assert_frame_equal(got.reset_index(drop=True), expected.reset_index(drop=True),
+                                  check_dtype=False, check_exact=False, rtol=1e-9, atol=1e-12)
@@ -0,0 +1,15 @@
+"""AsyncFetchEngine.gather: resultados por item y errores impresos, no tragados."""
+import asyncio
+
+from market_data.async_fetch import AsyncFetchEngine
+
+
+def test_gather_logs_failures(capsys):
+    def fn(item):
+        if item == "BAD":
+            raise ValueError("ticker inexistente")
+        return item.lower()
+
+    out = asyncio.run(AsyncFetchEngine(concurrency=2).gather(fn, ["A", "BAD", "C"]))
+    assert out == {"A": "a", "BAD": None, "C": "c"}
+    assert "BAD: ticker inexistente" in capsys.readouterr().out
@@ -0,0 +1,112 @@
+"""backtest/engine.py contra un recorrido vela a vela de cada trade."""
+import numpy as np
+import pytest
+
+from analysis.smc import SMCAnalyzer
+from backtest import engine
+from backtest.engine import OUTCOMES, _select, check_lookahead, resolve_trades, run_backtest, trade_ledger
+from core.bot import InstitutionalBot
+
+
+def resolve_one(high, low, close, start, side, sl, tp, horizon=None):
+    """Referencia: vela por vela desde start + 1; si SL y TP caen en la misma vela gana el SL."""
+    n = len(close)
+    limit = n if horizon is None else horizon
+    for k in range(1, limit + 1):
+        bar = start + k
+        if bar >= n:
+            return n - 1, 'open', close[n - 1]
+        hit_sl = low[bar] <= sl if side == 1 else high[bar] >= sl
+        hit_tp = high[bar] >= tp if side == 1 else low[bar] <= tp
+        if hit_sl:
+            return bar, 'loss', sl
+        if hit_tp:
+            return bar, 'win', tp
+    return start + limit, 'timeout', close[start + limit]
+
+
+def random_case(rng):
+    n = int(rng.integers(20, 400))
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    spread = np.abs(rng.normal(0, 0.8, n))
+    high, low = close + spread, close - spread
+    m = int(rng.integers(1, 40))
+    start = np.sort(rng.choice(n, size=min(m, n), replace=False))
+    side = rng.choice([1, -1], size=len(start))
+    sl_dist = rng.uniform(0.2, 8, len(start))
+    tp_dist = rng.uniform(0.2, 15, len(start))
+    entry = close[start]
+    sl = entry - side * sl_dist
+    tp = entry + side * tp_dist
+    # Algunos niveles justo en un High/Low: el toque es con <= / >=
+    exact = rng.random(len(start)) < 0.2
+    later = np.minimum(start + 1, n - 1)
+    sl = np.where(exact & (side == 1), low[later], np.where(exact, high[later], sl))
+    horizon = None if rng.random() < 0.3 else int(rng.integers(1, 80))
+    return high, low, close, start, side, sl, tp, horizon
+
+
+def assert_matches_reference(high, low, close, start, side, sl, tp, horizon):
+    exit_bar, outcome, exit_price = resolve_trades(high, low, close, start, side, sl, tp, horizon)
+    for j, s in enumerate(start):
+        bar, kind, price = resolve_one(high, low, close, s, side[j], sl[j], tp[j], horizon)
+        assert (exit_bar[j], OUTCOMES[outcome[j]], exit_price[j]) == (bar, kind, price), (j, s, horizon)
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_resolve_trades_matches_per_bar_loop(seed):
+    assert_matches_reference(*random_case(np.random.default_rng(seed)))
+
+
+def test_resolve_trades_in_chunks(monkeypatch):
+    # Ventanas partidas en varios bloques de trades (tope de celdas chico)
+    monkeypatch.setattr(engine, "_MAX_CELLS", 64)
+    for seed in range(20):
+        assert_matches_reference(*random_case(np.random.default_rng(1000 + seed)))
+
+
+def select_one_by_one(start, exit_bar):
+    """Referencia de _select: se toma una señal si ya salió el trade anterior."""
+    taken, free_from = [], -1
+    for k in range(len(start)):
+        if start[k] >= free_from:
+            taken.append(k)
+            free_from = max(exit_bar[k], start[k] + 1)
+    return taken
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_select_never_overlaps(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(5, 300))
+    start = np.sort(rng.choice(n, size=int(rng.integers(1, n)), replace=False))
+    exit_bar = np.minimum(start + rng.integers(0, 30, len(start)), n - 1)
+    taken = _select(start, exit_bar, overlap=False)
+    assert taken.tolist() == select_one_by_one(start, exit_bar)
+    # Cada trade entra en o después de la vela de salida del anterior
+    assert np.all(start[taken][1:] >= exit_bar[taken][:-1])
+    assert np.all(np.diff(start[taken]) > 0)
+    assert _select(start, exit_bar, overlap=True).tolist() == list(range(len(start)))
+
+
+def test_check_lookahead_rejects_centered(ohlcv):
+    bot = InstitutionalBot(min_atr_m15=0.0)
+    centered = SMCAnalyzer(pivot_mode="centered").analyze(ohlcv)
+    confirmed = SMCAnalyzer(pivot_mode="confirmed").analyze(ohlcv)
+    with pytest.raises(ValueError, match="centered"):
+        check_lookahead(centered)
+    check_lookahead(centered, allow_lookahead=True)
+    check_lookahead(confirmed)
+
+    setups = bot.find_setups(centered, "EURUSD=X", "15m")
+    with pytest.raises(ValueError):
+        trade_ledger(centered, setups, pair="EURUSD=X")
+    with pytest.raises(ValueError):
+        run_backtest(centered, setups, pair="EURUSD=X")
+    assert len(trade_ledger(centered, setups, pair="EURUSD=X", allow_lookahead=True))
+
+    setups = bot.find_setups(confirmed, "EURUSD=X", "15m")
+    ledger = trade_ledger(confirmed, setups, pair="EURUSD=X")
+    assert len(ledger)
+    # Sin superposición: cada entrada en o después de la salida anterior
+    assert np.all(ledger['entry_bar'].to_numpy()[1:] >= ledger['exit_bar'].to_numpy()[:-1])
@@ -0,0 +1,40 @@
+"""Noticias en scan(): una consulta por activo, por el gobernador de Yahoo."""
+import core.bot
+from core.bot import InstitutionalBot
+from market_data.ratelimit import yahoo_governor
+
+
+class FakeTicker:
+    calls = []
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    @property
+    def news(self):
+        FakeTicker.calls.append(self.symbol)
+        if self.symbol == "BAD=X":
+            raise ValueError("sin noticias")
+        if self.symbol == "EMPTY=X":
+            return []
+        return [{'title': f"{self.symbol} sube"}]
+
+
+def test_prefetch_fetches_each_symbol_once(monkeypatch):
+    monkeypatch.setattr(core.bot.yf, "Ticker", FakeTicker)
+    FakeTicker.calls = []
+    bot = InstitutionalBot()
+    requests = yahoo_governor.metrics()["requests"]
+    bot._news_memo = {}
+    pairs = ["EURUSD=X", "BAD=X", "EMPTY=X", "EURUSD=X"]
+    bot._prefetch_news(pairs, concurrency=4)
+
+    # Un pedido por activo (más el proxy USD=X), todos por el gobernador
+    assert sorted(FakeTicker.calls) == ["BAD=X", "EMPTY=X", "EURUSD=X", "USD=X"]
+    assert yahoo_governor.metrics()["requests"] - requests == 4
+
+    # run_analysis usa lo memorizado, también lo que falló
+    assert bot._get_fundamental_news("EURUSD=X") == ["EURUSD=X sube"]
+    assert bot._get_fundamental_news("BAD=X") == ["USD=X sube"]
+    assert bot._get_fundamental_news("EMPTY=X") == ["USD=X sube"]
+    assert len(FakeTicker.calls) == 4
@@ -0,0 +1,54 @@
+"""CandleCache: vencimiento en el cierre de vela (reloj inyectado con now) y eviction LRU."""
+import pandas as pd
+
+from market_data.cache import CandleCache
+
+# 2024-01-01 00:00 UTC, alineado a todas las velas
+T0 = 1704067200.0
+FRAME = pd.DataFrame({'Close': [1.0, 2.0]})
+
+
+def test_entry_expires_at_next_candle_close():
+    cache = CandleCache()
+    cache.put("EURUSD=X", "15m", FRAME, now=T0 + 100)
+    assert cache.get("EURUSD=X", "15m", now=T0 + 899.9) is FRAME
+    # Al cierre de la vela de 15m vence, aunque hayan pasado 800 s
+    assert cache.get("EURUSD=X", "15m", now=T0 + 900) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_expiry_depends_on_timeframe():
+    cache = CandleCache()
+    cache.put("EURUSD=X", "1h", FRAME, now=T0 + 890)
+    cache.put("EURUSD=X", "5m", FRAME, now=T0 + 890)
+    assert cache.get("EURUSD=X", "5m", now=T0 + 901) is None
+    assert cache.get("EURUSD=X", "1h", now=T0 + 3599) is FRAME
+    assert cache.get("EURUSD=X", "1h", now=T0 + 3600) is None
+
+
+def test_lru_eviction():
+    cache = CandleCache(max_entries=2)
+    cache.put("A", "1h", FRAME, now=T0)
+    cache.put("B", "1h", FRAME, now=T0)
+    # Usar A la deja como la más reciente: se va B
+    assert cache.get("A", "1h", now=T0 + 1) is FRAME
+    cache.put("C", "1h", FRAME, now=T0 + 2)
+    assert cache.get("B", "1h", now=T0 + 3) is None
+    assert cache.get("A", "1h", now=T0 + 3) is FRAME
+    assert cache.get("C", "1h", now=T0 + 3) is FRAME
+    assert cache.stats()["evictions"] == 1
+
+
+def test_not_cached_and_invalidate():
+    cache = CandleCache()
+    cache.put("A", "15m", pd.DataFrame(), now=T0)
+    cache.put("A", "3h", FRAME, now=T0)  # timeframe desconocido: sin cierre de vela
+    assert cache.stats()["entries"] == 0
+    cache.put("A", "15m", FRAME, now=T0)
+    cache.put("A", "1h", FRAME, now=T0)
+    cache.put("B", "15m", FRAME, now=T0)
+    cache.invalidate(pair="A")
+    assert cache.get("B", "15m", now=T0) is FRAME
+    assert cache.get("A", "1h", now=T0) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 50.0)
@@ -0,0 +1,49 @@
+"""IncrementalSMCAnalyzer vela a vela == SMCAnalyzer.analyze sobre las mismas velas."""
+import numpy as np
+import pytest
+
+from analysis.incremental import IncrementalSMCAnalyzer
+from analysis.smc import SMCAnalyzer
+from conftest import assert_same_frame
+
+PIVOT_MODES = ["centered", "confirmed"]
+
+
+def feed(inc, df, seed=1):
+    """Pasa las velas de df y, antes de cada una, versiones parciales (vela en formación)."""
+    rng = np.random.default_rng(seed)
+    for idx, bar in zip(df.index, df.to_dict('records')):
+        for _ in range(rng.integers(0, 3)):
+            forming = dict(bar)
+            forming['High'] = bar['High'] + rng.random() * 0.002
+            forming['Low'] = bar['Low'] - rng.random() * 0.002
+            forming['Close'] = rng.uniform(forming['Low'], forming['High'])
+            inc.update(forming, index=idx)
+        inc.update(bar, index=idx)
+
+
+@pytest.mark.parametrize("pivot_mode", PIVOT_MODES)
+def test_streaming_matches_batch(ohlcv, pivot_mode):
+    inc = IncrementalSMCAnalyzer(max_bars=len(ohlcv), pivot_mode=pivot_mode)
+    feed(inc, ohlcv)
+    assert_same_frame(inc.frame(), SMCAnalyzer(pivot_mode=pivot_mode).analyze(ohlcv))
+
+
+@pytest.mark.parametrize("pivot_mode", PIVOT_MODES)
+def test_max_bars_keeps_the_tail(ohlcv, pivot_mode):
+    inc = IncrementalSMCAnalyzer(max_bars=300, pivot_mode=pivot_mode)
+    feed(inc, ohlcv)
+    out = inc.frame()
+    assert len(out) == 300
+    assert_same_frame(out, SMCAnalyzer(pivot_mode=pivot_mode).analyze(ohlcv).tail(300))
+
+
+def test_confirmed_rows_never_change(ohlcv):
+    # Sin lookahead: una fila emitida no se corrige con velas posteriores
+    inc = IncrementalSMCAnalyzer(max_bars=len(ohlcv), pivot_mode="confirmed")
+    emitted = [dict(inc.update(bar, index=idx)) for idx, bar in zip(ohlcv.index, ohlcv.to_dict('records'))]
+    final = inc.frame()
+    for i in range(0, len(ohlcv), 97):
+        for column in ('is_pivot_high', 'is_pivot_low', 'last_pivot_high', 'last_pivot_low', 'trend'):
+            before, after = emitted[i][column], final[column].iloc[i]
+            assert before == after or (before != before and after != after), (i, column)
@@ -0,0 +1,98 @@
+"""core/montecarlo.py contra un recorrido camino a camino en Python."""
+import numpy as np
+import pytest
+
+from core import montecarlo
+from core.montecarlo import _paths, _sample, simulate, suggest_risk
+from core.risk import RiskManager
+
+# Incluye un R que con riesgo alto deja la cuenta en cero
+R = np.array([2.1, -1.0, -1.0, 0.45, -0.7, 3.2, -1.0, 1.15, -5.0, -0.3, 2.4])
+
+
+def walk(sample, risk, ruin_percent, daily_limit, trades_per_day):
+    """Referencia de un camino: equity trade a trade."""
+    equity = peak = day_open = 1.0
+    max_dd = 0.0
+    ruined = breach = False
+    loss_run = win_run = loss_streak = win_streak = 0
+    for t, x in enumerate(sample):
+        if trades_per_day and t % trades_per_day == 0:
+            day_open = equity
+        equity *= max(1.0 + x * risk / 100.0, 0.0)
+        peak = max(peak, equity)
+        max_dd = max(max_dd, (peak - equity) / peak)
+        ruined = ruined or equity <= 1.0 - ruin_percent / 100.0
+        breach = breach or bool(trades_per_day) and equity <= day_open * (1.0 - daily_limit / 100.0)
+        loss_run = loss_run + 1 if x < 0 else 0
+        win_run = win_run + 1 if x > 0 else 0
+        loss_streak, win_streak = max(loss_streak, loss_run), max(win_streak, win_run)
+    return {'max_drawdown_pct': max_dd * 100.0, 'return_pct': (equity - 1.0) * 100.0, 'ruined': ruined,
+            'daily_breach': breach, 'loss_streak': loss_streak, 'win_streak': win_streak}
+
+
+def samples(r, paths, n_trades, block, seed):
+    """Los mismos índices que _paths: un _sample por tramo de _MAX_CELLS celdas."""
+    rng = np.random.default_rng(seed)
+    chunk = max(1, montecarlo._MAX_CELLS // n_trades)
+    return np.vstack([r[_sample(rng, r.size, min(paths, lo + chunk) - lo, n_trades, block)]
+                      for lo in range(0, paths, chunk)])
+
+
+@pytest.mark.parametrize("block", [None, 3])
+@pytest.mark.parametrize("max_cells", [1 << 22, 100])
+def test_paths_match_per_path_loop(monkeypatch, block, max_cells):
+    monkeypatch.setattr(montecarlo, "_MAX_CELLS", max_cells)
+    risks, paths, n_trades, seed = [1.3, 8.0, 25.0], 200, 40, 11
+    sims = _paths(R, risks, paths, n_trades, block, ruin_percent=50.0, daily_limit=4.0, trades_per_day=4, seed=seed)
+    sample = samples(R, paths, n_trades, block, seed)
+    for risk in risks:
+        for p in range(paths):
+            expected = walk(sample[p], risk, 50.0, 4.0, 4)
+            for key in ('max_drawdown_pct', 'return_pct'):
+                assert sims[risk][key][p] == pytest.approx(expected[key], rel=1e-9, abs=1e-9), (risk, p, key)
+            for key in ('ruined', 'daily_breach', 'loss_streak', 'win_streak'):
+                assert sims[risk][key][p] == expected[key], (risk, p, key)
+    # Los riesgos altos tienen que ejercitar la ruina y el límite diario
+    assert sims[25.0]['ruined'].any() and not sims[1.3]['ruined'].all()
+    assert sims[8.0]['daily_breach'].any()
+
+
+def test_block_bootstrap_keeps_consecutive_trades():
+    idx = _sample(np.random.default_rng(0), 7, 50, 20, 4)
+    blocks = idx[:, :20].reshape(50, 5, 4)
+    assert np.all((blocks[:, :, 1:] - blocks[:, :, :-1]) % 7 == 1)
+
+
+def test_simulate_stats_are_path_frequencies():
+    sim = simulate(R, risk_percent=8.0, paths=500, n_trades=30, trades_per_day=3, daily_limit=5.0, seed=4)
+    stats = sim['stats']
+    assert stats['ruin_probability'] == round(sim['ruined'].mean() * 100.0, 3)
+    assert stats['daily_breach_probability'] == round(sim['daily_breach'].mean() * 100.0, 3)
+    assert stats['max_drawdown_pct_p95'] == round(float(np.percentile(sim['max_drawdown_pct'], 95)), 2)
+
+
+def test_suggest_risk_percent_is_the_largest_within_limits():
+    risk = RiskManager()
+    r = np.array([2.0, -1.0, -1.0, 1.5, -1.0, 2.5, -1.0, 0.8])
+    grid = [0.25, 0.5, 1.0, 1.5, 2.0, 3.0, 4.0, 6.0]
+    suggested, table = risk.suggest_risk_percent(r, max_drawdown_percent=20.0, paths=2000, n_trades=50, seed=3,
+                                                 risk_percents=grid)
+    # Cada riesgo por separado con los mismos caminos (misma semilla)
+    within = []
+    for value in grid:
+        stats = simulate(r, risk_percent=value, paths=2000, n_trades=50, seed=3,
+                         daily_limit=risk.max_daily_drawdown_percent)['stats']
+        if stats['max_drawdown_pct_p95'] <= 20.0 and stats['ruin_probability'] <= 1.0:
+            within.append(value)
+    assert grid[0] < max(within) < grid[-1]
+    assert suggested == max(within)
+    assert table.loc[table['risk_percent'] == suggested, 'max_drawdown_pct_p95'].item() <= 20.0
+    # No cambia el riesgo configurado
+    assert risk.risk_per_trade_percent == RiskManager().risk_per_trade_percent
+
+
+def test_suggest_risk_none_when_nothing_fits():
+    risk, table = suggest_risk(R, max_drawdown_percent=0.01, paths=500, n_trades=30, seed=1)
+    assert risk is None
+    assert len(table)
@@ -0,0 +1,86 @@
+"""RateGovernor: qué errores se reintentan y cuándo se baja la tasa."""
+from urllib.error import HTTPError
+
+import pytest
+
+from market_data.ratelimit import RateGovernor, is_transient_error
+
+
+def governor():
+    # Sin esperas: backoff de 0 s y bucket grande
+    return RateGovernor(max_rate=1000.0, burst=100, base_delay=0.0, max_retries=3)
+
+
+def failing(errors, result="ok"):
+    """fn que lanza los errores en orden y después devuelve result."""
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+    return fn, calls
+
+
+@pytest.mark.parametrize("exc", [KeyError("Close"), ValueError("no data"), HTTPError("u", 404, "Not Found", {}, None)])
+def test_permanent_errors_raise_at_once(exc):
+    gov = governor()
+    fn, calls = failing([exc])
+    with pytest.raises(type(exc)):
+        gov.call(fn)
+    assert len(calls) == 1
+    assert gov.metrics()["retries"] == 0
+    assert gov.metrics()["failures"] == 1
+
+
+@pytest.mark.parametrize("exc", [ConnectionResetError("reset"), TimeoutError("read"),
+                                 HTTPError("u", 503, "Unavailable", {}, None), RuntimeError("429 Too Many Requests")])
+def test_transient_errors_are_retried(exc):
+    assert is_transient_error(exc)
+    gov = governor()
+    fn, calls = failing([exc, exc])
+    assert gov.call(fn) == "ok"
+    assert len(calls) == 3
+    assert gov.metrics()["retries"] == 2
+
+
+def test_library_timeouts_are_transient():
+    # requests.exceptions.ReadTimeout y similares no heredan de TimeoutError
+    class RequestException(IOError):
+        pass
+
+    class ReadTimeout(RequestException):
+        pass
+    assert is_transient_error(ReadTimeout("read timed out"))
+    assert not is_transient_error(RequestException("invalid url"))
+
+
+def test_transient_errors_give_up_after_max_retries():
+    gov = governor()
+    fn, calls = failing([ConnectionError("down")] * 10)
+    with pytest.raises(ConnectionError):
+        gov.call(fn)
+    assert len(calls) == gov.max_retries + 1
+
+
+def test_throttle_halves_the_rate():
+    gov = governor()
+    fn, _calls = failing([RuntimeError("Too Many Requests")])
+    gov.call(fn)
+    assert gov.metrics()["throttled"] == 1
+    assert gov.metrics()["current_rate"] < gov.max_rate
+
+
+def test_empty_result_counts_as_throttle():
+    gov = governor()
+    results = iter([None, "ok"])
+    assert gov.call(lambda: next(results)) == "ok"
+    assert gov.metrics()["throttled"] == 1
+    assert gov.metrics()["current_rate"] < gov.max_rate
+
+
+def test_empty_result_without_retry_empty():
+    gov = governor()
+    assert gov.call(lambda: None, retry_empty=False) is None
+    assert gov.metrics()["throttled"] == 0
@@ -0,0 +1,38 @@
+"""find_setups (todas las velas a la vez) == _find_setup sobre cada prefijo."""
+import numpy as np
+import pytest
+
+from analysis.signals import setup_at
+from core.bot import ArgentinaBot, InstitutionalBot
+
+
+def assert_matches_each_prefix(bot, df, pair, timeframe, htf_bias):
+    out = bot.find_setups(df, pair, timeframe, htf_bias=htf_bias)
+    for i in range(len(df)):
+        htf = htf_bias if htf_bias is None or isinstance(htf_bias, str) else htf_bias[i]
+        expected = bot._find_setup(df.iloc[:i + 1], pair, timeframe, df['trend'].iloc[i], htf)
+        if expected[0] is not None:
+            expected = ({k: float(v) if isinstance(v, (float, np.floating)) else v
+                         for k, v in expected[0].items()}, None)
+        assert setup_at(out, i, df) == expected, i
+
+
+@pytest.mark.parametrize("zone_entries", [False, True])
+@pytest.mark.parametrize("htf_bias", ["BULLISH", "BEARISH", None, "mixed"])
+def test_find_setups_matches_each_prefix(ohlcv, htf_bias, zone_entries):
+    bot = InstitutionalBot(strict_mode=True, min_atr_m15=2.0, pivot_mode="confirmed")
+    bot.setup_params['zone_entries'] = zone_entries
+    df = bot.smc.analyze(ohlcv)
+    if htf_bias == "mixed":
+        htf_bias = np.random.default_rng(2).choice(["BULLISH", "BEARISH", "RANGING"], len(df))
+    assert_matches_each_prefix(bot, df, "EURUSD=X", "15m", htf_bias)
+
+
+def test_find_setups_other_pip_factor(ohlcv):
+    # Precio en pesos (pip factor de ArgentinaBot) y timeframe sin filtro de ATR
+    bot = ArgentinaBot(pivot_mode="confirmed")
+    scaled = ohlcv.iloc[:400].copy()
+    for column in ('Open', 'High', 'Low', 'Close'):
+        scaled[column] = scaled[column] * 1000
+    df = bot.smc.analyze(scaled)
+    assert_matches_each_prefix(bot, df, "GGAL.BA", "1h", "BULLISH")
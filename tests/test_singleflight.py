@@ -0,0 +1,98 @@
+"""SingleFlight: llamadas concurrentes con la misma clave ejecutan fn una sola vez."""
+import threading
+import time
+
+import pytest
+
+from market_data.singleflight import SingleFlight
+
+N = 8
+
+
+def run_concurrently(flight, key, fn):
+    """N hilos llaman a do(key, fn); devuelve lo que obtuvo cada uno (resultado o excepción)."""
+    out = [None] * N
+
+    def worker(i):
+        try:
+            out[i] = flight.do(key, fn)
+        except Exception as e:
+            out[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(N)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=10)
+    assert not any(t.is_alive() for t in threads)
+    return out
+
+
+def wait_for_followers(flight, expected):
+    """El líder no termina hasta que los demás hilos están esperando su resultado."""
+    deadline = time.monotonic() + 5
+    while flight.shared < expected:
+        assert time.monotonic() < deadline, "los hilos no llegaron a esperar al líder"
+        time.sleep(0.001)
+
+
+def test_concurrent_callers_run_fn_once():
+    flight = SingleFlight()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        wait_for_followers(flight, N - 1)
+        return {'rows': 42}
+
+    out = run_concurrently(flight, ("EURUSD=X", "15m"), fetch)
+    assert len(calls) == 1
+    assert all(r is out[0] for r in out)
+    assert flight.shared == N - 1
+    assert flight.in_flight() == 0
+
+
+def test_error_reaches_every_waiter():
+    flight = SingleFlight()
+    error = RuntimeError("Too Many Requests")
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        wait_for_followers(flight, N - 1)
+        raise error
+
+    out = run_concurrently(flight, ("EURUSD=X", "15m"), fetch)
+    assert len(calls) == 1
+    assert all(r is error for r in out)
+    assert flight.in_flight() == 0
+    # Terminada la llamada la clave se libera: la siguiente vuelve a ejecutar fn
+    assert flight.do(("EURUSD=X", "15m"), lambda: "ok") == "ok"
+
+
+def test_distinct_keys_run_separately():
+    flight = SingleFlight()
+    started = threading.Barrier(2, timeout=5)
+
+    def fetch(key):
+        # Si una clave esperara a la otra la barrera no se cumpliría
+        started.wait()
+        return key
+
+    out = [None, None]
+    threads = [threading.Thread(target=lambda k=k: out.__setitem__(k, flight.do(k, fetch, k))) for k in (0, 1)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=10)
+    assert out == [0, 1]
+    assert flight.shared == 0
+
+
+def test_sequential_calls_are_not_shared():
+    flight = SingleFlight()
+    assert [flight.do("k", lambda i=i: i) for i in range(3)] == [0, 1, 2]
+    assert flight.shared == 0
+    with pytest.raises(ValueError):
+        flight.do("k", int, "x")
+    assert flight.in_flight() == 0
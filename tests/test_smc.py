@@ -0,0 +1,31 @@
+"""SMCAnalyzer: engine="numpy" (kernels) == engine="pandas" (implementación original)."""
+import pytest
+
+from analysis.smc import SMCAnalyzer
+from conftest import assert_same_frame
+
+PIVOT_MODES = ["centered", "confirmed"]
+
+
+@pytest.mark.parametrize("pivot_mode", PIVOT_MODES)
+def test_numpy_engine_matches_pandas(ohlcv, pivot_mode):
+    numpy_out = SMCAnalyzer(engine="numpy", pivot_mode=pivot_mode).analyze(ohlcv)
+    pandas_out = SMCAnalyzer(engine="pandas", pivot_mode=pivot_mode).analyze(ohlcv)
+    assert list(numpy_out.columns) == list(pandas_out.columns)
+    assert_same_frame(numpy_out, pandas_out)
+
+
+@pytest.mark.parametrize("pivot_mode", PIVOT_MODES)
+def test_numpy_engine_short_frame(ohlcv, pivot_mode):
+    # Menos velas que la ventana de pivots y que las EMAs
+    numpy_out = SMCAnalyzer(engine="numpy", pivot_mode=pivot_mode).analyze(ohlcv.iloc[:8])
+    pandas_out = SMCAnalyzer(engine="pandas", pivot_mode=pivot_mode).analyze(ohlcv.iloc[:8])
+    assert_same_frame(numpy_out, pandas_out)
+
+
+def test_confirmed_pivots_use_only_past_bars(ohlcv):
+    # Truncar la serie no cambia ninguna fila anterior (sin lookahead)
+    smc = SMCAnalyzer(pivot_mode="confirmed")
+    full = smc.analyze(ohlcv)
+    for end in (50, 333, 800):
+        assert_same_frame(smc.analyze(ohlcv.iloc[:end]), full.iloc[:end])
@@ -0,0 +1,59 @@
+"""OHLCVStore: append con timestamps repetidos, recorte por min_ts y persistencia."""
+import numpy as np
+import pandas as pd
+
+from market_data.store import OHLCVStore
+
+START = pd.Timestamp("2024-01-01", tz="UTC")
+
+
+def bars(first, n, price=1.0):
+    """n velas de 15m desde la vela número `first`, con Close = price + número de vela."""
+    dates = START + pd.to_timedelta(15 * np.arange(first, first + n), unit="min")
+    close = price + np.arange(first, first + n, dtype=float)
+    return pd.DataFrame({'Date': dates, 'Open': close, 'High': close + 0.5, 'Low': close - 0.5, 'Close': close,
+                         'Volume': np.full(n, 10.0)})
+
+
+def test_append_replaces_duplicate_timestamps(tmp_path):
+    store = OHLCVStore(root=str(tmp_path))
+    store.write("EURUSD=X", "15m", bars(0, 5))
+    # Las velas 3 y 4 vuelven con otro precio (la 4 era la vela en formación)
+    out = store.append("EURUSD=X", "15m", bars(3, 4, price=100.0))
+    assert len(out) == 7
+    assert out['Date'].is_monotonic_increasing and out['Date'].is_unique
+    assert out['Close'].tolist() == [1.0, 2.0, 3.0, 103.0, 104.0, 105.0, 106.0]
+    # Lo devuelto es lo que quedó en disco
+    pd.testing.assert_frame_equal(store.read("EURUSD=X", "15m"), out)
+
+
+def test_append_keeps_last_duplicate_within_new_rows(tmp_path):
+    store = OHLCVStore(root=str(tmp_path))
+    new = pd.concat([bars(0, 3), bars(2, 1, price=50.0)], ignore_index=True)
+    out = store.append("EURUSD=X", "15m", new)
+    assert out['Close'].tolist() == [1.0, 2.0, 52.0]
+
+
+def test_append_trims_to_min_ts(tmp_path):
+    store = OHLCVStore(root=str(tmp_path))
+    store.write("EURUSD=X", "15m", bars(0, 10))
+    min_ts = START + pd.Timedelta(minutes=15 * 6)
+    out = store.append("EURUSD=X", "15m", bars(10, 2), min_ts=min_ts)
+    assert out['Date'].iloc[0] == min_ts
+    assert len(out) == 6
+    assert store.last_timestamp("EURUSD=X", "15m") == START + pd.Timedelta(minutes=15 * 11)
+
+
+def test_append_without_new_rows(tmp_path):
+    store = OHLCVStore(root=str(tmp_path))
+    store.write("EURUSD=X", "15m", bars(0, 4))
+    out = store.append("EURUSD=X", "15m", bars(0, 0), min_ts=START + pd.Timedelta(minutes=15))
+    assert out['Close'].tolist() == [2.0, 3.0, 4.0]
+
+
+def test_append_to_empty_store(tmp_path):
+    store = OHLCVStore(root=str(tmp_path))
+    assert store.read("EURUSD=X", "15m") is None
+    out = store.append("EURUSD=X", "15m", bars(0, 3))
+    assert out['Close'].tolist() == [1.0, 2.0, 3.0]
+    assert str(out['Date'].dt.tz) == "UTC"
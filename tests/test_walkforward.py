@@ -0,0 +1,103 @@
+"""backtest/walkforward.py: ventanas y estadísticas por ventana (con purga del entrenamiento)."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest.engine import OUTCOMES
+from backtest.walkforward import _window_stats, windows
+
+WIN, LOSS, TIMEOUT = (OUTCOMES.index(k) for k in ('win', 'loss', 'timeout'))
+DAY = pd.Timedelta("1D").value
+
+
+def trades(rows):
+    """[(entrada, salida, r, resultado)] -> arrays como los de sweep_trades."""
+    entry, exit_time, r, outcome = zip(*rows)
+    return {'entry_time': np.array(entry, dtype=np.int64), 'exit_time': np.array(exit_time, dtype=np.int64),
+            'r': np.array(r, dtype=np.float64), 'outcome': np.array(outcome, dtype=np.int8)}
+
+
+# Entrenamiento [0, 1000): el trade que sale en 999 se queda, los que salen en 1000 o después se purgan
+TRADES = trades([
+    (100, 500, 2.0, WIN),
+    (300, 999, -1.0, LOSS),
+    (600, 1000, 2.0, WIN),
+    (900, 1500, 1.5, WIN),
+    (1000, 1200, -1.0, LOSS),
+])
+
+
+def window(stats, k=0):
+    return {key: float(values[k]) for key, values in stats.items()}
+
+
+def test_purge_drops_trades_exiting_at_or_after_train_end():
+    lo, hi = np.array([0]), np.array([1000])
+    purged = window(_window_stats(TRADES, lo, hi, purge=True))
+    assert purged == {'trades': 2, 'total_r': 1.0, 'expectancy_r': 0.5, 'win_rate': 50.0, 'profit_factor': 2.0}
+
+    kept = window(_window_stats(TRADES, lo, hi))
+    assert kept == {'trades': 4, 'total_r': 4.5, 'expectancy_r': 1.125, 'win_rate': 75.0, 'profit_factor': 5.5}
+
+
+def test_purge_per_window():
+    stats = _window_stats(TRADES, np.array([0, 500]), np.array([1000, 1500]), purge=True)
+    assert window(stats, 0)['trades'] == 2
+    # [500, 1500): entran 600, 900 y 1000; el de 900 sale en 1500 y se purga
+    assert window(stats, 1) == {'trades': 2, 'total_r': 1.0, 'expectancy_r': 0.5, 'win_rate': 50.0,
+                                'profit_factor': 2.0}
+
+
+def test_window_without_trades():
+    stats = window(_window_stats(TRADES, np.array([2000]), np.array([3000]), purge=True))
+    assert stats == {'trades': 0, 'total_r': 0.0, 'expectancy_r': 0.0, 'win_rate': 0.0, 'profit_factor': 0.0}
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_window_stats_match_direct_masks(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(1, 300))
+    entry = np.sort(rng.integers(0, 10_000, n))
+    arrays = {'entry_time': entry, 'exit_time': entry + rng.integers(0, 800, n),
+              'r': rng.choice([2.0, -1.0, 0.3, -0.4], n), 'outcome': rng.choice([WIN, LOSS, TIMEOUT], n).astype(np.int8)}
+    lo = np.sort(rng.integers(0, 9_000, 8))
+    hi = lo + rng.integers(1, 3_000, 8)
+    for purge in (False, True):
+        stats = _window_stats(arrays, lo, hi, purge=purge)
+        for k in range(len(lo)):
+            mask = (entry >= lo[k]) & (entry < hi[k])
+            if purge:
+                mask &= arrays['exit_time'] < hi[k]
+            r, outcome = arrays['r'][mask], arrays['outcome'][mask]
+            wins, losses = np.count_nonzero(outcome == WIN), np.count_nonzero(outcome == LOSS)
+            assert stats['trades'][k] == mask.sum()
+            assert stats['total_r'][k] == pytest.approx(r.sum())
+            assert stats['win_rate'][k] == pytest.approx(wins / (wins + losses) * 100 if wins + losses else 0.0)
+
+
+def test_rolling_windows():
+    start = pd.Timestamp("2024-01-01", tz="UTC")
+    out = windows(start, start + pd.Timedelta("11D"), train="4D", test="2D")
+    base = start.value
+    assert [(w['train_start'] - base) // DAY for w in out] == [0, 2, 4, 6]
+    assert all(w['train_end'] == w['test_start'] == w['train_start'] + 4 * DAY for w in out)
+    # La última prueba se corta en end
+    assert [(w['test_end'] - w['test_start']) // DAY for w in out] == [2, 2, 2, 1]
+
+
+def test_anchored_windows():
+    start = pd.Timestamp("2024-01-01", tz="UTC")
+    rolling = windows(start, start + pd.Timedelta("11D"), train="4D", test="2D")
+    anchored = windows(start, start + pd.Timedelta("11D"), train="4D", test="2D", anchored=True)
+    assert all(w['train_start'] == start.value for w in anchored)
+    # Mismas pruebas: sólo cambia dónde empieza el entrenamiento
+    for a, r in zip(anchored, rolling):
+        assert (a['train_end'], a['test_start'], a['test_end']) == (r['train_end'], r['test_start'], r['test_end'])
+
+
+def test_windows_step_and_validation():
+    out = windows(0, 10 * DAY, train="4D", test="2D", step="1D")
+    assert [w['test_start'] // DAY for w in out] == [4, 5, 6, 7, 8, 9]
+    assert windows(0, 4 * DAY, train="4D", test="1D") == []
+    with pytest.raises(ValueError):
+        windows(0, 10 * DAY, train="0D", test="1D")